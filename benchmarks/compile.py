@@ -0,0 +1,225 @@
+"""
+Compile-side benchmarks on synthetic models
+
+Builds Dense (784 -> N -> 10) and Conv2D/Pooling stacks of increasing size,
+through the PyNN frontend (Population + Projection + Builder.build) and
+directly as resnnance.core models, and records the wall time and peak
+traced memory of every phase:
+
+    connect     PyNN populations and projections (connection creation)
+    build       Builder.build / core layer creation
+    params      get_template_params of every layer (Conv2D kernel flattening)
+    compile     Compiler.compile into an empty build
+    render      the same compile, minus its file writes (template rendering)
+    write       file writes of the same compile (write_time metric)
+
+Results are written as JSON (one record per model, frontend and phase)
+to compare runs across commits:
+
+    python benchmarks/compile.py --output bench.json
+"""
+
+import os, sys, json, time, shutil, argparse, logging, platform, tempfile, tracemalloc, subprocess
+
+import numpy as np
+
+import resnnance.core as rsnn
+from resnnance.core.compiler import Compiler
+from resnnance.core.logger import resnnance_metrics
+
+# Synthetic models
+DENSE = [64, 256, 1024]                         # Hidden neurons (784 -> N -> 10)
+CONV  = [(3, 8), (3, 32), (5, 8), (5, 32)]      # Kernel size, filters
+IMAGE = (28, 28, 1)
+
+class Benchmark(object):
+    """
+    Wall time and peak traced memory records of the benchmark phases
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.records = []
+        self.key = {}
+
+    def phase(self, name):
+        return Phase(self, name)
+
+class Phase(object):
+
+    def __init__(self, benchmark, name):
+        self.benchmark = benchmark
+        self.record = dict(benchmark.key, phase=name, time=None, peak=None)
+
+    def __enter__(self):
+        if self.benchmark.memory:
+            tracemalloc.start()
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc):
+        self.record['time'] = time.perf_counter() - self.start
+        if self.benchmark.memory:
+            _, self.record['peak'] = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        self.benchmark.records.append(self.record)
+
+def dense_layers(n, rng):
+    """
+    Returns the layer infos of a 784 -> n -> 10 network
+    """
+    m = int(np.prod(IMAGE))
+    return [
+        (rsnn.Dense, rng.standard_normal((m, n)) * 4),
+        (rsnn.Dense, rng.standard_normal((n, 10)) * 4)
+    ]
+
+def conv_layers(k, f, rng):
+    """
+    Returns the layer infos of a conv -> pool -> conv -> pool stack
+    """
+    layers, shape = [], IMAGE
+    for filters in (f, 2 * f):
+        layers.append((rsnn.Conv2D, {
+            'input_shape': shape,
+            'kernel_shape': (k, k, shape[2], filters),
+            'weights': rng.standard_normal((k, k, shape[2], filters)) * 4,
+            'padding': 'valid',
+            'strides': (1, 1)
+        }))
+        shape = (shape[0] - k + 1, shape[1] - k + 1, filters)
+
+        layers.append((rsnn.Pooling, {'input_shape': shape, 'pool_size': (2, 2)}))
+        shape = (shape[0] // 2, shape[1] // 2, filters)
+
+    return layers
+
+def core_model(layers, benchmark):
+    """
+    Builds a resnnance.core model
+    """
+    with benchmark.phase('build'):
+        model = rsnn.Model()
+        model.add_layer(rsnn.Input('input', int(np.prod(IMAGE))))
+        for i, (layer_class, info) in enumerate(layers):
+            model.add_layer(layer_class(f"layer{i}", info))
+
+    return model
+
+def pynn_model(layers, benchmark):
+    """
+    Builds a model through the PyNN frontend
+    """
+    import resnnance.pyNN as sim
+    from resnnance.pyNN import simulator
+
+    sim.setup()
+
+    with benchmark.phase('connect'):
+        pre = sim.Population(int(np.prod(IMAGE)), sim.IF_curr_exp(), label='input')
+        for i, (layer_class, info) in enumerate(layers):
+            if layer_class is rsnn.Dense:
+                m, n = info.shape
+                pres, posts = np.meshgrid(np.arange(m), np.arange(n), indexing='ij')
+                connections = np.column_stack([pres.ravel(), posts.ravel(), info.ravel(), np.zeros(m * n)])
+                connector = sim.FromListConnector(connections, column_names=['weight', 'delay'])
+            else:
+                n = layer_class('size', info).get_neurons()
+                connector = {rsnn.Conv2D: sim.ConvConnector, rsnn.Pooling: sim.PoolConnector}[layer_class](info)
+
+            post = sim.Population(n, sim.IF_curr_exp(), label=f"layer{i}")
+            sim.Projection(pre, post, connector)
+            pre = post
+
+    with benchmark.phase('build'):
+        simulator.state.builder.build()
+    model = simulator.state.model
+
+    sim.end()
+    return model
+
+def compile_phases(model, benchmark, path):
+    """
+    Times template parameters, rendering and file writes of a model
+    """
+    with benchmark.phase('params'):
+        for layer in model.layers:
+            layer.get_template_params()
+
+    # Warm-up compile (template cache), then a full one split by its metrics
+    compiler = Compiler()
+    compiler.compile(model, path)
+    shutil.rmtree(path)
+
+    metrics = resnnance_metrics()
+    metrics.reset()
+    with benchmark.phase('compile'):
+        compiler.compile(model, path)
+    data = metrics.export()
+
+    write = data['counters'].get('write_time', 0.0)
+    for phase, seconds in [('render', data['totals']['compile']['time'] - write), ('write', write)]:
+        benchmark.records.append(dict(benchmark.key, phase=phase, time=seconds, peak=None))
+
+def commit():
+    """
+    Returns the benchmarked git commit (None outside a repository)
+    """
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                universal_newlines=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile-side benchmarks on synthetic models")
+    parser.add_argument("--output", help="JSON output file (default: stdout)")
+    parser.add_argument("--dense", type=int, nargs="*", default=DENSE, help="hidden sizes of the dense models")
+    parser.add_argument("--frontend", choices=["core", "pyNN", "all"], default="all")
+    parser.add_argument("--no-memory", action="store_true", help="skip peak memory tracing (lower overhead)")
+    args = parser.parse_args(argv)
+
+    # Benchmark output only
+    logging.disable(logging.INFO)
+
+    rng = np.random.default_rng(0)
+    models = [(f"dense-784-{n}-10", dense_layers(n, rng)) for n in args.dense]
+    models += [(f"conv-k{k}-f{f}", conv_layers(k, f, rng)) for k, f in CONV]
+    frontends = ["core", "pyNN"] if args.frontend == "all" else [args.frontend]
+
+    benchmark = Benchmark(memory=not args.no_memory)
+    path = tempfile.mkdtemp(prefix="resnnance-bench-")
+    try:
+        for name, layers in models:
+            for frontend in frontends:
+                benchmark.key = {'model': name, 'frontend': frontend}
+                start = len(benchmark.records)
+
+                build = core_model if frontend == "core" else pynn_model
+                model = build(layers, benchmark)
+                compile_phases(model, benchmark, os.path.join(path, f"{name}-{frontend}"))
+
+                for record in benchmark.records[start:]:
+                    peak = "" if record['peak'] is None else f"{record['peak'] / 2**20:>10.1f} MiB"
+                    print(f"{name:<20}{frontend:<6}{record['phase']:<8}{record['time']:>10.3f} s{peak}", file=sys.stderr)
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    result = {
+        'commit': commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': benchmark.records
+    }
+
+    if args.output is None:
+        json.dump(result, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, mode="w") as output:
+            json.dump(result, output, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,4 @@
 from .model import Model
-from .layers import *
\ No newline at end of file
+from .layers import *
+from .results import BatchResults
+from .logger import resnnance_metrics
\ No newline at end of file
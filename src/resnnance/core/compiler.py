@@ -1,17 +1,111 @@
-from .logger import resnnance_logger
+from .logger    import resnnance_logger, resnnance_metrics
+from .estimator import Estimator
 
-import os, shutil
+import os, json, time, shutil, hashlib, threading
 import jinja2
 import numpy as np
 
+from concurrent.futures import ProcessPoolExecutor
+
+# Memory init file lines (and template words) written per chunk
+CHUNK = 2**16
+
+# Memory init file hex digits (16-bit two's complement words, read with hread)
+DIGITS = b"0123456789ABCDEF"
+
+# Rendered template text written per buffer (characters)
+BUFFER = 2**16
+
+def default_cache():
+    """
+    Returns the default compiled template cache directory, under
+    $XDG_CACHE_HOME (~/.cache when unset, empty or relative)
+    """
+    home = os.environ.get("XDG_CACHE_HOME", "")
+    if not os.path.isabs(home):
+        home = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(home, "resnnance", "jinja")
+
+# Default compiled template cache
+CACHE = default_cache()
+
+# Build manifest (file content hashes and layer outputs)
+MANIFEST = "resnnance.json"
+MANIFEST_VERSION = 1
+
+def words(data, chunk=CHUNK):
+    """
+    Formats an array as comma separated integer words, chunk words per
+    string (Jinja filter, rows are formatted only while they are rendered)
+    """
+    data = np.ravel(data)
+    for start in range(0, data.size, chunk):
+        yield ", ".join(map(str, data[start:start + chunk].tolist()))
+
+def hexlines(data):
+    """
+    Formats integer words as 4-digit hex lines of their 16-bit two's
+    complement (as np.savetxt(fmt='%04X') of the unsigned words), with
+    array operations only
+    """
+    data = np.ravel(data).astype(np.uint16)
+    lines = np.empty((data.size, 5), dtype=np.uint8)
+    lines[:, :4] = np.frombuffer(DIGITS, dtype=np.uint8)[(data[:, None] >> np.array([12, 8, 4, 0], dtype=np.uint16)) & 0xF]
+    lines[:, 4] = ord("\n")
+    return lines.tobytes()
+
+# Batch testbench log (test subpath) and tick cycle margin over the estimate
+BATCH_LOG = "batch.log"
+BATCH_MARGIN = 16
+
+class BytecodeCache(jinja2.FileSystemBytecodeCache):
+    """
+    Compiled template cache directory, created when the first template is
+    stored. Templates are compiled on every run instead (no cache) once
+    the directory cannot be created, read or written
+    """
+
+    def __init__(self, directory, logger):
+        super().__init__(directory)
+        self.logger = logger
+        self.enabled = True
+
+    def load_bytecode(self, bucket):
+        if self.enabled:
+            try:
+                super().load_bytecode(bucket)
+            except OSError as error:
+                self.__disable(error)
+
+    def dump_bytecode(self, bucket):
+        if self.enabled:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                super().dump_bytecode(bucket)
+            except OSError as error:
+                self.__disable(error)
+
+    def __disable(self, error):
+        self.enabled = False
+        self.logger.warning(f"Compiled template cache disabled: {error}")
+
 class Compiler(object):
 
-    def __init__(self, build_path=None):
+    def __init__(self, build_path=None, mem=False, jobs=1, cache=CACHE):
         # Log
         self.logger = resnnance_logger("compiler")
+        self.metrics = resnnance_metrics()
+
+        # Compiled template cache (shared between runs, None to disable)
+        self.cache = cache
+        if cache is None:
+            bcc = None
+        else:
+            bcc = BytecodeCache(cache, self.logger)
 
         # Create templating environment
-        self.env = jinja2.Environment(loader=jinja2.PackageLoader("resnnance.core", "templates"))
+        self.env = jinja2.Environment(loader=jinja2.PackageLoader("resnnance.core", "templates"), bytecode_cache=bcc)
+        self.env.filters['words'] = words
 
         # Set default build path
         if build_path is None:
@@ -19,26 +113,89 @@ class Compiler(object):
         else:
             self.build_path = build_path
 
+        # Load layer weights from memory init files instead of VHDL constants
+        self.mem = mem
+
+        # Layer rendering worker processes
+        self.jobs = jobs
 
-    def compile(self, model, path=None):
+        # Build manifest (previous compile) and file hashes of this compile
+        self.manifest = {}
+        self.files = {}
+
+
+    def compile(self, model, path=None, mem=None, jobs=None, batch=None):
+        """
+        Renders the model build tree
+
+        batch adds the batch inference testbench (test/batch_tb.vhd):
+        {'file': batched input memory file (Input.export), 'samples': N,
+        'ticks': ticks per sample, 'rest': rest ticks between samples
+        (default 0), 'cycles': clock cycles per tick (default estimated)}
+        """
         self.logger.info("Compiling Resnnance model...")
 
         # Set build path
         if not path is None:
             self.build_path = path
 
+        # Set weight output mode
+        if not mem is None:
+            self.mem = mem
+
+        # Set layer rendering workers
+        if not jobs is None:
+            self.jobs = jobs
+
         # Compile model
         #   One snap per layer
         #   One network wrapper
         #   One network controller
         #   One engine (RISC-V peripheral)
 
+        with self.metrics.span("compile", layers=len(model.layers)):
+            self.__compile(model, batch)
+
+        self.logger.info("Compiling Resnnance model - OK")
+
+
+    def __compile(self, model, batch):
+        # Layers are wired to their predecessor in model order (network.vhd, memory.vhd)
+        graph = model.get_graph()
+        for pre, post in zip(model.layers, model.layers[1:]):
+            if list(graph.predecessors(post.label)) != [pre.label]:
+                raise ValueError(f"Only sequential models can be compiled: {post.label} is not fed by {pre.label}")
+
+        # Load previous build manifest
+        self.__load_manifest()
+        self.files = {}
+
         # Create build skeleton
         self.__build_skeleton()
         self.__build_files()
 
-        # Render layers
-        [self.__render_layer(layer, os.path.join("src", "layers")) for layer in model.layers]
+        # Render layers (in parallel processes, logged in model order)
+        subpath = os.path.join("src", "layers")
+        if self.jobs > 1 and len(model.layers) > 1:
+            options = {'build_path': self.build_path, 'mem': self.mem, 'cache': self.cache}
+            with ProcessPoolExecutor(max_workers=min(self.jobs, len(model.layers)), initializer=render_init,
+                                     initargs=(options, self.manifest)) as pool:
+                # One layer per task (memory-mapped weights are sent as file references)
+                futures = [pool.submit(render_run, layer, subpath) for layer in model.layers]
+                results = [future.result() for future in futures]
+
+            # Worker file hashes and metrics
+            created = []
+            for outputs, files, metrics in results:
+                created.append(outputs)
+                self.files.update(files)
+                self.metrics.merge(metrics)
+        else:
+            created = [self.render_layer(layer, subpath) for layer in model.layers]
+
+        for subfile, written in [output for outputs in created for output in outputs]:
+            if written:
+                self.logger.info(f"Created {subfile}")
 
         # Render simtick file
         params = {}
@@ -51,9 +208,13 @@ class Compiler(object):
                 {
                     'label': layer.label,
                     'templates': list(layer.templates.keys()),
-                    'logn': layer.get_logn()
+                    'logn': layer.get_logn(),
+                    'size': layer.get_neurons(),
+                    'parallel': layer.parallel,
+                    'slice': layer.get_slice()
                 } for layer in model.layers
-            ]
+            ],
+            'batch': None if batch is None else self.__batch_params(model, batch)
         }
         self.__render_template(os.path.join("hw", "network.vhd"), params, os.path.join("src", "network.vhd"))
 
@@ -64,11 +225,37 @@ class Compiler(object):
         # Render build test list
         self.__render_template(os.path.join("build", "test", "CMakeLists.txt"), params, os.path.join("test", "CMakeLists.txt"))
         self.__render_template(os.path.join("build", "test", "network_tb.vhd"), params, os.path.join("test", "network_tb.vhd"))
+        if not batch is None:
+            self.__render_template(os.path.join("build", "test", "batch_tb.vhd"), params, os.path.join("test", "batch_tb.vhd"))
 
         # Render build list
         self.__render_template(os.path.join("build", "CMakeLists.txt"), params, "CMakeLists.txt")
 
-        self.logger.info("Compiling Resnnance model - OK")
+        # Remove outputs of deleted layers and update manifest
+        self.__clean()
+        self.__save_manifest({
+            layer.label: [subfile for subfile, _ in outputs] for layer, outputs in zip(model.layers, created)
+        })
+
+
+    def __batch_params(self, model, batch):
+        """
+        Completes the batch testbench options (absolute paths, tick cycles)
+        """
+        params = {'rest': 0, **batch}
+        params['file'] = os.path.abspath(batch['file'])
+        params['log']  = self.batch_log()
+        if params.get('cycles') is None:
+            cycles = Estimator().estimate(model, log=False)['network']['cycles']
+            params['cycles'] = cycles + BATCH_MARGIN
+        return params
+
+
+    def batch_log(self):
+        """
+        Returns the batch testbench log path of the current build
+        """
+        return os.path.abspath(os.path.join(self.build_path, "test", BATCH_LOG))
 
 
     def __build_skeleton(self):
@@ -82,42 +269,268 @@ class Compiler(object):
 
     def __build_files(self):
         ppath = os.path.dirname(__file__)
-        shutil.copytree(os.path.join(ppath, "templates/build/cmake"), os.path.join(self.build_path, "cmake"), dirs_exist_ok=True)
-        shutil.copy(os.path.join(ppath, "templates/build/build.sh"), os.path.join(self.build_path, "build.sh"))
+
+        # Static build files (build subpath, package path)
+        files = [
+            (os.path.join("cmake", filename), os.path.join(ppath, "templates/build/cmake", filename))
+            for filename in sorted(os.listdir(os.path.join(ppath, "templates/build/cmake")))
+        ]
+        files.append(("build.sh", os.path.join(ppath, "templates/build/build.sh")))
+
+        for subfile, srcpath in files:
+            with open(srcpath, mode="rb") as source:
+                content = source.read()
+            if self.__write_file(subfile, content):
+                shutil.copymode(srcpath, os.path.join(self.build_path, subfile))
+                self.logger.info(f"Created {subfile}")
 
 
     def __render_template(self, tmppath, params, filename, subpath=None):
-        template = self.env.get_template(tmppath)
-        content  = template.render(**params)
+        subfile, written = self.__write_template(tmppath, params, filename, subpath)
+        if written:
+            self.logger.info(f"Created {subfile}")
+
 
-        # Write to file
+    def __write_template(self, tmppath, params, filename, subpath=None):
+        """
+        Renders a template into a file and returns its build subpath
+        and whether it was written
+        """
         if subpath is None:
             subfile = filename
         else:
             subfile = os.path.join(subpath, filename)
 
-            # Generate directories for subpath
-            if not os.path.exists(os.path.join(self.build_path, subpath)):
-                os.makedirs(os.path.join(self.build_path, subpath))
+        # Stream the rendered text to file
+        with self.metrics.span("render_template", template=tmppath):
+            template = self.env.get_template(tmppath)
+            written  = self.__write_stream(subfile, self.__buffer(template.generate(**params)))
+        self.metrics.count("templates_rendered")
+
+        return subfile, written
+
+
+    def __buffer(self, strings):
+        """
+        Joins a string stream into UTF-8 encoded chunks of about BUFFER characters
+        """
+        buffer, size = [], 0
+        for string in strings:
+            buffer.append(string)
+            size += len(string)
+            if size >= BUFFER:
+                yield "".join(buffer).encode("utf-8")
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer).encode("utf-8")
+
+
+    def __write_stream(self, subfile, chunks):
+        """
+        Writes a bytes chunk iterable to a build file through a temporary
+        file, hashed while it is written, and keeps it only when the content
+        hash changed (as __write_file)
+        """
+        filepath = os.path.join(self.build_path, subfile)
+        temppath = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+
+        # Temporary file removed when unchanged, or when rendering or writing fails
+        try:
+            # File write time (write_time metric, the chunks are rendered in between)
+            digest = hashlib.sha256()
+            size, elapsed = 0, 0.0
+            with open(temppath, mode="wb") as message:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    start = time.perf_counter()
+                    size += message.write(chunk)
+                    elapsed += time.perf_counter() - start
+            digest = digest.hexdigest()
+            self.files[subfile] = digest
+
+            start = time.perf_counter()
+            if os.path.exists(filepath):
+                if self.manifest.get('files', {}).get(subfile) == digest or (
+                   os.path.getsize(filepath) == size and self.__digest(filepath) == digest):
+                    self.metrics.count("write_time", elapsed + time.perf_counter() - start)
+                    return False
+
+            os.replace(temppath, filepath)
+            self.metrics.count("write_time", elapsed + time.perf_counter() - start)
+            self.metrics.count("files_written")
+            self.metrics.count("bytes_written", size)
+            return True
+        finally:
+            if os.path.exists(temppath):
+                os.remove(temppath)
+
+
+    def __digest(self, filepath):
+        """
+        Returns the content hash of a file, read in chunks
+        """
+        digest = hashlib.sha256()
+        with open(filepath, mode="rb") as message:
+            for chunk in iter(lambda: message.read(BUFFER), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+    def __write_file(self, subfile, content, digest=None):
+        """
+        Writes content (bytes or a bytes chunk iterable) to a build file,
+        skipped when the file already holds the same content hash
+
+        Unchanged files keep their timestamps, so the HDL build only
+        re-analyzes the files that actually changed
+        """
+        if digest is None:
+            digest = hashlib.sha256(content).hexdigest()
+        self.files[subfile] = digest
 
         # Create complete filepath
         filepath = os.path.join(self.build_path, subfile)
 
-        with open(filepath, mode="w", encoding="utf-8") as message:
-            message.write(content)
-            self.logger.info(f"Created {subfile}")
+        if os.path.exists(filepath):
+            if self.manifest.get('files', {}).get(subfile) == digest:
+                return False
+            if isinstance(content, bytes) and os.path.getsize(filepath) == len(content):
+                with open(filepath, mode="rb") as message:
+                    if message.read() == content:
+                        return False
+
+        # Generate directories for subfile
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
 
+        # File write time (write_time metric, chunks are formatted in between)
+        size, elapsed = 0, 0.0
+        with open(filepath, mode="wb") as message:
+            for chunk in [content] if isinstance(content, bytes) else content:
+                start = time.perf_counter()
+                size += message.write(chunk)
+                elapsed += time.perf_counter() - start
 
-    def __render_layer(self, layer, subpath=None):
+        self.metrics.count("write_time", elapsed)
+        self.metrics.count("files_written")
+        self.metrics.count("bytes_written", size)
+        return True
+
+
+    def render_layer(self, layer, subpath=None):
         """
         Renders a layer into a set of VHDL files
         defined from templates in the layer class
+
+        Returns the (file, written) outputs (logged by the caller, so the
+        log order does not depend on the rendering order)
         """
+        with self.metrics.span("render_layer", layer=layer.label):
+            created = []
+
+            # Write layer memory init files
+            files = {}
+            if self.mem:
+                for key, data in layer.get_memories().items():
+                    subfile = os.path.join(subpath, f"{layer.label}", f"{layer.label}_{key}.mem")
+                    files[f"{key}_file"], written = self.__write_memory(data, subfile)
+                    created.append((subfile, written))
+
+            # Render all layer templates
+            for key, tmppath in layer.templates.items():
+                # Get layer parameters for each template
+                params = dict(layer.get_template_params()[key], **files)
+                # Render each layer template
+                created.append(self.__write_template(tmppath, params, f"{params['name']}_{key}.vhd",
+                                                     os.path.join(subpath, f"{layer.label}")))
+
+        return created
+
+
+    def __write_memory(self, data, subfile):
+        """
+        Writes a memory init file (one 16-bit two's complement hex word per
+        line, as read by hread) and returns its absolute path and whether
+        it was written
+        """
+        filepath = os.path.abspath(os.path.join(self.build_path, subfile))
+        words    = np.ravel(data)
+
+        # Hash the (16-bit) words instead of the (larger) text file, chunk by chunk
+        digest = hashlib.sha256(b"%04X\n")
+        for start in range(0, words.size, CHUNK):
+            digest.update(words[start:start + CHUNK].astype(np.uint16).tobytes())
+        digest = digest.hexdigest()
+
+        chunks = (hexlines(words[start:start + CHUNK]) for start in range(0, words.size, CHUNK))
+
+        return filepath, self.__write_file(subfile, chunks, digest)
+
+
+    def __load_manifest(self):
+        """
+        Loads the manifest of the previous compile in the build path
+        """
+        self.manifest = {}
+
+        filepath = os.path.join(self.build_path, MANIFEST)
+        if os.path.exists(filepath):
+            with open(filepath, mode="r", encoding="utf-8") as message:
+                manifest = json.load(message)
+            if manifest.get('version') == MANIFEST_VERSION:
+                self.manifest = manifest
+
+
+    def __save_manifest(self, layers):
+        """
+        Writes the file content hashes and the files produced by each layer
+        """
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'layers':  layers,
+            'files':   dict(sorted(self.files.items()))
+        }
+
+        with open(os.path.join(self.build_path, MANIFEST), mode="w", encoding="utf-8") as message:
+            json.dump(manifest, message, indent=4)
+
+
+    def __clean(self):
+        """
+        Removes files from the previous compile that were not produced again
+        (e.g. deleted or renamed layers)
+        """
+        for subfile in sorted(set(self.manifest.get('files', {})) - set(self.files)):
+            filepath = os.path.join(self.build_path, subfile)
+            if os.path.exists(filepath):
+                os.remove(filepath)
+                self.logger.info(f"Removed {subfile}")
+
+            # Remove empty layer directories
+            subpath = os.path.dirname(filepath)
+            if os.path.isdir(subpath) and not os.listdir(subpath):
+                os.rmdir(subpath)
+
+# Layer rendering worker (one per process)
+worker = None
+
+def render_init(options, manifest):
+    """
+    Creates the worker compiler of a parallel compile, with the manifest
+    of the previous compile (unchanged files are not written)
+    """
+    global worker
+    worker = Compiler(**options)
+    worker.manifest = manifest
+
+    # Metrics recorded by the parent before the fork
+    resnnance_metrics().drain()
 
-        # Render all layer templates
-        for key, tmppath in layer.templates.items():
-            # Get layer parameters for each template
-            params = layer.get_template_params()[key]
-            # Render each layer template
-            self.__render_template(tmppath, params, f"{params['name']}_{key}.vhd",
-                                   os.path.join(subpath, f"{layer.label}"))
\ No newline at end of file
+def render_run(layer, subpath):
+    """
+    Renders a layer and returns its outputs, the file hashes and the
+    metrics recorded while rendering it
+    """
+    worker.files = {}
+    created = worker.render_layer(layer, subpath)
+    return created, worker.files, resnnance_metrics().drain()
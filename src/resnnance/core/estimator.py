@@ -0,0 +1,167 @@
+from .logger import resnnance_logger
+from .layers import Input, Dense, Conv2D, Pooling
+
+import numpy as np
+
+# Memory word widths (*_npu_aux.vhd, poisson_aux.vhd)
+X_BITS     = 16     # x_t
+PIXEL_BITS = 8      # Input memory word
+
+# Default target
+CLOCK  = 100e6      # Clock frequency (Hz)
+BLOCK  = 36 * 1024  # BRAM block size (bits)
+LUTRAM = 64 * 16    # Largest memory mapped to distributed RAM (bits)
+
+class Estimator(object):
+    """
+    Analytic resource and throughput model of the generated hardware
+
+    Memories are counted in bits, replicated for every NPU instance.
+    Weight groups are split into separately ported memories (one per
+    synapse row, 'banks'). Memories of up to lutram bits are mapped to
+    distributed RAM, larger ones are rounded up to half BRAM blocks (two
+    independent memories share one block).
+    Cycles per tick follow the layer controllers. Layers run concurrently
+    on every tick, so the slowest one bounds the tick rate.
+    """
+
+    def __init__(self):
+        # Log
+        self.logger = resnnance_logger("estimator")
+
+    def estimate(self, model, clock=CLOCK, block=BLOCK, lutram=LUTRAM, log=True):
+        """
+        Returns the memories (bits), BRAM blocks, distributed RAM bits,
+        cycles per tick and maximum tick rate of every layer and of the
+        whole network
+        """
+        layers = {}
+        for layer in model.layers:
+            estimate = Estimator.conversion[layer.__class__](layer)
+
+            # Layer memories (one set per NPU instance)
+            p = layer.parallel
+            banks = estimate.pop('banks', {})
+            estimate['parallel'] = p
+            estimate['memories'] = {key: p * bits for key, bits in estimate['memories'].items()}
+
+            # Inter-layer spike memory (memory.vhd)
+            estimate['memories']['smem'] = 2**layer.get_logn()
+
+            # Every bank is a separate memory
+            halves = 0
+            estimate['lutram'] = 0
+            for key, bits in estimate['memories'].items():
+                n = (p if key != 'smem' else 1) * banks.get(key, 1)
+                size = bits // n
+                if size <= lutram:
+                    estimate['lutram'] += bits
+                else:
+                    halves += n * int(np.ceil(size / (block / 2)))
+            estimate['blocks'] = -(-halves // 2)
+
+            estimate['bits']   = sum(estimate['memories'].values())
+            estimate['rate']   = clock / estimate['cycles']
+            layers[layer.label] = estimate
+
+        network = {
+            'bits':   sum(estimate['bits'] for estimate in layers.values()),
+            'blocks': sum(estimate['blocks'] for estimate in layers.values()),
+            'lutram': sum(estimate['lutram'] for estimate in layers.values()),
+            'cycles': max([estimate['cycles'] for estimate in layers.values()], default=0),
+            'clock':  clock
+        }
+        network['rate'] = clock / network['cycles'] if network['cycles'] else 0.0
+
+        if log:
+            self.__log(layers, network)
+        return {'layers': layers, 'network': network}
+
+    def __log(self, layers, network):
+        self.logger.info(f"{'layer':<16}{'bits':>12}{'blocks':>8}{'lutram':>12}{'cycles':>10}{'tick rate':>14}")
+        for label, estimate in layers.items():
+            self.logger.info(f"{label:<16}{estimate['bits']:>12}{estimate['blocks']:>8}{estimate['lutram']:>12}"
+                             f"{estimate['cycles']:>10}{estimate['rate']:>12.1f}/s")
+        self.logger.info(f"{'network':<16}{network['bits']:>12}{network['blocks']:>8}{network['lutram']:>12}"
+                         f"{network['cycles']:>10}{network['rate']:>12.1f}/s")
+
+    def __estimate_input(layer):
+        n = layer.get_size()
+
+        # One pixel read per cycle
+        return {
+            'memories': {'mem': n * PIXEL_BITS},
+            'cycles': 1 + n
+        }
+
+    def __estimate_dense(layer):
+        m, n = layer.shape
+        bits = layer.bits
+
+        if layer.sparse:
+            nnz = len(layer.weights)
+            words = max(nnz, 1)     # fc_words (at least one synapse memory word)
+
+            # Worst case: input scan, every synapse row walked, neuron sweep
+            return {
+                'memories': {
+                    'x_mem': n * X_BITS,
+                    'w_mem': words * bits,
+                    'ptr':   (m + 1) * int(np.ceil(np.log2(nnz + 1))),
+                    'idx':   words * layer.get_logn()
+                },
+                'cycles': 1 + 2 * m + nnz + n + 2
+            }
+
+        # Inputs and neuron slice swept together, then the NPU pipeline drains
+        ns = layer.get_slice()
+        return {
+            'memories': {
+                'x_mem':   ns * X_BITS,
+                'so_mem':  ns,
+                'w_group': m * ns * bits
+            },
+            'banks': {'w_group': m},    # w_group(synapse) memories of ns weights (fc_npu.vhd)
+            'cycles': 1 + max(m, ns) + m + 4
+        }
+
+    def __estimate_conv2d(layer):
+        my, mx, mz    = layer.input_shape
+        ky, kx, kz, f = layer.kernel_shape
+        ny, nx, _     = layer.get_output_shape()
+        k    = ky * kx * kz
+        fs   = -(-f // layer.parallel)
+        bits = layer.bits
+
+        # Full input sweep per kernel of the NPU slice, then the NPU pipeline drains
+        return {
+            'memories': {
+                'x_mem':   ny * nx * fs * X_BITS,
+                'so_mem':  ny * nx * fs,
+                'w_group': k * fs * bits
+            },
+            'banks': {'w_group': k},    # w_group(synapse) memories of fs weights (conv2D_npu.vhd)
+            'cycles': 1 + fs * my * mx * mz + k + 4
+        }
+
+    def __estimate_pooling(layer):
+        my, mx, mz = layer.input_shape
+        ny, nx, _  = layer.get_output_shape()
+        py, px     = layer.pool
+
+        # Single input sweep, then the NPU pipeline drains
+        return {
+            'memories': {
+                'x_mem':  ny * nx * mz * X_BITS,
+                'so_mem': ny * nx * mz
+            },
+            'cycles': 1 + my * mx * mz + py * px + 4
+        }
+
+    # Resnnance layer to estimation function conversion table
+    conversion = {
+        Input:   __estimate_input,
+        Dense:   __estimate_dense,
+        Conv2D:  __estimate_conv2d,
+        Pooling: __estimate_pooling,
+    }
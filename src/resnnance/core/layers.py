@@ -1,19 +1,90 @@
+from .quantizer import WIDTH, quantize, pixel_conv
+
+import os
+import mmap
+import itertools
 import numpy as np
 
 DEFAULT = 1
 
+# Input samples converted per chunk
+CHUNK = 1024
+
+def lazy(data):
+    """
+    Keeps np.memmap and lazily loaded arrays (any object with a shape and
+    first axis slicing, e.g. h5py or zarr datasets) as they are, so their
+    data is only read when the layer is quantized
+    """
+    if hasattr(data, 'shape') and hasattr(data, '__getitem__'):
+        return data
+    return np.asarray(data)
+
+class Mapped(object):
+    """
+    File reference of a read-only memory-mapped array, pickled instead of
+    its data (e.g. layers sent to compiler worker processes map the file
+    again)
+    """
+
+    def __init__(self, data):
+        self.filename = data.filename
+        self.offset   = data.offset
+        self.dtype    = data.dtype
+        self.shape    = data.shape
+        self.order    = 'F' if data.flags.f_contiguous and not data.flags.c_contiguous else 'C'
+
+    @staticmethod
+    def mappable(data):
+        # Whole file mappings only (views of a memmap do not know their offset)
+        return isinstance(data, np.memmap) and isinstance(data.base, mmap.mmap) and data.mode == 'r'
+
+    def open(self):
+        return np.memmap(self.filename, dtype=self.dtype, mode='r', shape=self.shape, order=self.order,
+                         offset=self.offset)
+
 class Layer(object):
     templates = None
 
+    # Weight quantization (bits, granularity)
+    _bits = WIDTH               # Weight width
+    _granularity = 'layer'      # One scale per 'layer' or per 'channel'
+    _quantization = None
+
+    # NPU instances (neuron slices processed in parallel)
+    parallel = 1
+
+    # Bumped on every weight change (prepared simulator weights are reloaded)
+    version = 0
+
     def __init__(self, label, info=None):
         raise NotImplementedError
 
+    def __getstate__(self):
+        # Memory-mapped arrays are pickled as file references
+        return {key: Mapped(value) if Mapped.mappable(value) else value for key, value in self.__dict__.items()}
+
+    def __setstate__(self, state):
+        self.__dict__.update({key: value.open() if isinstance(value, Mapped) else value for key, value in state.items()})
+
     def set_layer(self, info):
         raise NotImplementedError
     
     def get_size(self):
         raise NotImplementedError
 
+    def get_info(self):
+        """
+        Returns the layer info (as taken by set_layer)
+        """
+        raise NotImplementedError
+
+    def get_neurons(self):
+        """
+        Returns the number of layer neurons (spike memory entries)
+        """
+        raise NotImplementedError
+
     def get_logn(self):
         raise NotImplementedError
 
@@ -24,6 +95,102 @@ class Layer(object):
         """
         raise NotImplementedError
 
+    def get_memories(self):
+        """
+        Returns the quantized contents of all layer memories that can be
+        loaded from init files, in file order
+        """
+        return {}
+
+    def get_channel_weights(self):
+        """
+        Returns the layer weights, the channel of every weight and the
+        number of channels (None for layers without weights)
+        """
+        return None
+
+    def set_parallel(self, parallel):
+        """
+        Sets the number of NPU instances the layer neurons are split across
+        """
+        if parallel != 1:
+            raise ValueError(f"{self.__class__.__name__} layers do not support NPU replication")
+        self.parallel = parallel
+
+    def get_slice(self):
+        """
+        Returns the number of neurons owned by each NPU instance
+        """
+        return -(-self.get_neurons() // self.parallel)
+
+    def quantize(self, bits=None, granularity=None):
+        """
+        Sets the weight width and scale granularity ('layer' or 'channel')
+        and returns the quantization report
+        """
+        if not bits is None:
+            self.bits = bits
+        if not granularity is None:
+            self.granularity = granularity
+
+        self.changed()
+        quantization = self.get_quantization()
+        if quantization is None:
+            return None
+
+        return dict(quantization['report'], granularity=self.granularity)
+
+    @property
+    def bits(self):
+        return self._bits
+
+    @bits.setter
+    def bits(self, bits):
+        # Weight width (drops the cached quantization)
+        if not 2 <= bits <= WIDTH:
+            raise ValueError(f"Weight width must be between 2 and {WIDTH} bits")
+        self._bits = bits
+        self.changed()
+
+    @property
+    def granularity(self):
+        return self._granularity
+
+    @granularity.setter
+    def granularity(self, granularity):
+        # Scale granularity (drops the cached quantization)
+        if granularity not in ('layer', 'channel'):
+            raise ValueError(f"Unknown quantization granularity: {granularity}")
+        self._granularity = granularity
+        self.changed()
+
+    def changed(self):
+        """
+        Drops the cached quantization and bumps the layer version
+        """
+        self._quantization = None
+        self.version += 1
+
+    def get_quantization(self):
+        """
+        Returns the quantized weights, width and shift per channel
+        (cached until the layer or its quantization changes)
+        """
+        if self._quantization is None:
+            channel_weights = self.get_channel_weights()
+            if channel_weights is None:
+                return None
+
+            weights, channels, n = channel_weights
+            if self.granularity == 'layer':
+                quantization = quantize(weights, self.bits)
+                quantization['shift'] = np.repeat(quantization['shift'], n)
+            else:
+                quantization = quantize(weights, self.bits, channels, n)
+            self._quantization = quantization
+
+        return self._quantization
+
 class Input(Layer):
     templates = {
         'core': "hw/layers/input/poisson_core.vhd",
@@ -33,6 +200,8 @@ class Input(Layer):
     def __init__(self, label, info=None):
         self.label = "layer_" + label
 
+        self.file = None    # Input memory init file (None: constant memory)
+
         if info is None:
             self.n = None
         else:
@@ -40,6 +209,63 @@ class Input(Layer):
     
     def set_layer(self, info):
         self.n = info     # Neuron outputs
+        self.changed()
+
+    def get_info(self):
+        return self.n
+
+    def set_file(self, path):
+        """
+        Sets the init file the input memory is loaded from (None to use
+        the constant memory contents)
+        """
+        self.file = None if path is None else os.path.abspath(path)
+        self.changed()
+
+    def export(self, dataset, path, batch=1, peak=None, chunk=CHUNK):
+        """
+        Streams a dataset (array, memmap or sample iterable) into input
+        memory init files, batch samples per file, and returns their paths
+
+        Samples are flattened in neuron order and converted to input
+        memory words (pixel_conv) chunk by chunk, so the dataset is never
+        loaded as a whole. Each file holds one word per line, sample after
+        sample.
+        """
+        os.makedirs(path, exist_ok=True)
+        n = self.get_size()
+
+        # Chunks of samples
+        if isinstance(dataset, np.ndarray):
+            chunks = (dataset[start:start + chunk] for start in range(0, len(dataset), chunk))
+        else:
+            samples = iter(dataset)
+            chunks = iter(lambda: list(itertools.islice(samples, chunk)), [])
+
+        files = []
+        message = None
+        count = 0
+        try:
+            for data in chunks:
+                words = pixel_conv(np.asarray(data).reshape(len(data), -1), peak)
+                if words.shape[1] != n:
+                    raise ValueError(f"Samples hold {words.shape[1]} values, {self.label} has {n} neurons")
+
+                for sample in words:
+                    # New file every batch samples
+                    if count % batch == 0:
+                        if message is not None:
+                            message.close()
+                        files.append(os.path.abspath(os.path.join(path, f"{self.label}_{len(files):06d}.mem")))
+                        message = open(files[-1], mode="w", encoding="utf-8")
+
+                    message.write("\n".join(map(str, sample.tolist())) + "\n")
+                    count += 1
+        finally:
+            if message is not None:
+                message.close()
+
+        return files
 
     def get_size(self):
         if self.n is None:
@@ -47,6 +273,9 @@ class Input(Layer):
         else:
             return self.n
 
+    def get_neurons(self):
+        return self.get_size()
+
     def get_logn(self):
         if self.n is None:
             return DEFAULT
@@ -55,7 +284,7 @@ class Input(Layer):
 
     def get_template_params(self):
         params = {
-            'core': {'name': self.label},
+            'core': {'name': self.label, 'file': self.file},
             'aux': {
                 'name': self.label,
                 'n': self.get_size()
@@ -71,48 +300,135 @@ class Dense(Layer):
         'npu_aux': "hw/layers/fc/npu/fc_npu_aux.vhd",
         'npu':     "hw/layers/fc/npu/fc_npu.vhd"
     }
+    sparse_templates = {
+        'core':    "hw/layers/fc/fc_sparse_core.vhd",
+        'config':  "hw/layers/fc/fc_sparse_config.vhd",
+        'ctrl':    "hw/layers/fc/ctrl/fc_sparse_ctrl.vhd",
+        'npu_aux': "hw/layers/fc/npu/fc_sparse_npu_aux.vhd",
+        'npu':     "hw/layers/fc/npu/fc_sparse_npu.vhd"
+    }
 
     def __init__(self, label, info=None):
         self.label = "layer_" + label
 
         if info is None:
             self.weights = None
+            self.sparse = False
         else:
             self.set_layer(info)
     
     def set_layer(self, info):
-        if info.ndim == 2:
-            self.weights = info     # Dense weight matrix
+        if isinstance(info, dict):
+            # Sparse CSR matrix, one row per presynaptic neuron
+            self.shape   = tuple(info['shape'])
+            self.indptr  = np.asarray(info['indptr'])   # Row pointers (M + 1)
+            self.indices = np.asarray(info['indices'])  # Postsynaptic neuron per synapse
+            self.weights = lazy(info['weights'])        # Nonzero weights
+            self.sparse  = True
+            self.templates = Dense.sparse_templates
+
+            if len(self.indptr) != self.shape[0] + 1 or len(self.indices) != len(self.weights):
+                raise ValueError('Wrong sparse weight matrix shape')
+        elif len(np.shape(info)) == 2:
+            self.shape   = tuple(np.shape(info))
+            self.weights = lazy(info)   # Dense weight matrix (memmap or lazy arrays are not loaded)
+            self.sparse  = False
+            self.templates = Dense.templates
         else:
             raise ValueError('Wrong weight matrix shape')
 
+        self.changed()
+
+    def get_info(self):
+        if self.weights is None or not self.sparse:
+            return self.weights
+
+        return {'shape': self.shape, 'indptr': self.indptr, 'indices': self.indices, 'weights': self.weights}
+
+    def get_dense(self):
+        """
+        Returns the (M, N) weight matrix, expanding sparse layers
+        """
+        if not self.sparse:
+            return np.asarray(self.weights)
+
+        weights = np.zeros(self.shape, dtype=self.weights.dtype)
+        rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        weights[rows, self.indices] = self.weights
+        return weights
+
     def get_size(self):
+        if self.weights is None:
+            return DEFAULT
+        elif self.sparse:
+            return len(self.weights)
+        else:
+            return int(np.prod(self.shape))
+
+    def get_neurons(self):
         if self.weights is None:
             return DEFAULT
         else:
-            return len(self.weights.flatten())
+            return self.shape[1]
 
     def get_logn(self):
         if self.weights is None:
             return DEFAULT
         else:
-            return int(np.ceil(np.log2(self.weights.shape[1])))
+            return int(np.ceil(np.log2(self.shape[1])))
+
+    def set_parallel(self, parallel):
+        if self.weights is None:
+            raise ValueError("Dense layer weights must be set before NPU replication")
+        if self.sparse and parallel != 1:
+            raise ValueError("Sparse Dense layers do not support NPU replication")
+        if not isinstance(parallel, (int, np.integer)) or not 1 <= parallel <= self.shape[1]:
+            raise ValueError(f"NPU instances must be between 1 and {self.shape[1]}")
+        self.parallel = parallel
 
     def get_template_params(self):
+        quantization = self.get_quantization()
         params = {
-            'core':    {'name': self.label},
+            'core':    {'name': self.label, 'parallel': self.parallel},
             'ctrl':    {'name': self.label},
             'npu_aux': {'name': self.label},
             'npu':     {'name': self.label},
             'config': {
                 'name': self.label,
-                'weights': self.weights,
-                'm': self.weights.shape[0],
-                'n': self.weights.shape[1]
+                'weights': quantization['weights'],
+                'bits': quantization['bits'],
+                'shift': self.__pad_lanes(quantization['shift']),
+                'm': self.shape[0],
+                'n': self.shape[1],
+                'parallel': self.parallel
             }
         }
+
+        if self.sparse:
+            params['config']['indptr']  = self.indptr
+            params['config']['indices'] = self.indices
+
         return params
 
+    def get_memories(self):
+        # w_group(synapse)(neuron) per NPU or w_mem(synapse) (sparse)
+        weights = self.get_quantization()['weights']
+        if self.sparse:
+            return {'w': np.pad(weights, (0, len(weights) == 0))}    # fc_words (at least one word)
+
+        return {'w': self.__pad_lanes(weights).reshape(self.shape[0], self.parallel, -1).transpose(1, 0, 2)}
+
+    def __pad_lanes(self, data):
+        # Zero padding of the last NPU neuron slice
+        pad = self.parallel * self.get_slice() - self.shape[1]
+        return np.pad(data, [(0, 0)] * (data.ndim - 1) + [(0, pad)])
+
+    def get_channel_weights(self):
+        # One channel per postsynaptic neuron
+        if self.sparse:
+            return self.weights, self.indices, self.shape[1]
+        return self.weights, np.arange(self.shape[1]), self.shape[1]
+
 class Conv2D(Layer):
     templates = {
         'core':    "hw/layers/conv2D/conv2D_core.vhd",
@@ -131,18 +447,16 @@ class Conv2D(Layer):
             self.weights = None
             self.padding = None
             self.strides = None
+            self.__kernels = None
         else:
             self.set_layer(info)
 
-    def __get_output_shape(self):
+    def get_output_shape(self):
         my, mx, mz    = self.input_shape
         ky, kx, kz, f = self.kernel_shape
-        sy, sx        = self.strides
 
-        if self.padding == 'valid':    # No padding
-            return (my - ky + 1) // sy, (mx - kx + 1) // sx, f
-        elif self.padding == 'same':   # Padding generates same sized output
-            return my // sy, mx // sx, f
+        # No padding, stride 1 (set_layer)
+        return my - ky + 1, mx - kx + 1, f
 
     def __get_inital_position(self):
         ky, kx, kz, f = self.kernel_shape
@@ -180,43 +494,97 @@ class Conv2D(Layer):
         #          \/
         #
         # [a00, b00, c00, a01, b01, c01, ... , a22, b22, c22]
-        kernels = []
-        ky, kx, kz, f = self.kernel_shape
-
-        for kernel in self.weights:
-            flat = np.empty(0)
-
-            for i, row in enumerate(kernel):
-                for j, col in enumerate(row):
-                    flat = np.concatenate((flat, kernel[i,j,:]))
-            kernels.append(flat)
+        #
+        # (ky, kx, kz, f) -> (f, ky * kx * kz) quantized kernels,
+        # cached until set_layer or quantize
+        if self.__kernels is None:
+            ky, kx, kz, f = self.kernel_shape
+            weights = self.get_quantization()['weights']
+            self.__kernels = weights.transpose(3, 0, 1, 2).reshape(f, ky * kx * kz)
 
-        return kernels
+        return self.__kernels
 
     def set_layer(self, info):
+        # conv2D_config.vhd / conv2D_ctrl.vhd only build the valid, stride 1 geometry
+        if info['padding'] != 'valid' or tuple(info['strides']) != (1, 1):
+            raise ValueError(f"Conv2D layers only support 'valid' padding and (1, 1) strides, "
+                             f"got {info['padding']!r} padding and {tuple(info['strides'])} strides")
+
+        # conv2D_ctrl.vhd addresses input and output maps with a single row length (my, ny)
+        my, mx = info['input_shape'][:2]
+        ky, kx = info['kernel_shape'][:2]
+        if my != mx or ky != kx:
+            raise ValueError(f"Conv2D layers only support square input maps and kernels, "
+                             f"got {(my, mx)} inputs and {(ky, kx)} kernels")
+
         self.input_shape = info['input_shape']
         self.kernel_shape = info['kernel_shape']
-        self.weights = [info['weights'][:,:,:,i] for i in range(info['weights'].shape[3])]
+        self.weights = lazy(info['weights'])        # (ky, kx, kz, f)
         self.padding = info['padding']
         self.strides = info['strides']
+        self.changed()
+
+    def get_info(self):
+        if self.weights is None:
+            return None
+
+        return {
+            'input_shape': self.input_shape,
+            'kernel_shape': self.kernel_shape,
+            'weights': self.weights,
+            'padding': self.padding,
+            'strides': self.strides
+        }
+
+    def changed(self):
+        self.__kernels = None
+        super().changed()
 
     def get_size(self):
         if self.weights is None:
             return DEFAULT
         else:
-            return sum([len(kernel.flatten()) for kernel in self.weights])
+            return int(np.prod(self.kernel_shape))
+
+    def get_neurons(self):
+        if self.weights is None:
+            return DEFAULT
+        else:
+            return int(np.prod(self.get_output_shape()))
 
     def get_logm(self):
         my, mx, mz = self.input_shape
         return int(np.ceil(np.log2(my * mx * mz)))
 
     def get_logn(self):
-        ny, nx, f = self.__get_output_shape()
+        ny, nx, f = self.get_output_shape()
         return int(np.ceil(np.log2(ny * nx * f)))
 
+    def set_parallel(self, parallel):
+        if self.weights is None:
+            raise ValueError("Conv2D layer weights must be set before NPU replication")
+        f = self.kernel_shape[3]
+        if not isinstance(parallel, (int, np.integer)) or not 1 <= parallel <= f:
+            raise ValueError(f"NPU instances must be between 1 and {f}")
+        self.parallel = parallel
+
+    def __get_kernel_slice(self):
+        # Kernels per NPU
+        return -(-self.kernel_shape[3] // self.parallel)
+
+    def get_slice(self):
+        # Neurons per NPU (all outputs of its kernels)
+        ny, nx, f = self.get_output_shape()
+        return ny * nx * self.__get_kernel_slice()
+
+    def __pad_lanes(self, data):
+        # Zero padding of the last NPU kernel slice
+        pad = self.parallel * self.__get_kernel_slice() - self.kernel_shape[3]
+        return np.pad(data, [(0, 0)] * (data.ndim - 1) + [(0, pad)])
+
     def get_template_params(self):
         params = {
-            'core':    {'name': self.label},
+            'core':    {'name': self.label, 'parallel': self.parallel},
             'ctrl':    {'name': self.label},
             'npu_aux': {'name': self.label},
             'npu':     {'name': self.label},
@@ -225,12 +593,25 @@ class Conv2D(Layer):
                 'm': self.input_shape,          # (my, mx, mz)
                 'k': self.kernel_shape,         # (ky, kx, kz, f)
                 #'s': self.strides,              # (sy, sx)
-                'n': self.__get_output_shape(), # (ny, nx, f)
-                'weights': self.__flatten_zy()
+                'n': self.get_output_shape(),   # (ny, nx, f)
+                'weights': self.__flatten_zy(),
+                'bits': self.get_quantization()['bits'],
+                'shift': self.__pad_lanes(self.get_quantization()['shift']),
+                'parallel': self.parallel
             }
         }
         return params
 
+    def get_memories(self):
+        # w_group(synapse)(kernel) per NPU
+        k = self.__flatten_zy().shape[1]
+        return {'w': self.__pad_lanes(self.__flatten_zy().T).reshape(k, self.parallel, -1).transpose(1, 0, 2)}
+
+    def get_channel_weights(self):
+        # One channel per kernel (filter)
+        f = self.kernel_shape[3]
+        return self.weights, np.arange(f), f
+
 
 class Pooling(Layer):
     templates = {
@@ -250,7 +631,7 @@ class Pooling(Layer):
         else:
             self.set_layer(info)
 
-    def __get_output_shape(self):
+    def get_output_shape(self):
         my, mx, mz    = self.input_shape
         py, px        = self.pool
 
@@ -262,12 +643,22 @@ class Pooling(Layer):
     def set_layer(self, info):
         self.input_shape = info['input_shape']  # Input dimensions (y,x,z)
         self.pool = info['pool_size']           # Pool size (y,x)
+        self.changed()
+
+    def get_info(self):
+        if self.pool is None:
+            return None
+
+        return {'input_shape': self.input_shape, 'pool_size': self.pool}
 
     def get_size(self):
         return self.pool[0] * self.pool[1] 
 
+    def get_neurons(self):
+        return int(np.prod(self.get_output_shape()))
+
     def get_logn(self):
-        ny, nx, mz = self.__get_output_shape()
+        ny, nx, mz = self.get_output_shape()
         return int(np.ceil(np.log2(ny * nx * mz)))
 
     def get_template_params(self):
@@ -280,8 +671,14 @@ class Pooling(Layer):
                 'name': self.label,
                 'm': self.input_shape,          # (my, mx, mz)
                 'p': self.pool,                 # (py, px)
-                'n': self.__get_output_shape(), # (ny, nx, mz)
-                'weight': self.__get_weight()
+                'n': self.get_output_shape(),   # (ny, nx, mz)
+                'weight': int(self.get_quantization()['weights'][0]),
+                'bits': self.get_quantization()['bits'],
+                'shift': int(self.get_quantization()['shift'][0])
             }
         }
-        return params
\ No newline at end of file
+        return params
+
+    def get_channel_weights(self):
+        # Single weight shared by all pooling windows
+        return np.array([self.__get_weight()]), np.zeros(1, dtype=np.int64), 1
\ No newline at end of file
@@ -1,4 +1,7 @@
 import logging
+import json, time, threading
+
+from contextlib import contextmanager
 
 def resnnance_logger(name=None):
     if name == None:
@@ -10,15 +13,136 @@ def resnnance_logger(name=None):
     logger = logging.getLogger(f"{logger_name}")
     logger.setLevel(logging.INFO)
 
-    # Create handler for father logger
-    if name == None:
+    # Create handler for father logger (once, child loggers propagate to it)
+    root = logging.getLogger("resnnance")
+    if not any(getattr(handler, 'resnnance', False) for handler in root.handlers):
         # Create log handler (for console output)
         handler = logging.StreamHandler()
         handler.setLevel(logging.INFO)
+        handler.resnnance = True
 
         # Format log output
         formatter = logging.Formatter( '%(asctime)s - %(name)s - %(levelname)s: %(message)s', "%Y-%m-%d %H:%M:%S")
         handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        root.addHandler(handler)
+
+    return logger
+
+class Metrics(object):
+    """
+    Timing spans and counters of the Resnnance phases (build, render,
+    write, plot, run)
+
+    Every span and counter update is also passed as an event dict to the
+    subscribed callbacks. Updates are thread-safe, spans and counters of
+    worker processes (parallel layer rendering) are merged afterwards.
+    """
+
+    def __init__(self):
+        # Log (DEBUG level span timings)
+        self.logger = logging.getLogger("resnnance.metrics")
+
+        self.lock = threading.Lock()
+        self.callbacks = []
+        self.reset()
+
+    def reset(self):
+        """
+        Clears all recorded spans and counters
+        """
+        with self.lock:
+            self.epoch = time.perf_counter()
+            self.spans = []
+            self.counters = {}
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Times the enclosed block as a span with the given attributes
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            event = dict(attributes, type='span', name=name,
+                         start=start - self.epoch, time=end - start,
+                         thread=threading.current_thread().name)
+            with self.lock:
+                self.spans.append(event)
+            self.logger.debug(f"{name} {attributes} {end - start:.6f} s")
+            self.__emit(event)
+
+    def count(self, name, value=1):
+        """
+        Adds value to a counter
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            total = self.counters[name]
+        self.__emit({'type': 'counter', 'name': name, 'value': value, 'total': total})
+
+    def drain(self):
+        """
+        Returns and clears the recorded spans and counters (worker
+        processes, merged into the parent metrics)
+        """
+        with self.lock:
+            data = {'spans': self.spans, 'counters': self.counters}
+            self.spans = []
+            self.counters = {}
+        return data
+
+    def merge(self, data):
+        """
+        Adds the spans and counters drained from a worker process
+        """
+        for event in data['spans']:
+            with self.lock:
+                self.spans.append(event)
+            self.__emit(event)
+
+        for name, value in data['counters'].items():
+            self.count(name, value)
+
+    def subscribe(self, callback):
+        """
+        Calls callback(event) on every span and counter update
+        """
+        self.callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.callbacks.remove(callback)
+
+    def export(self, path=None):
+        """
+        Returns the spans, per-name span totals and counters (also
+        written to path as JSON)
+        """
+        with self.lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+
+        totals = {}
+        for span in spans:
+            total = totals.setdefault(span['name'], {'count': 0, 'time': 0.0})
+            total['count'] += 1
+            total['time']  += span['time']
+
+        data = {'spans': spans, 'totals': totals, 'counters': counters}
+        if not path is None:
+            with open(path, mode="w") as output:
+                json.dump(data, output, indent=4)
+
+        return data
+
+    def __emit(self, event):
+        for callback in list(self.callbacks):
+            callback(event)
+
+# Resnnance metrics singleton
+metrics = Metrics()
 
-    return logger
\ No newline at end of file
+def resnnance_metrics():
+    return metrics
@@ -1,6 +1,22 @@
-from .logger   import resnnance_logger
-from .compiler import Compiler
-from .plotter  import Plotter
+from .logger    import resnnance_logger
+from .compiler  import Compiler
+from .plotter   import Plotter
+from .simulator import Simulator
+from .estimator import Estimator
+from .results   import BatchResults
+from .runner    import Runner
+from .layers    import Input, Dense, Conv2D, Pooling
+
+import json, struct, zipfile
+import numpy as np
+import networkx as nx
+
+# Saved model container (.npz)
+FORMAT = "resnnance-model"
+FORMAT_VERSION = 1
+
+# Saved layer classes
+LAYERS = {layer.__name__: layer for layer in (Input, Dense, Conv2D, Pooling)}
 
 class Model(object):
 
@@ -14,16 +30,211 @@ class Model(object):
         # Plotter
         self.plotter = Plotter()
 
+        # Software simulator
+        self.simulator = Simulator()
+
+        # Resource and throughput estimator
+        self.estimator = Estimator()
+
+        # Hardware build and test driver
+        self.runner = Runner()
+
         # Model data
         self.layers = []
+        self.graph = None   # Layer DAG (cached)
         self.logger.info("Created empty Resnnance model")
 
     def add_layer(self, layer):
         self.layers.append(layer)
+        self.graph = None
         self.logger.info(f"Added {layer.__class__.__name__} layer: {layer.label}")
 
-    def compile(self, path=None):
-        self.compiler.compile(self, path)
+    def get_graph(self):
+        """
+        Returns the layer DAG (nodes are layer labels holding their layer,
+        in model order), a chain of the model layers unless set by the
+        frontend
+        """
+        if self.graph is None:
+            self.graph = nx.DiGraph()
+            self.graph.add_nodes_from((layer.label, {'layer': layer}) for layer in self.layers)
+            self.graph.add_edges_from((pre.label, post.label) for pre, post in zip(self.layers, self.layers[1:]))
+        return self.graph
+
+    def quantize(self, bits=None, granularity=None, layers=None):
+        """
+        Sets the weight width and scale granularity ('layer' or 'channel')
+        of all layers, with per-layer overrides in layers
+        ({label: {'bits': ..., 'granularity': ...}}), and returns the
+        quantization report of every layer with weights
+        """
+        if layers is None:
+            layers = {}
+
+        reports = {}
+        for layer in self.layers:
+            options = dict({'bits': bits, 'granularity': granularity}, **layers.get(layer.label, {}))
+            report = layer.quantize(**options)
+            if report is None:
+                continue
+
+            reports[layer.label] = report
+            self.logger.info(f"Quantized {layer.label}: {report['bits']} bits, "
+                             f"shift {report['shift'].min()}-{report['shift'].max()}, "
+                             f"{report['clipped']}/{report['weights']} clipped, "
+                             f"error max {report['max_error']:.3g} rms {report['rms_error']:.3g}")
+
+        # Simulator reloads the new weights on the next run
+        self.simulator.model = None
+
+        return reports
+
+    def save(self, path):
+        """
+        Saves the layers (class, label, info and weight options) and the
+        layer DAG to a versioned .npz container, one uncompressed member per
+        array so they can be memory-mapped on load
+        """
+        arrays = {}
+        layers = []
+        for i, layer in enumerate(self.layers):
+            layers.append({
+                'class': layer.__class__.__name__,
+                'label': layer.label[len("layer_"):],
+                'info': self.__pack(layer.get_info(), f"layer{i}", arrays),
+                'bits': layer.bits,
+                'granularity': layer.granularity,
+                'parallel': layer.parallel,
+                'file': getattr(layer, 'file', None)
+            })
+
+        header = {
+            'format': FORMAT,
+            'version': FORMAT_VERSION,
+            'layers': layers,
+            'edges': list(self.get_graph().edges())
+        }
+        np.savez(path, __resnnance__=np.array(json.dumps(header)), **arrays)
+        self.logger.info(f"Saved model ({len(self.layers)} layers) to {path}")
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """
+        Loads a model saved by Model.save, memory-mapping its arrays if
+        mmap is True (weights are then only read when quantized)
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            header = json.loads(str(archive['__resnnance__']))
+            if header.get('format') != FORMAT or header.get('version') != FORMAT_VERSION:
+                raise ValueError(f"Unsupported model file {path}: "
+                                 f"{header.get('format')} version {header.get('version')}")
+
+            def array(key):
+                if mmap:
+                    return cls.__mmap(path, archive, key)
+                return archive[key]
+
+            model = cls()
+            for entry in header['layers']:
+                if entry['class'] not in LAYERS:
+                    raise ValueError(f"Unknown layer class {entry['class']}")
+
+                layer = LAYERS[entry['class']](entry['label'], cls.__unpack(entry['info'], array))
+                layer.bits = entry['bits']
+                layer.granularity = entry['granularity']
+                if entry['parallel'] != 1:
+                    layer.set_parallel(entry['parallel'])
+                if not entry['file'] is None:
+                    layer.file = entry['file']
+                model.add_layer(layer)
+
+        # Layer DAG
+        model.graph = nx.DiGraph()
+        model.graph.add_nodes_from((layer.label, {'layer': layer}) for layer in model.layers)
+        model.graph.add_edges_from(map(tuple, header['edges']))
+
+        model.logger.info(f"Loaded model ({len(model.layers)} layers) from {path}")
+        return model
+
+    @staticmethod
+    def __pack(info, key, arrays):
+        # JSON layer info, arrays replaced by {'array': member}
+        if isinstance(info, dict):
+            return {name: Model.__pack(value, f"{key}.{name}", arrays) for name, value in info.items()}
+        if hasattr(info, 'shape') and len(info.shape) > 0:
+            arrays[key] = info
+            return {'array': key}
+        if isinstance(info, (tuple, list)):
+            return [Model.__pack(value, key, arrays) for value in info]
+        if isinstance(info, np.generic):
+            return info.item()
+        return info
+
+    @staticmethod
+    def __unpack(info, array):
+        if isinstance(info, dict):
+            if set(info) == {'array'}:
+                return array(info['array'])
+            return {name: Model.__unpack(value, array) for name, value in info.items()}
+        if isinstance(info, list):
+            return tuple(Model.__unpack(value, array) for value in info)
+        return info
+
+    @staticmethod
+    def __mmap(path, archive, key):
+        """
+        Memory-maps an uncompressed .npz member (np.load loads them whole)
+        """
+        member = archive.zip.getinfo(f"{key}.npy")
+        if member.compress_type != zipfile.ZIP_STORED:
+            return archive[key]
+
+        with open(path, mode="rb") as source:
+            # Local file header, then the .npy member
+            source.seek(member.header_offset)
+            name, extra = struct.unpack("<HH", source.read(30)[26:30])
+            source.seek(member.header_offset + 30 + name + extra)
+
+            version = np.lib.format.read_magic(source)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(source)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(source)
+            offset = source.tell()
+
+        if dtype.hasobject:
+            raise ValueError(f"Object array {key} can not be memory-mapped")
+        return np.memmap(path, dtype=dtype, mode="r", shape=shape, order="F" if fortran else "C", offset=offset)
+
+    def compile(self, path=None, mem=None, jobs=None, batch=None):
+        self.compiler.compile(self, path, mem, jobs, batch)
+
+    def build_hw(self, path=None, jobs=1, tests=None, stop=None):
+        """
+        Analyzes the compiled build (defaults to the last compiled one)
+        and runs its testbenches with jobs workers
+        """
+        return self.runner.run(self.compiler.build_path if path is None else path, jobs, tests, stop)
+
+    def results(self, path=None):
+        """
+        Loads the batch testbench log (defaults to the last compiled build)
+        """
+        return BatchResults(self.compiler.batch_log() if path is None else path)
 
     def plot(self, path=None):
-        self.plotter.plot(self, path)
\ No newline at end of file
+        self.plotter.plot(self, path)
+
+    def simulate(self, ticks, inputs=None):
+        return self.simulator.run(self, ticks, inputs)
+
+    def simulate_batch(self, inputs, ticks, workers=1, chunk=None):
+        """
+        Simulates every input sample from reset with workers processes and
+        returns the output layer spike counts (samples, neurons)
+        """
+        return self.simulator.run_batch(self, inputs, ticks, workers, chunk)
+
+    def estimate(self, clock=None, block=None, lutram=None):
+        options = {key: value for key, value in {'clock': clock, 'block': block, 'lutram': lutram}.items() if not value is None}
+        return self.estimator.estimate(self, **options)
\ No newline at end of file
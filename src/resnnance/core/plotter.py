@@ -1,4 +1,4 @@
-from .logger import resnnance_logger
+from .logger import resnnance_logger, resnnance_metrics
 
 import os
 import numpy as np
@@ -17,21 +17,17 @@ class Plotter(object):
             self.logger.warning("Empty Resnnance model")
             return
 
-        # Create directed graph representation of the model
+        # Directed graph representation of the model
         self.logger.info("Plotting Resnnance model...")
-        network = nx.DiGraph()
-        [network.add_node(layer.label, layer=layer) for layer in model.layers]
-
-        for i, layer in enumerate(model.layers):
-            if not i == 0:
-                network.add_edge(model.layers[i-1].label, model.layers[i].label)
+        network = model.get_graph()
 
         # Generate directories for subpath
         if not os.path.exists(os.path.join(path, "doc")):
             os.makedirs(os.path.join(path, "doc"))
 
         # Plot graph
-        self.__plot_network(network, os.path.join(path, "doc"))
+        with resnnance_metrics().span("plot", layers=len(model.layers)):
+            self.__plot_network(network, os.path.join(path, "doc"))
 
     def __plot_network(self, network, path=None):
 
@@ -0,0 +1,132 @@
+import numpy as np
+
+# Fixed-point formats (*_npu_aux.vhd)
+WIDTH = 16      # w_t/x_t width
+WFRAC = 7       # Weight fractional bits (weight_conv)
+PIXEL = 8       # Input memory word width (poisson_aux.vhd)
+
+# Weights quantized per chunk
+CHUNK = 2**20
+
+def wrap(x):
+    """
+    Wraps an integer array into the signed 16-bit range (numeric_std overflow)
+    """
+    x = np.asarray(x, dtype=np.int64)
+    return ((x + 2**(WIDTH-1)) % 2**WIDTH - 2**(WIDTH-1)).astype(np.int16)
+
+def weight_conv(weights):
+    """
+    Converts real weights into w_t values - to_signed(integer(w * 2.0**7), 16)
+    """
+    w = np.asarray(weights, dtype=np.float64) * 2.0**WFRAC
+    # VHDL integer() rounds half away from zero
+    return wrap(np.sign(w) * np.floor(np.abs(w) + 0.5))
+
+
+def chunks(weights, chunk=CHUNK):
+    """
+    Returns the (start, stop) slices of the first axis that read about
+    chunk weights at a time
+    """
+    shape = np.shape(weights)
+    rows = max(1, chunk // max(1, int(np.prod(shape[1:]))))
+    return [(start, min(start + rows, shape[0])) for start in range(0, shape[0], rows)]
+
+def quantize(weights, bits=WIDTH, channels=None, n=1, chunk=CHUNK):
+    """
+    Quantizes real weights into bits-wide integers with a left shift per
+    channel, so that each channel adds q << shift to x_t
+
+    The shift is the smallest one that fits the channel peak in bits,
+    limited so shifted weights stay within x_t (out of range weights
+    saturate and are counted as clipped)
+
+    channels holds the channel index of every weight (None: one scale
+    for the whole layer) and n the number of channels
+
+    weights may be an np.memmap or any lazily loaded array (shape and
+    first axis slicing): they are read chunk by chunk, twice (channel
+    peaks, then quantization), and only the int16 result is kept
+    """
+    if not 2 <= bits <= WIDTH:
+        raise ValueError(f"Weight width must be between 2 and {WIDTH} bits")
+
+    shape = np.shape(weights)
+    slices = chunks(weights, chunk)
+    if channels is None:
+        channels = np.zeros(1, dtype=np.int64)
+    channels = np.broadcast_to(channels, shape)
+
+    def read(start, stop):
+        return np.asarray(weights[start:stop], dtype=np.float64) * 2.0**WFRAC, channels[start:stop]
+
+    # Channel peaks
+    peak = np.zeros(n)
+    for start, stop in slices:
+        w, c = read(start, stop)
+        np.maximum.at(peak, c.ravel(), np.abs(w).ravel())
+
+    # Smallest shift with round(peak / 2**shift) <= qmax
+    qmax  = 2**(bits-1) - 1
+    limit = qmax + 0.5
+    with np.errstate(divide='ignore'):
+        shift = np.ceil(np.log2(peak / limit))
+    shift = np.nan_to_num(shift, neginf=0).clip(0, WIDTH - bits).astype(np.int64)
+    shift = np.where((peak >= limit * 2.0**shift) & (shift < WIDTH - bits), shift + 1, shift)
+
+    q = np.empty(shape, dtype=np.int16)
+    clipped, max_error, square_error = 0, 0.0, 0.0
+    for start, stop in slices:
+        w, c = read(start, stop)
+
+        # Round half away from zero (VHDL integer()) and saturate
+        scale = 2.0**shift[c]
+        qc = np.sign(w) * np.floor(np.abs(w) / scale + 0.5)
+        clipped += int(np.count_nonzero((qc > qmax) | (qc < -qmax - 1)))
+        qc = qc.clip(-qmax - 1, qmax)
+
+        # Error in weight units
+        error = (qc * scale - w) / 2.0**WFRAC
+        if error.size:
+            max_error = max(max_error, float(np.abs(error).max()))
+            square_error += float(np.sum(error**2))
+        q[start:stop] = qc
+
+    size = int(np.prod(shape))
+    report = {
+        'bits':      bits,
+        'shift':     shift,
+        'weights':   size,
+        'clipped':   clipped,
+        'max_error': max_error,
+        'rms_error': float(np.sqrt(square_error / size)) if size else 0.0
+    }
+
+    return {'weights': q, 'bits': bits, 'shift': shift, 'report': report}
+
+def dequantize(quantization, channels=None):
+    """
+    Returns the x_t increments (q << shift) of quantized weights
+    """
+    shift = quantization['shift']
+    weights = quantization['weights'].astype(np.int64)
+    if channels is None:
+        channels = np.zeros(weights.shape, dtype=np.int64)
+    return weights << shift[np.broadcast_to(channels, weights.shape)]
+
+def pixel_conv(samples, peak=None):
+    """
+    Converts input samples into unsigned PIXEL-bit input memory words
+
+    Integer samples are saturated, real samples are scaled so that peak
+    (default 1.0) maps to the largest word and rounded
+    """
+    samples = np.asarray(samples)
+    top = 2**PIXEL - 1
+
+    if np.issubdtype(samples.dtype, np.integer) and peak is None:
+        return samples.clip(0, top).astype(np.uint8)
+
+    scale = top / (1.0 if peak is None else peak)
+    return np.floor(samples.astype(np.float64) * scale + 0.5).clip(0, top).astype(np.uint8)
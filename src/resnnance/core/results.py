@@ -0,0 +1,54 @@
+from .logger    import resnnance_logger
+from .estimator import CLOCK
+
+import numpy as np
+
+class BatchResults(object):
+    """
+    Spike counts and clock cycles of a batch testbench run (batch_tb.vhd log)
+    """
+
+    def __init__(self, path):
+        # Log
+        self.logger = resnnance_logger("results")
+
+        # One line per sample: sample, cycles, output spike counts
+        data = np.loadtxt(path, dtype=np.int64, ndmin=2)
+        self.path    = path
+        self.samples = data[:, 0]
+        self.cycles  = data[:, 1]
+        self.counts  = data[:, 2:]
+
+        self.logger.info(f"Loaded {len(self.samples)} batch samples from {path}")
+
+    def predictions(self):
+        """
+        Returns the output neuron with the most spikes of every sample
+        """
+        return np.argmax(self.counts, axis=1)
+
+    def report(self, labels=None, clock=CLOCK):
+        """
+        Returns the accuracy against labels (None without labels), mean
+        clock cycles per sample and sample throughput at clock (Hz)
+        """
+        cycles = float(self.cycles.mean()) if len(self.cycles) else 0.0
+
+        accuracy = None
+        if not labels is None:
+            labels = np.asarray(labels).ravel()
+            if labels.size != len(self.samples):
+                raise ValueError(f"Got {labels.size} labels for {len(self.samples)} samples")
+            accuracy = float(np.mean(self.predictions() == labels))
+
+        report = {
+            'samples':  len(self.samples),
+            'accuracy': accuracy,
+            'cycles':   cycles,
+            'rate':     clock / cycles if cycles else 0.0
+        }
+
+        self.logger.info(f"Batch: {report['samples']} samples, "
+                         f"accuracy {'-' if accuracy is None else f'{accuracy:.4f}'}, "
+                         f"{cycles:.0f} cycles/sample, {report['rate']:.1f} samples/s")
+        return report
@@ -0,0 +1,198 @@
+from .logger   import resnnance_logger
+from .compiler import MANIFEST
+
+import os, re, json, time, shutil, subprocess
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Build subpath (work library, traces and analysis state)
+BUILD = "build"
+STATE = "resnnance_hw.json"
+STATE_VERSION = 1
+
+# VHDL design units provided and used by a source file
+PROVIDES = re.compile(r"^\s*(?:entity|package)\s+(\w+)\s+is\b", re.IGNORECASE | re.MULTILINE)
+USES     = re.compile(r"\bwork\.(\w+)", re.IGNORECASE)
+
+class Runner(object):
+    """
+    Incremental GHDL build and test driver of a compiled model
+
+    Sources are analyzed in dependency order into a work library kept
+    between runs: only the files whose content hash changed since the last
+    analysis, and the files depending on them, are analyzed again. GHDL
+    keeps a single library index file, so analysis runs serially, while
+    testbenches are elaborated and then run concurrently.
+    """
+
+    def __init__(self, ghdl="ghdl"):
+        # Log
+        self.logger = resnnance_logger("runner")
+
+        # GHDL executable
+        self.ghdl = ghdl
+
+    def run(self, path, jobs=1, tests=None, stop=None):
+        """
+        Analyzes the build sources and runs the testbenches (test/*.vhd, or
+        the entity names in tests) with jobs workers
+
+        stop sets the simulation stop time of every testbench (e.g. "10ms"),
+        free-running ones such as network_tb need it to finish
+
+        Returns the analyzed files and the status, return code, wall time
+        and output of every testbench
+        """
+        if shutil.which(self.ghdl) is None:
+            raise RuntimeError(f"GHDL executable not found: {self.ghdl}")
+
+        self.logger.info("Building Resnnance hardware...")
+        workdir = os.path.join(path, BUILD)
+        os.makedirs(workdir, exist_ok=True)
+
+        # Sources of the last compile
+        with open(os.path.join(path, MANIFEST)) as manifest:
+            files = {
+                subfile: digest for subfile, digest in json.load(manifest)['files'].items()
+                if subfile.endswith(".vhd")
+            }
+
+        # Analyze
+        analyzed = self.__analyze(path, workdir, files)
+
+        # Testbenches
+        if tests is None:
+            tests = [
+                os.path.splitext(os.path.basename(subfile))[0]
+                for subfile in files if os.path.dirname(subfile) == "test"
+            ]
+        results = self.__test(path, workdir, tests, jobs, stop)
+
+        failed = [test for test, result in results.items() if result['status'] != 'passed']
+        if failed:
+            self.logger.error(f"Building Resnnance hardware - {len(failed)}/{len(results)} tests failed")
+        else:
+            self.logger.info("Building Resnnance hardware - OK")
+
+        return {'analyzed': analyzed, 'tests': results}
+
+    def __analyze(self, path, workdir, files):
+        """
+        Analyzes the changed sources (and their dependents) in dependency order
+        """
+        order, dependencies = self.__sort(path, files)
+
+        # Last analysis (any removed source rebuilds the whole library)
+        state = self.__load_state(workdir)
+        if set(state) - set(files):
+            self.logger.info("Sources removed, cleaning work library")
+            self.__ghdl(["--remove", f"--workdir={workdir}"], cwd=workdir)
+            state = {}
+
+        analyzed = []
+        for subfile in order:
+            stale = state.get(subfile) != files[subfile]
+            if not stale and not any(dependency in analyzed for dependency in dependencies[subfile]):
+                continue
+
+            start = time.perf_counter()
+            result = self.__ghdl(["-a", f"--workdir={workdir}", os.path.abspath(os.path.join(path, subfile))], cwd=workdir)
+            if result.returncode != 0:
+                # Keep the files analyzed so far
+                state.pop(subfile, None)
+                self.__save_state(workdir, state)
+                raise RuntimeError(f"Analysis of {subfile} failed:\n{result.stdout}")
+
+            state[subfile] = files[subfile]
+            analyzed.append(subfile)
+            self.logger.info(f"Analyzed {subfile} ({time.perf_counter() - start:.2f} s)")
+
+        self.__save_state(workdir, state)
+        return analyzed
+
+    def __sort(self, path, files):
+        """
+        Returns the sources in dependency order and the sources each one depends on
+        """
+        provides, uses = {}, {}
+        for subfile in files:
+            with open(os.path.join(path, subfile)) as source:
+                text = source.read()
+            for unit in PROVIDES.findall(text):
+                provides[unit.lower()] = subfile
+            uses[subfile] = {unit.lower() for unit in USES.findall(text)}
+
+        dependencies = {
+            subfile: {provides[unit] for unit in units if unit in provides} - {subfile}
+            for subfile, units in uses.items()
+        }
+
+        # Topological sort (stable in manifest order)
+        order, done = [], set()
+        pending = list(files)
+        while pending:
+            ready = [subfile for subfile in pending if dependencies[subfile] <= done]
+            if not ready:
+                raise ValueError(f"Circular VHDL dependencies between {', '.join(pending)}")
+            order += ready
+            done.update(ready)
+            pending = [subfile for subfile in pending if subfile not in done]
+
+        return order, dependencies
+
+    def __test(self, path, workdir, tests, jobs, stop):
+        """
+        Elaborates the testbenches (serially) and runs them concurrently,
+        logging every result as it finishes
+        """
+        results = {}
+        for test in tests:
+            result = self.__ghdl(["-m", f"--workdir={workdir}", test], cwd=workdir)
+            if result.returncode != 0:
+                results[test] = {'status': 'error', 'returncode': result.returncode, 'time': 0.0, 'output': result.stdout}
+                self.logger.error(f"Elaboration of {test} failed")
+
+        tracedir = os.path.join(workdir, "trace")
+        os.makedirs(tracedir, exist_ok=True)
+
+        def run(test):
+            args = ["-r", f"--workdir={workdir}", test, f"--wave={os.path.join(tracedir, test)}.ghw"]
+            if not stop is None:
+                args.append(f"--stop-time={stop}")
+
+            start = time.perf_counter()
+            result = self.__ghdl(args, cwd=os.path.join(path, "test"))
+            return {
+                'status': 'passed' if result.returncode == 0 else 'failed',
+                'returncode': result.returncode,
+                'time': time.perf_counter() - start,
+                'output': result.stdout
+            }
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            futures = {pool.submit(run, test): test for test in tests if not test in results}
+            for future in as_completed(futures):
+                test = futures[future]
+                results[test] = future.result()
+                self.logger.info(f"Test {test}: {results[test]['status']} ({results[test]['time']:.2f} s)")
+
+        return {test: results[test] for test in tests}
+
+    def __ghdl(self, args, cwd):
+        return subprocess.run([self.ghdl] + args, cwd=cwd, stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, universal_newlines=True)
+
+    def __load_state(self, workdir):
+        try:
+            with open(os.path.join(workdir, STATE)) as state:
+                state = json.load(state)
+        except (OSError, ValueError):
+            return {}
+
+        if state.get('version') != STATE_VERSION:
+            return {}
+        return state.get('files', {})
+
+    def __save_state(self, workdir, files):
+        with open(os.path.join(workdir, STATE), mode="w") as state:
+            json.dump({'version': STATE_VERSION, 'files': files}, state, indent=4, sort_keys=True)
@@ -0,0 +1,462 @@
+from .logger    import resnnance_logger
+from .layers    import Input, Dense, Conv2D, Pooling
+from .quantizer import wrap, dequantize
+
+import os, tempfile
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from concurrent.futures import ProcessPoolExecutor
+
+# Neuron model constants (*_npu_aux.vhd)
+UREST = -64     # Resting/reset potential
+UTH   = 8192    # Spiking threshold
+SHIFT = 5       # Leak shift (d/dt)
+
+# Poisson input constants (poisson_core.vhd)
+POLY   = 0xD008 # Fibonacci LFSR polynomial
+POLY_W = 16     # LFSR width
+PIXEL  = 0xFC   # Default input memory contents
+SCALE  = 4      # Spike probability scale (1 ms)
+
+# Synapse evaluation modes
+MODES = ('dense', 'sparse', 'auto')
+
+def gv(x, so):
+    """
+    (0) Virtual spike processing
+    """
+    return np.where(so, np.int16(UREST), x)
+
+def gi(x, acc):
+    """
+    (1) Input spike processing - acc holds the sum of all active synapse weights
+    """
+    return wrap(x.astype(np.int64) + acc)
+
+def dyn(xg):
+    """
+    (2) Advance neuron dynamics
+    """
+    xg = xg.astype(np.int64)
+    dx = wrap(-wrap(xg - UREST).astype(np.int64)).astype(np.int64) >> SHIFT
+    return wrap(xg + dx)
+
+def h(xs):
+    """
+    (3) Generate output spike
+    """
+    return xs > UTH
+
+def lfsr_sequence():
+    """
+    Returns the full period of the Poisson input Fibonacci LFSR,
+    starting from its reset value
+    """
+    taps = [i for i in range(POLY_W) if (POLY >> i) & 1]
+    period = 2**POLY_W - 1
+
+    seq = np.empty(period, dtype=np.int64)
+    lfsr = 1
+    for i in range(period):
+        seq[i] = lfsr
+        feedback = 0
+        for tap in taps:
+            feedback ^= (lfsr >> tap) & 1
+        lfsr = ((lfsr << 1) & (2**POLY_W - 1)) | feedback
+
+    return seq
+
+class Simulator(object):
+    """
+    Tick-based software reference of the generated hardware
+
+    Every layer is updated once per tick with the same fixed-point arithmetic
+    as its NPU (gv, gi, dyn, h). Layers are pipelined: on each tick, a layer
+    integrates the spikes its predecessor emitted on the previous tick.
+
+    Synapses are evaluated densely (whole presynaptic spike vector) or
+    event-driven (weight rows or kernel footprints of the active spikes
+    only). In 'auto' mode each layer picks one every tick, from the
+    fraction of active presynaptic neurons (conversion table 'activity').
+    """
+
+    def __init__(self, mode='auto'):
+        # Log
+        self.logger = resnnance_logger("simulator")
+
+        # Synapse evaluation mode
+        self.mode = mode
+
+        # Loaded model
+        self.model = None
+        self.units = []
+
+        # Recording
+        self.recorded = set()   # Layer labels recording membrane state
+        self.spikes = {}        # Per-layer list of spiking indices, one entry per tick
+        self.signals = {}       # Per-layer list of membrane states, one entry per tick
+        self.history = True     # Keep the spike lists of every tick (returned by run)
+        self.monitors = {}      # Per-layer callbacks, called with (tick, spiking indices) every tick
+        self.tick = 0
+
+        # LFSR sequence (lazy)
+        self.lfsr = None
+
+    def load(self, model):
+        """
+        Prepares fixed-point weights and state for all model layers
+        """
+        self.model = model
+        self.units = []
+
+        for layer in model.layers:
+            prepare = Simulator.conversion[layer.__class__]['prepare']
+            self.units.append({
+                'class': layer.__class__, 'label': layer.label, 'version': layer.version, 'params': prepare(layer)
+            })
+
+        self.reset()
+
+    def update(self, model):
+        """
+        Loads the model, or prepares again the weights of the layers changed
+        since they were loaded (set_layer, quantize). Neuron states are kept
+        unless the layers or their sizes changed.
+        """
+        if self.model is not model or [unit['label'] for unit in self.units] != [layer.label for layer in model.layers]:
+            self.load(model)
+            return
+
+        for unit, layer in zip(self.units, model.layers):
+            if unit['version'] != layer.version:
+                prepare = Simulator.conversion[layer.__class__]['prepare']
+                n = unit['params']['n']
+                unit['params'] = prepare(layer)
+                unit['version'] = layer.version
+                if unit['params']['n'] != n:
+                    self.load(model)
+                    return
+
+    def reset(self):
+        """
+        Resets all neuron states and recordings to tick 0
+        """
+        self.tick = 0
+        self.spikes = {}
+        self.signals = {}
+
+        for unit in self.units:
+            label = unit['label']
+            n = unit['params']['n']
+            unit['x']  = np.zeros(n, dtype=np.int16)
+            unit['so'] = np.zeros(n, dtype=bool)
+            unit['active'] = np.zeros(0, dtype=np.int64)
+            self.spikes[label] = []
+            if label in self.recorded:
+                self.signals[label] = [unit['x'].copy()]
+
+    def run(self, model, ticks, inputs=None):
+        """
+        Advances the model a number of ticks
+
+        inputs holds the 8-bit pixel values of the input layer memory
+        (defaults to the input layer init file or the poisson_core.vhd
+        memory contents)
+        """
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown simulation mode: {self.mode}")
+
+        self.update(model)
+
+        self.logger.info(f"Simulating Resnnance model - {ticks} ticks...")
+        for _ in range(ticks):
+            self.__step(inputs)
+
+        self.logger.info("Simulating Resnnance model - OK")
+        return {label: spikes[-ticks:] if ticks else [] for label, spikes in self.spikes.items()}
+
+    def run_batch(self, model, inputs, ticks, workers=1, chunk=None):
+        """
+        Runs every input sample (rows of inputs, 8-bit pixel values) for
+        a number of ticks from reset, sharded across workers processes, and
+        returns the output layer spike counts (samples, neurons)
+
+        The prepared layer weights and the inputs are shared with the
+        workers as read-only memory-mapped files, each worker simulates
+        chunk samples per task. Samples are independent and deterministic
+        (LFSR inputs), so results do not depend on the worker count.
+        """
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown simulation mode: {self.mode}")
+
+        self.update(model)
+
+        # One row of input layer pixels per sample (also when there are none)
+        inputs = np.asarray(inputs)
+        inputs = inputs.reshape(len(inputs), self.units[0]['params']['n'])
+        samples = len(inputs)
+        if chunk is None:
+            chunk = max(1, -(-samples // (4 * workers)))
+
+        self.logger.info(f"Simulating Resnnance model - {samples} samples, {ticks} ticks, {workers} workers...")
+        if workers <= 1 or samples == 0:
+            # In-process simulator (the model simulator state and the worker global are untouched)
+            counts = batch_worker(self.units, inputs, self.mode)['simulator'].run_samples(inputs, ticks)
+        else:
+            with tempfile.TemporaryDirectory(prefix="resnnance-batch-") as path:
+                units = [dict(unit, params=share(unit['params'], os.path.join(path, str(i))))
+                         for i, unit in enumerate(self.units)]
+                np.save(os.path.join(path, "inputs.npy"), inputs)
+
+                with ProcessPoolExecutor(max_workers=workers, initializer=batch_init,
+                                         initargs=(units, os.path.join(path, "inputs.npy"), self.mode)) as pool:
+                    futures = [pool.submit(batch_run, start, min(start + chunk, samples), ticks)
+                               for start in range(0, samples, chunk)]
+                    counts = np.concatenate([future.result() for future in futures])
+
+        self.logger.info("Simulating Resnnance model - OK")
+        return counts
+
+    def run_samples(self, inputs, ticks):
+        """
+        Runs every input sample from reset and returns the output layer
+        spike counts (samples, neurons)
+        """
+        unit = self.units[-1]
+        counts = np.zeros((len(inputs), unit['params']['n']), dtype=np.int32)
+        for i, sample in enumerate(inputs):
+            self.reset()
+            for _ in range(ticks):
+                self.__step(sample)
+            for active in self.spikes[unit['label']]:
+                counts[i, active] += 1
+
+        return counts
+
+    def __step(self, inputs):
+        # Spikes emitted on the previous tick (vector and active indices)
+        outputs = [(unit['so'], unit['active']) for unit in self.units]
+
+        for i, unit in enumerate(self.units):
+            label = unit['label']
+
+            if unit['class'] is Input:
+                so = self.__input_spikes(unit, inputs)
+            else:
+                conversion = Simulator.conversion[unit['class']]
+                s, active = outputs[i-1]
+                if self.mode == 'sparse' or (self.mode == 'auto' and len(active) <= conversion['activity'] * len(s)):
+                    acc = conversion['events'](unit['params'], active)
+                else:
+                    acc = conversion['synapses'](unit['params'], s)
+
+                # NPU
+                x = gv(unit['x'], unit['so'])
+                x = gi(x, acc)
+                x = dyn(x)
+                so = h(x)
+                unit['x'] = x
+
+                if label in self.recorded:
+                    self.signals.setdefault(label, []).append(x.copy())
+
+            unit['so'] = so
+            unit['active'] = np.flatnonzero(so)
+            if self.history:
+                self.spikes[label].append(unit['active'])
+            for monitor in self.monitors.get(label, ()):
+                monitor(self.tick, unit['active'])
+
+        self.tick += 1
+
+    def __input_spikes(self, unit, inputs):
+        n = unit['params']['n']
+
+        if self.lfsr is None:
+            self.lfsr = lfsr_sequence()
+
+        if inputs is None:
+            pixels = unit['params']['pixels']
+        else:
+            pixels = np.asarray(inputs, dtype=np.int64).ravel()
+
+        # LFSR advances n times per tick, neuron j compares against step j + 1
+        rand = self.lfsr[(self.tick * n + np.arange(1, n + 1)) % len(self.lfsr)]
+        so = (pixels << (POLY_W - 8 - SCALE)) >= rand
+
+        # Last neuron is read back while the core is already idle
+        so[-1] = False
+        return so
+
+    def __prepare_input(layer):
+        n = layer.get_size()
+        if layer.file is None:
+            pixels = np.full(n, PIXEL, dtype=np.int64)
+        else:
+            # First sample of the init file (numpy2vhd)
+            pixels = np.loadtxt(layer.file, dtype=np.int64, max_rows=n, ndmin=1)
+        return {'n': n, 'pixels': pixels}
+
+    def __prepare_dense(layer):
+        # Integer-valued float64 sums are exact for any realistic fan-in
+        _, channels, _ = layer.get_channel_weights()
+        w = dequantize(layer.get_quantization(), channels).astype(np.float64)
+        if layer.sparse:
+            return {'n': layer.shape[1], 'w': w, 'indptr': layer.indptr, 'indices': layer.indices}
+        return {'n': layer.shape[1], 'w': w}
+
+    def __prepare_conv2d(layer):
+        my, mx, mz    = layer.input_shape
+        ky, kx, kz, f = layer.kernel_shape
+        ny, nx, _     = layer.get_output_shape()
+
+        # Kernel matrix (ky * kx * kz, f)
+        _, channels, _ = layer.get_channel_weights()
+        w = dequantize(layer.get_quantization(), channels).astype(np.float64)
+        return {
+            'n': ny * nx * f, 'm': (mz, my, mx), 'k': (ky, kx), 'o': (ny, nx),
+            'w': w.reshape(-1, f)
+        }
+
+    def __prepare_pooling(layer):
+        ny, nx, mz = layer.get_output_shape()
+        my, mx, _  = layer.input_shape
+        return {
+            'n': ny * nx * mz, 'm': (mz, my, mx), 'p': layer.pool, 'o': (ny, nx),
+            'w': np.int64(dequantize(layer.get_quantization())[0])
+        }
+
+    def __synapses_dense(params, s):
+        if 'indptr' in params:
+            return Simulator.__events_dense(params, np.flatnonzero(s))
+        return (s.astype(np.float64) @ params['w']).astype(np.int64)
+
+    def __events_dense(params, active):
+        if 'indptr' not in params:
+            # Weight rows of the spiking inputs
+            return params['w'][active].sum(axis=0).astype(np.int64)
+
+        # Sparse - gather the synapse rows of all spiking inputs
+        indptr = params['indptr']
+        start, length = indptr[active], indptr[active + 1] - indptr[active]
+        synapses = np.repeat(start - np.cumsum(length) + length, length) + np.arange(length.sum())
+
+        acc = np.bincount(params['indices'][synapses], params['w'][synapses], minlength=params['n'])
+        return acc.astype(np.int64)
+
+    def __synapses_conv2d(params, s):
+        ky, kx = params['k']
+        ny, nx = params['o']
+
+        # Spike maps (z, y, x) -> kernel footprints (ny, nx, ky, kx, z), valid stride 1 geometry
+        win = sliding_window_view(s.reshape(params['m']), (ky, kx), axis=(1, 2))
+        win = win.transpose(1, 2, 3, 4, 0).reshape(ny * nx, -1)
+
+        # Output maps (f, y, x)
+        acc = win.astype(np.float64) @ params['w']
+        return acc.T.ravel().astype(np.int64)
+
+    def __events_conv2d(params, active):
+        mz, my, mx = params['m']
+        ky, kx = params['k']
+        ny, nx = params['o']
+        f = params['w'].shape[1]
+
+        # Spike (z, y, x) -> outputs whose footprint tap (dy, dx) covers it
+        z, y, x = np.unravel_index(active, (mz, my, mx))
+        dy, dx = np.meshgrid(np.arange(ky), np.arange(kx), indexing='ij')
+        oy = y[:, None, None] - dy[None]
+        ox = x[:, None, None] - dx[None]
+        valid = (oy >= 0) & (oy < ny) & (ox >= 0) & (ox < nx)
+
+        # Kernel matrix row (dy, dx, z) of every valid tap, summed per output (position, f)
+        e, ty, tx = np.nonzero(valid)
+        rows = (ty * kx + tx) * mz + z[e]
+        position = oy[e, ty, tx] * nx + ox[e, ty, tx]
+        index = (position[:, None] * f + np.arange(f)).ravel()
+        acc = np.bincount(index, params['w'][rows].ravel(), minlength=ny * nx * f)
+
+        # Output maps (f, y, x)
+        return acc.reshape(ny * nx, f).T.ravel().astype(np.int64)
+
+    def __synapses_pooling(params, s):
+        mz, my, mx = params['m']
+        py, px = params['p']
+        ny, nx = params['o']
+
+        # Spike count per pooling window (z, y, x)
+        s = s.reshape(mz, my, mx)[:, :ny * py, :nx * px].reshape(mz, ny, py, nx, px)
+        return s.sum(axis=(2, 4), dtype=np.int64).ravel() * params['w']
+
+    def __events_pooling(params, active):
+        mz, my, mx = params['m']
+        py, px = params['p']
+        ny, nx = params['o']
+
+        # Window of every spike (inputs beyond the last full window are dropped)
+        z, y, x = np.unravel_index(active, (mz, my, mx))
+        oy, ox = y // py, x // px
+        valid = (oy < ny) & (ox < nx)
+        counts = np.bincount((z * ny * nx + oy * nx + ox)[valid], minlength=mz * ny * nx)
+        return counts.astype(np.int64) * params['w']
+
+    # Resnnance layer to simulation function conversion table
+    # (activity: largest active input fraction evaluated event-driven in 'auto' mode,
+    # measured crossover of both evaluations)
+    conversion = {
+        Input:   {'prepare': __prepare_input,   'synapses': None,               'events': None,             'activity': 0},
+        Dense:   {'prepare': __prepare_dense,   'synapses': __synapses_dense,   'events': __events_dense,   'activity': 0.2},
+        Conv2D:  {'prepare': __prepare_conv2d,  'synapses': __synapses_conv2d,  'events': __events_conv2d,  'activity': 0.02},
+        Pooling: {'prepare': __prepare_pooling, 'synapses': __synapses_pooling, 'events': __events_pooling, 'activity': 0.25},
+    }
+
+def share(params, path):
+    """
+    Replaces the arrays of prepared layer parameters by read-only .npy
+    files (path prefix), loaded memory-mapped by attach()
+    """
+    shared = {}
+    for key, value in params.items():
+        if isinstance(value, np.ndarray) and value.ndim > 0:
+            shared[key] = {'npy': f"{path}_{key}.npy"}
+            np.save(shared[key]['npy'], value)
+        else:
+            shared[key] = value
+    return shared
+
+def attach(params):
+    """
+    Memory-maps the shared arrays of prepared layer parameters
+    """
+    return {
+        key: np.load(value['npy'], mmap_mode='r') if isinstance(value, dict) and 'npy' in value else value
+        for key, value in params.items()
+    }
+
+# Batch simulation worker (one per process)
+worker = None
+
+def batch_worker(units, inputs, mode):
+    """
+    Returns a batch simulator (own neuron state) over shared (or
+    in-process) layer parameters and inputs
+    """
+    simulator = Simulator(mode)
+    simulator.units = [dict(unit, params=attach(unit['params'])) for unit in units]
+    return {
+        'simulator': simulator,
+        'inputs': np.load(inputs, mmap_mode='r') if isinstance(inputs, str) else inputs
+    }
+
+def batch_init(units, inputs, mode):
+    """
+    Creates the worker simulator of a batch run process
+    """
+    global worker
+    worker = batch_worker(units, inputs, mode)
+
+def batch_run(start, stop, ticks):
+    """
+    Returns the output spike counts of samples start to stop
+    """
+    return worker['simulator'].run_samples(worker['inputs'][start:stop], ticks)
@@ -2,6 +2,5 @@
 
 mkdir -p build
 cd build
-rm -r *
 cmake .. 
 make check
\ No newline at end of file
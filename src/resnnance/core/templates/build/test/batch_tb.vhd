@@ -0,0 +1,179 @@
+---
+-- batch_tb.vhd
+--
+-- Batch inference testbench
+--
+-- Loads every sample of a batched input memory file (Input.export) through
+-- the input memory load port, runs a fixed number of ticks and reads the
+-- output layer spikes back after each tick. One line per sample is written
+-- to the log: sample, clock cycles and output spike counts.
+--
+-- Neuron state is not reset between samples, rest ticks (all-zero input)
+-- can be run in between to let membranes decay.
+--
+-- params:
+--      'layers': network layers
+--      'batch':  {'file', 'log', 'samples', 'ticks', 'rest', 'cycles'}
+---
+
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use std.textio.all;
+
+entity batch_tb is
+end batch_tb;
+
+architecture arch of batch_tb is
+    constant period: time := 10 ns;
+
+    {% with first = layers | first, last = layers | last -%}
+    ---
+    -- Batch
+    --  samples: batch samples
+    --  ticks:   ticks per sample
+    --  rest:    rest ticks between samples
+    --  cycles:  clock cycles per tick
+    --  n:       input memory words per sample
+    --  no:      output neurons
+    constant samples: natural := {{ batch.samples }};
+    constant ticks:   natural := {{ batch.ticks }};
+    constant rest:    natural := {{ batch.rest }};
+    constant cycles:  natural := {{ batch.cycles }};
+    constant n:       natural := {{ first.size }};
+    constant no:      natural := {{ last.size }};
+
+    signal rst:  std_logic := '0';
+    signal clk:  std_logic := '0';
+    signal tick: std_logic := '0';
+    signal done: std_logic := '0';
+    signal cycle: natural := 0;
+
+    ---
+    -- Network input
+    signal wri: std_logic := '0';
+    signal wai: std_logic_vector({{ first.logn }}-1 downto 0) := (others => '0');
+    signal wdi: std_logic_vector(7 downto 0) := (others => '0');
+
+    ---
+    -- Network output
+    signal  si: std_logic;
+    signal adi: std_logic_vector({{ last.logn }}-1 downto 0) := (others => '0');
+    signal eni: std_logic := '0';
+    {%- endwith %}
+begin
+
+    ---
+    -- DUT
+    dut: entity work.network
+    port map (
+        rst => rst, clk => clk, tick => tick,
+        wri => wri, wai => wai, wdi => wdi,
+        si => si, adi => adi, eni => eni
+    );
+
+    -- Testbench signals
+    rst <= '1', '0' after 0.25 * period, '1' after 2*period;
+    clk <= not clk after period/2 when done = '0' else '0';
+
+    -- Clock cycle counter
+    count: process (clk)
+    begin
+        if rising_edge(clk) then
+            cycle <= cycle + 1;
+        end if;
+    end process;
+
+    ---
+    -- Batch driver
+    drv: process
+        type counts_t is array (0 to no-1) of natural;
+
+        file     fin:  text open read_mode  is "{{ batch.file }}";
+        file     fout: text open write_mode is "{{ batch.log }}";
+        variable lin, lout: line;
+        variable word:   integer;
+        variable counts: counts_t;
+        variable start:  natural;
+
+        -- Writes the next sample (or an all-zero one) to the input memory
+        procedure load(zero: boolean) is
+        begin
+            for i in 0 to n-1 loop
+                if zero then
+                    word := 0;
+                else
+                    readline(fin, lin);
+                    read(lin, word);
+                end if;
+                wai <= std_logic_vector(to_unsigned(i, wai'length));
+                wdi <= std_logic_vector(to_unsigned(word, wdi'length));
+                wri <= '1';
+                wait until rising_edge(clk);
+            end loop;
+            wri <= '0';
+        end procedure;
+
+        -- Runs one tick and adds the output spikes to counts
+        procedure step is
+        begin
+            tick <= '1';
+            wait until rising_edge(clk);
+            tick <= '0';
+            for c in 1 to cycles loop
+                wait until rising_edge(clk);
+            end loop;
+
+            -- Output spikes are read one cycle after their address
+            for i in 0 to no loop
+                if i < no then
+                    adi <= std_logic_vector(to_unsigned(i, adi'length));
+                    eni <= '1';
+                else
+                    eni <= '0';
+                end if;
+                wait until rising_edge(clk);
+                if i > 0 and si = '1' then
+                    counts(i-1) := counts(i-1) + 1;
+                end if;
+            end loop;
+        end procedure;
+    begin
+        -- Reset
+        wait for 2*period;
+        wait until rising_edge(clk);
+
+        for s in 0 to samples-1 loop
+            -- Rest (zero input)
+            if s > 0 and rest > 0 then
+                load(true);
+                for t in 1 to rest loop
+                    step;
+                end loop;
+            end if;
+
+            -- Sample
+            start  := cycle;
+            counts := (others => 0);
+            load(false);
+            for t in 1 to ticks loop
+                step;
+            end loop;
+
+            -- Log: sample, cycles, spike counts
+            write(lout, s);
+            write(lout, string'(" "));
+            write(lout, cycle - start);
+            for i in 0 to no-1 loop
+                write(lout, string'(" "));
+                write(lout, counts(i));
+            end loop;
+            writeline(fout, lout);
+        end loop;
+
+        report "Batch done: " & integer'image(samples) & " samples";
+        done <= '1';
+        wait;
+    end process;
+
+end arch;
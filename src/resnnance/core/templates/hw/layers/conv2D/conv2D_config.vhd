@@ -7,8 +7,12 @@
 --      'name': self.label,
 --      'm': self.input_shape,
 --      'k': self.kernel_shape,
---      'n': self.__get_output_shape(),
---      'weights': self.__flatten_zy()
+--      'n': self.get_output_shape(),
+--      'weights': self.__flatten_zy(),
+--      'bits': weight width,
+--      'shift': weight shift per kernel,
+--      'parallel': NPU instances
+--      'w_file': weight memory init file (optional)
 ---
 
 library ieee;
@@ -33,14 +37,35 @@ package {{ name }}_config is
 
     constant conv2D_k:  natural := conv2D_kx * conv2D_ky * conv2D_kz;
 
-    type conv2D_kernel_weights_t is array (0 to conv2D_k-1) of real;                    -- Kernel
+    ---
+    -- NPU replication (conv2D_fs kernels, conv2D_ns neurons per NPU)
+    constant conv2D_p:  natural := {{ parallel }};
+    constant conv2D_fs: natural := (conv2D_f + conv2D_p - 1) / conv2D_p;
+    constant conv2D_ns: natural := conv2D_nx * conv2D_ny * conv2D_fs;
+
+    ---
+    -- Weight format (w_t width, left shift into x_t per kernel)
+    type conv2D_shift_t is array (0 to conv2D_p*conv2D_fs-1) of natural;
+    constant conv2D_wbits: natural := {{ bits }};
+    constant conv2D_wsh: conv2D_shift_t :=
+    (
+        {% if shift | length == 1 %}0 => {% endif %}{% for sh in shift -%}
+        {{ sh }}{% if not loop.last %}, {% endif %}
+        {%- endfor %}
+    );
+
+    {% if w_file -%}
+    constant conv2D_w_file: string := "{{ w_file }}";
+
+    {% else -%}
+    type conv2D_kernel_weights_t is array (0 to conv2D_k-1) of integer;                 -- Kernel
     type conv2D_layer_weights_t  is array (0 to conv2D_f-1) of conv2D_kernel_weights_t; -- Layer
 
     {% for kernel in weights -%}
     constant kernel_{{ loop.index0 }}: conv2D_kernel_weights_t :=
     (
-        {% for weight in kernel -%}
-        {{ weight }}{% if not loop.last %}, {% endif %}{%- endfor %}
+        {% for words in kernel | words -%}
+        {{ words }}{% if not loop.last %}, {% endif %}{%- endfor %}
     );
 
     {% endfor -%}
@@ -51,6 +76,8 @@ package {{ name }}_config is
         {% endif %}{%- endfor %}
     );
 
+    {% endif -%}
+
     constant conv2D_logmx: natural := integer(ceil(log2(real(conv2D_mx))));
     constant conv2D_logmy: natural := integer(ceil(log2(real(conv2D_my))));
     constant conv2D_logkz: natural := integer(ceil(log2(real(conv2D_kz))));
@@ -4,7 +4,9 @@
 -- Convolutional 2D layer
 --
 -- params:
---      'name': self.label
+--      'name': self.label,
+--      'parallel': NPU instances (so/eno one bit per instance, ado local
+--                  to every instance neuron slice)
 ---
 
 library ieee;
@@ -25,9 +27,9 @@ port (
     adi:  out std_logic_vector(conv2D_logm-1 downto 0);
     eni:  out std_logic;
 
-    so:   out std_logic;
+    so:   out std_logic{% if parallel > 1 %}_vector(0 to conv2D_p-1){% endif %};
     ado:  out std_logic_vector(conv2D_logn-1 downto 0);
-    eno:  out std_logic
+    eno:  out std_logic{% if parallel > 1 %}_vector(0 to conv2D_p-1){% endif %}
 );
 end entity;
 
@@ -36,6 +38,11 @@ architecture arch of {{ name }}_core is
     signal adr:  std_logic_vector(conv2D_logn-1 downto 0);
     signal wadr: std_logic_vector(conv2D_logf-1 downto 0);
     signal enr:  std_logic;
+    {%- if parallel > 1 %}
+
+    type ado_t is array (0 to conv2D_p-1) of std_logic_vector(conv2D_logn-1 downto 0);
+    signal ados: ado_t;
+    {%- endif %}
 begin
 
     ---
@@ -47,6 +54,21 @@ begin
         sr => sr, adr => adr, wadr => wadr, enr => enr
     );
 
+    {% if parallel > 1 -%}
+    ---
+    -- Neuron processing units (one neuron slice each, run in lockstep)
+    npu_gen: for lane in 0 to conv2D_p-1 generate
+        npu_inst: entity work.{{ name }}_npu
+        generic map (lane => lane)
+        port map (
+            rst => rst, clk => clk,
+            sr => sr, adr => adr, wadr => wadr, enr => enr,
+            so => so(lane), ado => ados(lane), eno => eno(lane)
+        );
+    end generate;
+
+    ado <= ados(0);
+    {%- else -%}
     ---
     -- Neuron processing unit
     npu_inst: entity work.{{ name }}_npu
@@ -55,5 +77,6 @@ begin
         sr => sr, adr => adr, wadr => wadr, enr => enr,
         so => so, ado => ado, eno => eno
     );
+    {%- endif %}
 
 end architecture;
\ No newline at end of file
@@ -174,7 +174,7 @@ begin
         sr <= taps(lr);
         if conv2D_kz = 1 then
             if kernel_aligned(rr.x, rr.y) then
-                if conv2D_f = 1 then
+                if conv2D_fs = 1 then
                     adr <= std_logic_vector(get_adr(rr.xo, rr.yo));
                 else
                     adr <= std_logic_vector(get_adrf(rr.xo, rr.yo, rr.f));
@@ -184,7 +184,7 @@ begin
             end if;
         else
             if kernel_alignedz(rr.x, rr.y, rr.z) then
-                if conv2D_f = 1 then
+                if conv2D_fs = 1 then
                     adr <= std_logic_vector(get_adr(rr.xo, rr.yo));
                 else
                     adr <= std_logic_vector(get_adrf(rr.xo, rr.yo, rr.f));
@@ -222,8 +222,8 @@ begin
                     else
                         rn.y <= (others => '0');
 
-                        if rr.f < (conv2D_f - 1) then
-                            -- Sweep kernels
+                        if rr.f < (conv2D_fs - 1) then
+                            -- Sweep kernels (NPU slice)
                             rn.f <= rr.f + 1;
                         else
                             rn.f     <= (others => '0');
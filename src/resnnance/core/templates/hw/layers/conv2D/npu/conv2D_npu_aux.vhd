@@ -18,23 +18,31 @@ package {{ name }}_npu_aux is
     ---
     -- Neuron model types
     subtype x_t is signed(15 downto 0);
-    subtype w_t is signed(15 downto 0);
+    subtype w_t is signed(conv2D_wbits-1 downto 0);   -- Weight memory word
 
     ---
     -- Weight memory types
-    type w_mem_t   is array (0 to conv2D_f-1) of w_t;
+    type w_mem_t   is array (0 to conv2D_fs-1) of w_t;
     type w_group_t is array (0 to conv2D_k-1) of w_mem_t;
 
     ---
     -- NPU function 
     function gv(x: x_t; so: std_logic) return x_t;
-    function gi(x: x_t; s: std_logic; w: w_t) return x_t;
+    function gi(x: x_t; s: std_logic; w: x_t) return x_t;
     function dyn(xg: x_t) return x_t;
     function h(xs: x_t) return std_logic;
 
+    ---
+    -- Weight scaling
+    function w_ext(w: w_t; sh: natural) return x_t;
+
     ---
     -- Neuron weight conversion
-    function weight_conv(weights: conv2D_layer_weights_t) return w_group_t;
+    {% if w_file -%}
+    impure function mem2vhd(path: string; lane: natural) return w_group_t;
+    {%- else -%}
+    function weight_conv(weights: conv2D_layer_weights_t; lane: natural) return w_group_t;
+    {%- endif %}
 
 end package;
 
@@ -58,7 +66,7 @@ package body {{ name }}_npu_aux is
 
     ---
     -- (1) Input spike processing
-    function gi(x: x_t; s: std_logic; w: w_t) return x_t is
+    function gi(x: x_t; s: std_logic; w: x_t) return x_t is
         variable xg: x_t;
     begin
         -- Default - no spiking
@@ -102,19 +110,65 @@ package body {{ name }}_npu_aux is
     end function;
 
     ---
-    -- Neuron weight conversion
-    function weight_conv(weights: conv2D_layer_weights_t) return w_group_t is
+    -- Weight scaling (w_t -> x_t)
+    function w_ext(w: w_t; sh: natural) return x_t is
+    begin
+        return shift_left(resize(w, 16), sh);
+    end function;
+
+{% if w_file %}    ---
+    -- Neuron weight memory init file (one 16-bit two's complement hex
+    -- word per line, one w_group per NPU lane)
+    impure function mem2vhd(path: string; lane: natural) return w_group_t is
+        use std.textio.all;
+        use ieee.std_logic_textio.all;
+
+        file     f:       text;
+        variable fstatus: file_open_status;
+        variable fline:   line;
+        variable fword:   std_logic_vector(15 downto 0);
+
+        variable wg: w_group_t;
+    begin
+        file_open(fstatus, f, path, read_mode);
+
+        if fstatus /= open_ok then
+            report "File error: " & file_open_status'image(fstatus) severity failure;
+        end if;
+
+        for i in 0 to lane*conv2D_k*conv2D_fs-1 loop
+            readline(f, fline);
+        end loop;
+
+        for synapse in wg'range loop
+            for neuron in wg(synapse)'range loop
+                readline(f, fline);
+                hread(fline, fword);
+                wg(synapse)(neuron) := resize(signed(fword), w_t'length);
+            end loop;
+        end loop;
+
+        file_close(f);
+        return wg;
+    end function;
+{% else %}    ---
+    -- Neuron weight conversion (kernel slice of an NPU lane)
+    function weight_conv(weights: conv2D_layer_weights_t; lane: natural) return w_group_t is
         variable w:  w_t;
         variable wg: w_group_t;
     begin
-        for f in 0 to conv2D_f-1 loop
+        for f in 0 to conv2D_fs-1 loop
             for i in 0 to conv2D_k-1 loop
-                w := to_signed(integer(weights(f)(i) * 2.0**7), 16);
+                if lane*conv2D_fs + f < conv2D_f then
+                    w := to_signed(weights(lane*conv2D_fs + f)(i), w_t'length);
+                else
+                    w := (others => '0');   -- Padding kernel
+                end if;
                 wg(i)(f) := w;
             end loop;
         end loop;
 
         return wg;
     end function;
-
+{% endif %}
 end package body;
\ No newline at end of file
@@ -96,13 +96,13 @@ begin
                 end if;
             when run =>
                 if rr.adi < fc_m - 1 then       -- adi not finished
-                    if rr.ado < fc_n - 1 then       -- ado not finished
+                    if rr.ado < fc_ns - 1 then       -- ado not finished
                         rn.state <= run;
                     else                            -- ado finished
                         rn.state <= rdi;
                     end if;
                 else                            -- adi finished
-                    if rr.ado < fc_n - 1 then       -- ado not finished
+                    if rr.ado < fc_ns - 1 then       -- ado not finished
                         rn.state <= rdo;
                     else                            -- ado finished
                         rn.state <= idle;
@@ -115,7 +115,7 @@ begin
                     rn.state <= idle;
                 end if;
             when rdo =>
-                if rr.ado < fc_n - 1 then       -- ado not finished
+                if rr.ado < fc_ns - 1 then       -- ado not finished
                     rn.state <= rdo;
                 else                            -- ado finished
                     rn.state <= idle;
@@ -135,7 +135,7 @@ begin
         -- Ctrl FSM - ado
         if rr.state = run or rr.state = rdo then
             enr <= '1';
-            if rr.ado < fc_n - 1 then
+            if rr.ado < fc_ns - 1 then
                 rn.ado <= rr.ado + 1;
             else
                 rn.ado <= (others => '0');
@@ -0,0 +1,166 @@
+---
+-- {{ name }}_ctrl.vhd
+--
+-- Fully-connected layer (sparse) - Control unit
+--
+-- Scans the presynaptic spikes and walks the synapse row of every
+-- spiking input (synapse events), then sweeps all neurons once to
+-- advance their dynamics (update events)
+--
+-- params:
+--      'name': self.label
+---
+
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+library work;
+use work.{{ name }}_config.all;
+
+entity {{ name }}_ctrl is
+port (
+    rst:  in  std_logic;
+    clk:  in  std_logic;
+
+    tick: in  std_logic;
+
+    si:   in  std_logic;
+    adi:  out std_logic_vector(fc_logm-1 downto 0);
+    eni:  out std_logic;
+
+    adr:  out std_logic_vector(fc_logn-1 downto 0);
+    wadr: out std_logic_vector(fc_lognnz-1 downto 0);
+    enr:  out std_logic;
+    enu:  out std_logic
+);
+end entity;
+
+architecture arch of {{ name }}_ctrl is
+    type state_t is (idle, scan, syn, upd);
+    type reg_t is record
+        -- Ctrl
+        state: state_t;
+        -- Presynaptic scan
+        adi:   natural range 0 to fc_m-1;   -- Next input to read
+        done:  std_logic;                   -- All inputs read
+        ai:    natural range 0 to fc_m-1;   -- Input read on the previous cycle
+        av:    std_logic;                   -- si valid
+        -- Synapse row
+        k:     natural range 0 to fc_words-1;
+        kend:  natural range 0 to fc_nnz;
+        -- Neuron sweep
+        ado:   natural range 0 to fc_n-1;
+    end record;
+    signal rn, rr: reg_t;
+begin
+
+    ---
+    -- Register
+    reg: process (rst, clk)
+    begin
+        if rst = '0' then
+            rr <= (
+                state => idle,
+                adi   => 0,
+                done  => '0',
+                ai    => 0,
+                av    => '0',
+                k     => 0,
+                kend  => 0,
+                ado   => 0
+            );
+        elsif rising_edge(clk) then
+            rr <= rn;
+        end if;
+    end process;
+
+    ---
+    -- Datapath
+    dp: process (
+        rr, tick, si
+    )
+    begin
+        -- Default
+        rn    <= rr;
+        rn.av <= '0';
+
+        -- Presynaptic
+        adi <= std_logic_vector(to_unsigned(rr.adi, adi'length));
+        eni <= '0';
+
+        -- Postsynaptic
+        if rr.state = upd then
+            adr <= std_logic_vector(to_unsigned(rr.ado, adr'length));
+        else
+            adr <= std_logic_vector(to_unsigned(fc_idx(rr.k), adr'length));
+        end if;
+        wadr <= std_logic_vector(to_unsigned(rr.k, wadr'length));
+        enr  <= '0';
+        enu  <= '0';
+
+        -- Ctrl FSM
+        case rr.state is
+            when idle =>
+                if tick = '1' then
+                    rn.adi   <= 0;
+                    rn.done  <= '0';
+                    rn.state <= scan;
+                end if;
+
+            when scan =>
+                -- Read next input spike
+                if rr.done = '0' then
+                    eni   <= '1';
+                    rn.ai <= rr.adi;
+                    rn.av <= '1';
+                    if rr.adi < fc_m - 1 then
+                        rn.adi <= rr.adi + 1;
+                    else
+                        rn.done <= '1';
+                    end if;
+                end if;
+
+                -- Check previous input spike
+                if rr.av = '1' and si = '1' and fc_ptr(rr.ai) < fc_ptr(rr.ai + 1) then
+                    -- Cancel read, resume after the synapse row
+                    eni   <= '0';
+                    rn.av <= '0';
+                    if rr.ai < fc_m - 1 then
+                        rn.adi  <= rr.ai + 1;
+                        rn.done <= '0';
+                    else
+                        rn.done <= '1';
+                    end if;
+
+                    rn.k     <= fc_ptr(rr.ai);
+                    rn.kend  <= fc_ptr(rr.ai + 1);
+                    rn.state <= syn;
+                elsif rr.done = '1' and rr.av = '0' then
+                    -- All inputs processed
+                    rn.ado   <= 0;
+                    rn.state <= upd;
+                end if;
+
+            when syn =>
+                -- One synapse per cycle
+                enr <= '1';
+                if rr.k < rr.kend - 1 then
+                    rn.k <= rr.k + 1;
+                else
+                    rn.state <= scan;
+                end if;
+
+            when upd =>
+                -- One neuron per cycle
+                enu <= '1';
+                if rr.ado < fc_n - 1 then
+                    rn.ado <= rr.ado + 1;
+                else
+                    rn.ado   <= 0;
+                    rn.state <= idle;
+                end if;
+        end case;
+    end process;
+
+end architecture;
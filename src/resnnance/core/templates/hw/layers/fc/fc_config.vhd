@@ -5,9 +5,13 @@
 --
 -- params:
 --      'name': self.label,
---      'weights': self.weights,
+--      'weights': quantized weights,
+--      'bits': weight width,
+--      'shift': weight shift per neuron,
 --      'm': self.weights.shape[0],
---      'n': self.weights.shape[1]
+--      'n': self.weights.shape[1],
+--      'parallel': NPU instances
+--      'w_file': weight memory init file (optional)
 ---
 
 library ieee;
@@ -20,16 +24,36 @@ package {{ name }}_config is
     constant fc_m: natural := {{ m }};
     constant fc_n: natural := {{ n }};
 
-    type fc_synapse_weights_t is array (0 to fc_n-1) of real;                  -- Neuron
+    ---
+    -- NPU replication (fc_ns neurons per NPU)
+    constant fc_p:  natural := {{ parallel }};
+    constant fc_ns: natural := (fc_n + fc_p - 1) / fc_p;
+
+    ---
+    -- Weight format (w_t width, left shift into x_t per neuron)
+    type fc_shift_t is array (0 to fc_p*fc_ns-1) of natural;
+    constant fc_wbits: natural := {{ bits }};
+    constant fc_wsh: fc_shift_t :=
+    (
+        {% if shift | length == 1 %}0 => {% endif %}{% for sh in shift -%}
+        {{ sh }}{% if not loop.last %}, {% endif %}
+        {%- endfor %}
+    );
+
+    {% if w_file -%}
+    constant fc_w_file: string := "{{ w_file }}";
+    {%- else -%}
+    type fc_synapse_weights_t is array (0 to fc_n-1) of integer;               -- Neuron
     type fc_layer_weights_t   is array (0 to fc_m-1) of fc_synapse_weights_t;  -- Layer
     constant fc_w: fc_layer_weights_t :=
     (
         {% for synapse in weights -%}
-        ({% for weight in synapse -%}
-        {{ weight }}{% if not loop.last %}, {% endif %}
+        ({% for words in synapse | words -%}
+        {{ words }}{% if not loop.last %}, {% endif %}
         {%- endfor %}){% if not loop.last %},
         {% endif %}{%- endfor %}
     );
+    {%- endif %}
 
     constant fc_logm: natural := integer(ceil(log2(real(fc_m))));
     constant fc_logn: natural := integer(ceil(log2(real(fc_n))));
@@ -0,0 +1,78 @@
+---
+-- {{ name }}_config.vhd
+--
+-- Fully-connected layer (sparse) - Configuration package
+--
+-- params:
+--      'name': self.label,
+--      'weights': quantized weights,
+--      'bits': weight width,
+--      'shift': weight shift per neuron,
+--      'indptr': self.indptr,
+--      'indices': self.indices,
+--      'm': self.shape[0],
+--      'n': self.shape[1]
+--      'w_file': weight memory init file (optional)
+---
+
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use ieee.math_real.all;
+
+package {{ name }}_config is
+
+    constant fc_m:   natural := {{ m }};
+    constant fc_n:   natural := {{ n }};
+    constant fc_nnz: natural := {{ weights | length }};
+
+    -- Synapse memory depth (one unused word when there are no synapses)
+    constant fc_words: natural := {{ [weights | length, 1] | max }};
+
+    ---
+    -- Weight format (w_t width, left shift into x_t per neuron)
+    type fc_shift_t is array (0 to fc_n-1) of natural;
+    constant fc_wbits: natural := {{ bits }};
+    constant fc_wsh: fc_shift_t :=
+    (
+        {% if shift | length == 1 %}0 => {% endif %}{% for sh in shift -%}
+        {{ sh }}{% if not loop.last %}, {% endif %}
+        {%- endfor %}
+    );
+
+    ---
+    -- Synapses (CSR, one row per presynaptic neuron)
+    type fc_ptr_t is array (0 to fc_m)       of natural;  -- Row pointers
+    type fc_idx_t is array (0 to fc_words-1) of natural;  -- Postsynaptic neurons
+    constant fc_ptr: fc_ptr_t :=
+    (
+        {% for words in indptr | words -%}
+        {{ words }}{% if not loop.last %}, {% endif %}
+        {%- endfor %}
+    );
+    constant fc_idx: fc_idx_t :=
+    (
+        {% if indices | length == 0 %}others => 0{% elif indices | length == 1 %}0 => {% endif %}{% for words in indices | words -%}
+        {{ words }}{% if not loop.last %}, {% endif %}
+        {%- endfor %}
+    );
+
+    {% if w_file -%}
+    constant fc_w_file: string := "{{ w_file }}";
+    {%- else -%}
+    type fc_layer_weights_t is array (0 to fc_words-1) of integer;  -- Layer
+    constant fc_w: fc_layer_weights_t :=
+    (
+        {% if weights | length == 0 %}others => 0{% elif weights | length == 1 %}0 => {% endif %}{% for words in weights | words -%}
+        {{ words }}{% if not loop.last %}, {% endif %}
+        {%- endfor %}
+    );
+    {%- endif %}
+
+    constant fc_logm:   natural := integer(ceil(log2(real(fc_m))));
+    constant fc_logn:   natural := integer(ceil(log2(real(fc_n))));
+
+    -- Synapse address width (at least one bit)
+    constant fc_lognnz: natural := integer(ceil(log2(real(fc_words)))) + boolean'pos(fc_words <= 1);
+
+end package;
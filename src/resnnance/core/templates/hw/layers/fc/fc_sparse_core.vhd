@@ -0,0 +1,59 @@
+---
+-- {{ name }}_core.vhd
+--
+-- Fully-connected layer (sparse)
+--
+-- params:
+--      'name': self.label
+---
+
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.math_real.all;
+
+library work;
+use work.{{ name }}_config.all;
+
+entity {{ name }}_core is
+port (
+    rst:  in  std_logic;
+    clk:  in  std_logic;
+
+    tick: in  std_logic;
+
+    si:   in  std_logic;
+    adi:  out std_logic_vector(fc_logm-1 downto 0);
+    eni:  out std_logic;
+
+    so:   out std_logic;
+    ado:  out std_logic_vector(fc_logn-1 downto 0);
+    eno:  out std_logic
+);
+end entity;
+
+architecture arch of {{ name }}_core is
+    signal adr:  std_logic_vector(fc_logn-1 downto 0);
+    signal wadr: std_logic_vector(fc_lognnz-1 downto 0);
+    signal enr:  std_logic;
+    signal enu:  std_logic;
+begin
+
+    ---
+    -- Address generation (sparse fully-connected layer)
+    ctrl_inst: entity work.{{ name }}_ctrl
+    port map (
+        rst => rst, clk => clk, tick => tick,
+        si => si, adi => adi, eni => eni,
+        adr => adr, wadr => wadr, enr => enr, enu => enu
+    );
+
+    ---
+    -- Neuron processing unit
+    npu_inst: entity work.{{ name }}_npu
+    port map (
+        rst => rst, clk => clk,
+        adr => adr, wadr => wadr, enr => enr, enu => enu,
+        so => so, ado => ado, eno => eno
+    );
+
+end architecture;
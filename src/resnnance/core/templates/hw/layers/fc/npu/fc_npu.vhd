@@ -5,6 +5,9 @@
 --
 -- params:
 --      'name': self.label
+--
+-- generics:
+--      lane: NPU instance, owns neurons lane*fc_ns to (lane+1)*fc_ns-1
 ---
 
 library ieee;
@@ -16,6 +19,9 @@ use work.{{ name }}_config.all;
 use work.{{ name }}_npu_aux.all;
 
 entity {{ name }}_npu is
+generic (
+    lane: natural := 0
+);
 port (
     rst: in std_logic;
     clk: in std_logic;
@@ -36,24 +42,24 @@ architecture arch of {{ name }}_npu is
     -- Memories
 
     -- x
-    type x_mem_t is array (0 to fc_n-1) of x_t;
+    type x_mem_t is array (0 to fc_ns-1) of x_t;
     signal x_mem:       x_mem_t := (others => (others => '0'));
     signal x_in, x_out: x_t;
     signal x_wr, x_rd:  std_logic;
     signal x_wa, x_ra:  natural range x_mem_t'range;
 
     -- so
-    type so_mem_t is array (0 to fc_n-1) of std_logic;
+    type so_mem_t is array (0 to fc_ns-1) of std_logic;
     signal so_mem:        so_mem_t := (others => '0');
     signal so_in, so_out: std_logic;
     signal so_wr, so_rd:  std_logic;
     signal so_wa, so_ra:  natural range so_mem_t'range;
 
     -- w
-    type w_port_t  is array (w_group_t'range) of w_t;
+    type w_port_t  is array (w_group_t'range) of x_t;
     type w_ctrl_t  is array (w_group_t'range) of std_logic;
     type w_addr_t  is array (w_group_t'range) of natural range w_mem_t'range;
-    signal w_group: w_group_t := weight_conv(fc_w);
+    signal w_group: w_group_t := {% if w_file %}mem2vhd(fc_w_file, lane){% else %}weight_conv(fc_w, lane){% endif %};
     signal w_out:   w_port_t;
     signal w_rd:    w_ctrl_t;
     signal w_ra:    w_addr_t;
@@ -119,7 +125,7 @@ begin
             -- w
             for i in w_group'range loop
                 if w_rd(i) = '1' then
-                    w_out(i) <= w_group(i)(w_ra(i));
+                    w_out(i) <= w_ext(w_group(i)(w_ra(i)), fc_wsh(lane*fc_ns + w_ra(i)));
                 end if;
             end loop;
         end if;
@@ -192,7 +198,11 @@ begin
         pn.eb    <= pr.ep(pr.ep'length-1);
         pn.ed    <= pr.eb;
         pn.es    <= pr.ed;
-        eno      <= pr.es;  -- Output enable
+        if lane*fc_ns + pr.as < fc_n then
+            eno  <= pr.es;  -- Output enable
+        else
+            eno  <= '0';    -- Padding neuron
+        end if;
 
         ---
         -- Reads
@@ -18,23 +18,31 @@ package {{ name }}_npu_aux is
     ---
     -- Neuron model types
     subtype x_t is signed(15 downto 0);
-    subtype w_t is signed(15 downto 0);
+    subtype w_t is signed(fc_wbits-1 downto 0);   -- Weight memory word
 
     ---
     -- Weight memory types
-    type w_mem_t   is array (0 to fc_n-1) of w_t;
+    type w_mem_t   is array (0 to fc_ns-1) of w_t;
     type w_group_t is array (0 to fc_m-1) of w_mem_t;
 
     ---
     -- NPU function 
     function gv(x: x_t; so: std_logic) return x_t;
-    function gi(x: x_t; s: std_logic; w: w_t) return x_t;
+    function gi(x: x_t; s: std_logic; w: x_t) return x_t;
     function dyn(xg: x_t) return x_t;
     function h(xs: x_t) return std_logic;
 
+    ---
+    -- Weight scaling
+    function w_ext(w: w_t; sh: natural) return x_t;
+
     ---
     -- Neuron weight conversion
-    function weight_conv(weights: fc_layer_weights_t) return w_group_t;
+    {% if w_file -%}
+    impure function mem2vhd(path: string; lane: natural) return w_group_t;
+    {%- else -%}
+    function weight_conv(weights: fc_layer_weights_t; lane: natural) return w_group_t;
+    {%- endif %}
 
 end package;
 
@@ -58,7 +66,7 @@ package body {{ name }}_npu_aux is
 
     ---
     -- (1) Input spike processing
-    function gi(x: x_t; s: std_logic; w: w_t) return x_t is
+    function gi(x: x_t; s: std_logic; w: x_t) return x_t is
         variable xg: x_t;
     begin
         -- Default - no spiking
@@ -102,19 +110,65 @@ package body {{ name }}_npu_aux is
     end function;
 
     ---
-    -- Neuron weight conversion
-    function weight_conv(weights: fc_layer_weights_t) return w_group_t is
+    -- Weight scaling (w_t -> x_t)
+    function w_ext(w: w_t; sh: natural) return x_t is
+    begin
+        return shift_left(resize(w, 16), sh);
+    end function;
+
+{% if w_file %}    ---
+    -- Neuron weight memory init file (one 16-bit two's complement hex
+    -- word per line, one w_group per NPU lane)
+    impure function mem2vhd(path: string; lane: natural) return w_group_t is
+        use std.textio.all;
+        use ieee.std_logic_textio.all;
+
+        file     f:       text;
+        variable fstatus: file_open_status;
+        variable fline:   line;
+        variable fword:   std_logic_vector(15 downto 0);
+
+        variable wg: w_group_t;
+    begin
+        file_open(fstatus, f, path, read_mode);
+
+        if fstatus /= open_ok then
+            report "File error: " & file_open_status'image(fstatus) severity failure;
+        end if;
+
+        for i in 0 to lane*fc_m*fc_ns-1 loop
+            readline(f, fline);
+        end loop;
+
+        for synapse in wg'range loop
+            for neuron in wg(synapse)'range loop
+                readline(f, fline);
+                hread(fline, fword);
+                wg(synapse)(neuron) := resize(signed(fword), w_t'length);
+            end loop;
+        end loop;
+
+        file_close(f);
+        return wg;
+    end function;
+{% else %}    ---
+    -- Neuron weight conversion (neuron slice of an NPU lane)
+    function weight_conv(weights: fc_layer_weights_t; lane: natural) return w_group_t is
         variable w:  w_t;
         variable wg: w_group_t;
     begin
         for synapse in weights'range loop
-            for neuron in weights(synapse)'range loop
-                w := to_signed(integer(weights(synapse)(neuron) * 2.0**7), 16);
+            for neuron in w_mem_t'range loop
+                if lane*fc_ns + neuron < fc_n then
+                    w := to_signed(weights(synapse)(lane*fc_ns + neuron), w_t'length);
+                else
+                    w := (others => '0');   -- Padding neuron
+                end if;
                 wg(synapse)(neuron) := w;
             end loop;
         end loop;
 
         return wg;
     end function;
-
+{% endif %}
 end package body;
\ No newline at end of file
@@ -0,0 +1,175 @@
+---
+-- {{ name }}_npu.vhd
+--
+-- Fully-connected layer (sparse) - Neuron Processing Unit
+--
+-- Synapse events accumulate one weight into x (read-modify-write),
+-- update events advance the neuron dynamics and generate its spike.
+-- Spiking neurons are stored already reset (gv), so the next tick
+-- starts from urest as in the dense NPU.
+--
+-- params:
+--      'name': self.label
+---
+
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+library work;
+use work.{{ name }}_config.all;
+use work.{{ name }}_npu_aux.all;
+
+entity {{ name }}_npu is
+port (
+    rst: in std_logic;
+    clk: in std_logic;
+
+    adr:  in  std_logic_vector(fc_logn-1 downto 0);
+    wadr: in  std_logic_vector(fc_lognnz-1 downto 0);
+    enr:  in  std_logic;
+    enu:  in  std_logic;
+
+    so:   out std_logic;
+    ado:  out std_logic_vector(fc_logn-1 downto 0);
+    eno:  out std_logic
+);
+end entity;
+
+architecture arch of {{ name }}_npu is
+    ---
+    -- Memories
+
+    -- x
+    type x_mem_t is array (0 to fc_n-1) of x_t;
+    signal x_mem:       x_mem_t := (others => (others => '0'));
+    signal x_in, x_out: x_t;
+    signal x_wr, x_rd:  std_logic;
+    signal x_wa, x_ra:  natural range x_mem_t'range;
+
+    -- w
+    signal w_mem: w_mem_t := {% if w_file %}mem2vhd(fc_w_file){% else %}weight_conv(fc_w){% endif %};
+    signal w_out: x_t;
+    signal w_rd:  std_logic;
+    signal w_ra:  natural range w_mem_t'range;
+
+    ---
+    -- Pipeline
+    type p_t is record
+        -- Event
+        a:  natural range x_mem_t'range;
+        er: std_logic;
+        eu: std_logic;
+
+        -- Forwarding (last write)
+        xf: x_t;
+        af: natural range x_mem_t'range;
+        ef: std_logic;
+
+        -- Spike generation
+        ss: std_logic;
+        as: natural range x_mem_t'range;
+        es: std_logic;
+    end record;
+    signal pn, pr: p_t;
+begin
+
+    ---
+    -- Memories
+    mem: process (clk)
+    begin
+        if rising_edge(clk) then
+            -- x
+            if x_rd = '1' then
+                x_out <= x_mem(x_ra);
+            end if;
+            if x_wr = '1' then
+                x_mem(x_wa) <= x_in;
+            end if;
+
+            -- w
+            if w_rd = '1' then
+                w_out <= w_ext(w_mem(w_ra), fc_wsh(x_ra));
+            end if;
+        end if;
+    end process;
+
+    ---
+    -- Pipeline
+    pipe: process (rst, clk)
+    begin
+        if rst = '0' then
+            pr.er <= '0';
+            pr.eu <= '0';
+            pr.ef <= '0';
+            pr.es <= '0';
+        elsif rising_edge(clk) then
+            pr <= pn;
+        end if;
+    end process;
+
+    ---
+    -- Datapath
+    dp: process (
+        pr,
+        adr, wadr, enr, enu,
+        x_out, w_out
+    )
+        variable x:  x_t;
+        variable xs: x_t;
+        variable xd: x_t;
+        variable s:  std_logic;
+    begin
+        -- Default
+        pn <= pr;
+
+        ---
+        -- Reads
+        x_ra <= to_integer(unsigned(adr));
+        x_rd <= enr or enu;
+
+        w_ra <= to_integer(unsigned(wadr));
+        w_rd <= enr;
+
+        pn.a  <= to_integer(unsigned(adr));
+        pn.er <= enr;
+        pn.eu <= enu;
+
+        ---
+        -- Neurons
+        if pr.ef = '1' and pr.af = pr.a then
+            x := pr.xf;     -- Read after write
+        else
+            x := x_out;
+        end if;
+
+        xs := gi(x, '1', w_out);    -- Synapse event
+        xd := dyn(x);               -- Update event
+        s  := h(xd);
+
+        ---
+        -- Writeback
+        x_wa <= pr.a;
+        x_wr <= pr.er or pr.eu;
+        if pr.eu = '1' then
+            x_in  <= gv(xd, s);
+            pn.xf <= gv(xd, s);
+        else
+            x_in  <= xs;
+            pn.xf <= xs;
+        end if;
+        pn.af <= pr.a;
+        pn.ef <= pr.er or pr.eu;
+
+        ---
+        -- Spike generation
+        pn.ss <= s;
+        pn.as <= pr.a;
+        pn.es <= pr.eu;
+
+        so  <= pr.ss;  -- Output spike
+        ado <= std_logic_vector(to_unsigned(pr.as, ado'length));  -- Output address
+        eno <= pr.es;  -- Output enable
+    end process;
+
+end architecture;
@@ -0,0 +1,159 @@
+---
+-- {{ name }}_npu_aux.vhd
+--
+-- Fully-connected layer (sparse) - Neuron Processing Unit functions
+--
+-- params:
+--      'name': self.label
+---
+
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+library work;
+use work.{{ name }}_config.all;
+
+package {{ name }}_npu_aux is
+    ---
+    -- Neuron model types
+    subtype x_t is signed(15 downto 0);
+    subtype w_t is signed(fc_wbits-1 downto 0);   -- Weight memory word
+
+    ---
+    -- Weight memory types
+    type w_mem_t is array (0 to fc_words-1) of w_t;
+
+    ---
+    -- NPU function 
+    function gv(x: x_t; so: std_logic) return x_t;
+    function gi(x: x_t; s: std_logic; w: x_t) return x_t;
+    function dyn(xg: x_t) return x_t;
+    function h(xs: x_t) return std_logic;
+
+    ---
+    -- Weight scaling
+    function w_ext(w: w_t; sh: natural) return x_t;
+
+    ---
+    -- Neuron weight conversion
+    {% if w_file -%}
+    impure function mem2vhd(path: string) return w_mem_t;
+    {%- else -%}
+    function weight_conv(weights: fc_layer_weights_t) return w_mem_t;
+    {%- endif %}
+
+end package;
+
+package body {{ name }}_npu_aux is
+    ---
+    -- (0) Virtual spike processing
+    function gv(x: x_t; so: std_logic) return x_t is
+        constant urest: x_t := to_signed(-64,  16);
+        variable xg:    x_t;
+    begin
+        -- Default - no spiking
+        xg := x;
+
+        -- Virtual synapse
+        if so = '1' then
+            xg := urest;
+        end if;
+
+        return xg;
+    end function;
+
+    ---
+    -- (1) Input spike processing
+    function gi(x: x_t; s: std_logic; w: x_t) return x_t is
+        variable xg: x_t;
+    begin
+        -- Default - no spiking
+        xg := x;
+
+        if s = '1' then
+            xg := xg + w;
+        end if;
+
+        return xg;
+    end function;
+
+    ---
+    -- (2) Advance neuron dynamics
+    function dyn(xg: x_t) return x_t is
+        constant urest: x_t := to_signed(-64,  16);
+        variable dx:    x_t;
+        variable xs:    x_t;
+    begin
+        xs := xg;
+        dx := shift_right(-(xg - urest), 5);    -- d/dt
+        xs := xg + dx;                          -- Solver
+
+        return xs;
+    end function;
+
+    ---
+    -- (3) Generate output spike
+    function h(xs: x_t) return std_logic is
+        constant uth:   x_t := to_signed(8192, 16);
+        variable spike: std_logic;
+    begin
+        -- Default
+        spike := '0';
+
+        if xs > uth then
+            spike := '1';
+        end if;
+
+        return spike;
+    end function;
+
+    ---
+    -- Weight scaling (w_t -> x_t)
+    function w_ext(w: w_t; sh: natural) return x_t is
+    begin
+        return shift_left(resize(w, 16), sh);
+    end function;
+
+{% if w_file %}    ---
+    -- Neuron weight memory init file (one 16-bit two's complement hex
+    -- word per line)
+    impure function mem2vhd(path: string) return w_mem_t is
+        use std.textio.all;
+        use ieee.std_logic_textio.all;
+
+        file     f:       text;
+        variable fstatus: file_open_status;
+        variable fline:   line;
+        variable fword:   std_logic_vector(15 downto 0);
+
+        variable wm: w_mem_t;
+    begin
+        file_open(fstatus, f, path, read_mode);
+
+        if fstatus /= open_ok then
+            report "File error: " & file_open_status'image(fstatus) severity failure;
+        end if;
+
+        for synapse in wm'range loop
+            readline(f, fline);
+            hread(fline, fword);
+            wm(synapse) := resize(signed(fword), w_t'length);
+        end loop;
+
+        file_close(f);
+        return wm;
+    end function;
+{% else %}    ---
+    -- Neuron weight conversion
+    function weight_conv(weights: fc_layer_weights_t) return w_mem_t is
+        variable wm: w_mem_t;
+    begin
+        for synapse in weights'range loop
+            wm(synapse) := to_signed(weights(synapse), w_t'length);
+        end loop;
+
+        return wm;
+    end function;
+{% endif %}
+end package body;
\ No newline at end of file
@@ -36,7 +36,7 @@ package body {{ name }}_aux is
         end if;
     
         i := 0;
-        while not endfile(f) loop
+        while not endfile(f) and i < size loop  -- First sample of batched files
             readline(f, fline);
             --report fline.all;
 
@@ -12,6 +12,11 @@ port (
 
     tick: in  std_logic;
 
+    -- Input memory load port
+    wri:  in  std_logic := '0';
+    wai:  in  std_logic_vector(logn-1 downto 0) := (others => '0');
+    wdi:  in  std_logic_vector(w-1 downto 0) := (others => '0');
+
     so:   out std_logic;
     ado:  out std_logic_vector(logn-1 downto 0);
     eno:  out std_logic
@@ -19,8 +24,11 @@ port (
 end entity;
 
 architecture arch of {{ name }}_core is
-    --signal mem: mem_t(0 to n-1) := numpy2vhd("mnist.txt", n);
+    {% if file -%}
+    signal mem: mem_t(0 to n-1) := numpy2vhd("{{ file }}", n);
+    {%- else -%}
     signal mem: mem_t(0 to n-1) := (others => (0 => '0', 1 => '0', others => '1'));
+    {%- endif %}
     signal wra, rda: unsigned(logn-1 downto 0);
     signal wrd, rdd: unsigned(w-1 downto 0);
     signal wr,  rd:  std_logic;
@@ -44,6 +52,10 @@ begin
 
     ---
     -- Input memory
+    wra <= unsigned(wai);
+    wrd <= unsigned(wdi);
+    wr  <= wri;
+
     inmem: process (clk)
     begin
         if rising_edge(clk) then
@@ -115,9 +127,6 @@ begin
         rn <= rr;
 
         -- Input memory defaults
-        wra <= (others => '0');
-        wrd <= (others => '0');
-        wr  <= '0';
         rda <= rr.addr;
         rd  <= '0';
 
@@ -49,7 +49,7 @@ architecture arch of {{ name }}_npu is
     signal so_wa, so_ra:  natural range so_mem_t'range;
 
     -- w
-    signal w_out: w_t := weight_conv(pool_w);
+    signal w_out: x_t := w_ext(weight_conv(pool_w), pool_wsh);
 
     ---
     -- Pipeline
@@ -18,7 +18,7 @@ package {{ name }}_npu_aux is
     ---
     -- Neuron model types
     subtype x_t is signed(15 downto 0);
-    subtype w_t is signed(15 downto 0);
+    subtype w_t is signed(pool_wbits-1 downto 0);   -- Weight memory word
 
     ---
     -- Weight memory types
@@ -28,13 +28,17 @@ package {{ name }}_npu_aux is
     ---
     -- NPU function 
     function gv(x: x_t; so: std_logic) return x_t;
-    function gi(x: x_t; s: std_logic; w: w_t) return x_t;
+    function gi(x: x_t; s: std_logic; w: x_t) return x_t;
     function dyn(xg: x_t) return x_t;
     function h(xs: x_t) return std_logic;
 
+    ---
+    -- Weight scaling
+    function w_ext(w: w_t; sh: natural) return x_t;
+
     ---
     -- Neuron weight conversion
-    function weight_conv(weight: real) return w_t;
+    function weight_conv(weight: integer) return w_t;
 
 end package;
 
@@ -58,7 +62,7 @@ package body {{ name }}_npu_aux is
 
     ---
     -- (1) Input spike processing
-    function gi(x: x_t; s: std_logic; w: w_t) return x_t is
+    function gi(x: x_t; s: std_logic; w: x_t) return x_t is
         variable xg: x_t;
     begin
         -- Default - no spiking
@@ -101,12 +105,19 @@ package body {{ name }}_npu_aux is
         return spike;
     end function;
 
+    ---
+    -- Weight scaling (w_t -> x_t)
+    function w_ext(w: w_t; sh: natural) return x_t is
+    begin
+        return shift_left(resize(w, 16), sh);
+    end function;
+
     ---
     -- Neuron weight conversion
-    function weight_conv(weight: real) return w_t is
+    function weight_conv(weight: integer) return w_t is
         variable w: w_t;
     begin
-        w := to_signed(integer(weight * 2.0**7), 16);
+        w := to_signed(weight, w_t'length);
 
         return w;
     end function;
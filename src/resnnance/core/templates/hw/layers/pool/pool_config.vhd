@@ -7,8 +7,10 @@
 --      'name': self.label,
 --      'm': self.input_shape,
 --      'p': self.pool,
---      'n': self.__get_output_shape(),
---      'weight': self.__get_weight()
+--      'n': self.get_output_shape(),
+--      'weight': quantized weight,
+--      'bits': weight width,
+--      'shift': weight shift
 ---
 
 library ieee;
@@ -32,7 +34,12 @@ package {{ name }}_config is
 
     constant pool_p:  natural := pool_px * pool_py;
 
-    constant pool_w:  real := {{ weight }};
+    constant pool_w:  integer := {{ weight }};
+
+    ---
+    -- Weight format (w_t width, left shift into x_t)
+    constant pool_wbits: natural := {{ bits }};
+    constant pool_wsh:   natural := {{ shift }};
 
     constant pool_logm: natural := integer(ceil(log2(real(pool_m))));
     constant pool_logn: natural := integer(ceil(log2(real(pool_n))));
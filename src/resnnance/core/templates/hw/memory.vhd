@@ -2,6 +2,21 @@ library ieee;
 use ieee.std_logic_1164.all;
 use ieee.numeric_std.all;
 
+{#- Spike write, one per NPU instance (neuron slices of layer.slice) -#}
+{% macro write(layer) -%}
+            {% if layer.parallel > 1 -%}
+            for i in 0 to {{ layer.parallel }}-1 loop
+                if eno_{{ layer.label }}(i) = '1' then
+                    smem_{{ layer.label }}(to_integer(unsigned(ado_{{ layer.label }})) + i*{{ layer.slice }}) <= so_{{ layer.label }}(i);
+                end if;
+            end loop;
+            {%- else -%}
+            if eno_{{ layer.label }} = '1' then
+                smem_{{ layer.label }}(to_integer(unsigned(ado_{{ layer.label }}))) <= so_{{ layer.label }};
+            end if;
+            {%- endif %}
+{%- endmacro %}
+
 entity {{ name }} is
 port (
     clk: in std_logic;
@@ -17,9 +32,9 @@ port (
     eni_{{ layer.label }}: in  std_logic;
     {% endif %}
     -- Output
-     so_{{ layer.label }}: in  std_logic;
+     so_{{ layer.label }}: in  std_logic{% if layer.parallel > 1 %}_vector(0 to {{ layer.parallel }}-1){% endif %};
     ado_{{ layer.label }}: in  std_logic_vector({{ layer.logn }}-1 downto 0);
-    eno_{{ layer.label }}: in  std_logic;
+    eno_{{ layer.label }}: in  std_logic{% if layer.parallel > 1 %}_vector(0 to {{ layer.parallel }}-1){% endif %};
     {%- endfor %}
 
     {% with last = layers | last -%}
@@ -50,9 +65,7 @@ begin
     begin
         if rising_edge(clk) then
             -- Write
-            if eno_{{ loop.previtem.label }} = '1' then
-                smem_{{ loop.previtem.label }}(to_integer(unsigned(ado_{{ loop.previtem.label }}))) <= so_{{ loop.previtem.label }};
-            end if;
+            {{ write(loop.previtem) }}
             -- Read
             if eni_{{ layer.label }} = '1' then
                 si_{{ layer.label }} <= smem_{{ loop.previtem.label }}(to_integer(unsigned(adi_{{ layer.label }})));
@@ -68,9 +81,7 @@ begin
     begin
         if rising_edge(clk) then
             -- Write
-            if eno_{{ last.label }} = '1' then
-                smem_{{ last.label }}(to_integer(unsigned(ado_{{ last.label }}))) <= so_{{ last.label }};
-            end if;
+            {{ write(last) }}
             -- Read
             if eni = '1' then
                 si <= smem_{{ last.label }}(to_integer(unsigned(adi)));
@@ -7,6 +7,14 @@ port (
     clk:  in std_logic;
     tick: in std_logic;
 
+    {% with first = layers | first -%}
+    ---
+    -- Network input (input memory load port)
+    wri: in  std_logic := '0';
+    wai: in  std_logic_vector({{ first.logn }}-1 downto 0) := (others => '0');
+    wdi: in  std_logic_vector(7 downto 0) := (others => '0');
+    {%- endwith %}
+
     {% with last = layers | last -%}
     ---
     -- Network output
@@ -28,9 +36,9 @@ architecture arch of {{ name }} is
     signal adi_{{ layer.label }}: std_logic_vector({{ loop.previtem.logn }}-1 downto 0);
     signal eni_{{ layer.label }}: std_logic;
     {% endif %}
-    signal  so_{{ layer.label }}: std_logic;
+    signal  so_{{ layer.label }}: std_logic{% if layer.parallel > 1 %}_vector(0 to {{ layer.parallel }}-1){% endif %};
     signal ado_{{ layer.label }}: std_logic_vector({{ layer.logn }}-1 downto 0);
-    signal eno_{{ layer.label }}: std_logic;
+    signal eno_{{ layer.label }}: std_logic{% if layer.parallel > 1 %}_vector(0 to {{ layer.parallel }}-1){% endif %};
     {%- endfor %}
 begin
 
@@ -39,7 +47,10 @@ begin
     {{ layer.label }}: entity work.{{ layer.label }}_core
     port map (
         rst => rst, clk => clk, tick => tick,
-        {% if not loop.first %}
+        {% if loop.first %}
+        -- Input memory
+        wri => wri, wai => wai, wdi => wdi,
+        {% else %}
         -- Input
         si  =>  si_{{ layer.label }},
         adi => adi_{{ layer.label }},
@@ -1,6 +1,6 @@
 from .populations import Population, PopulationView, Assembly
 from .projections import Projection
-from .connectors import ConvConnector, PoolConnector
+from .connectors import ConvConnector, PoolConnector, FromArrayConnector
 from .models.cells import *
 from .models.synapses import *
 from .control import (
@@ -1,46 +1,106 @@
 import resnnance.core as rsnn
+from resnnance.core.logger import resnnance_metrics
 
-from resnnance.pyNN.connectors import ConvConnector, PoolConnector
-from pyNN.connectors import FromListConnector
+from resnnance.pyNN.connectors import ConvConnector, PoolConnector, FromArrayConnector
+from pyNN.connectors import FromListConnector, FromFileConnector, FixedProbabilityConnector
 
 import numpy as np
+import networkx as nx
 
 class Builder():
 
-    def __init__(self, simulator):
+    def __init__(self, simulator, dtype=np.float64, sparse=None):
         self.simulator = simulator
 
+        # Layer info options
+        self.options = {
+            'dtype': dtype,     # Layer weight dtype
+            'sparse': sparse,   # Density threshold for sparse dense layers (None: never sparse)
+        }
+
     def build(self):
         """
         Takes all simulator populations and projections and generates
         a compile-ready Resnnance model
         """
+        with resnnance_metrics().span("build", populations=len(self.simulator.populations)):
+            self.__build()
+
+    def __build(self):
         # Take self.simulator.populations and self.simulator.projections
         # and generate resnnance model
         self.simulator.model = rsnn.Model()
 
+        # Index projections by post/pre population and get the layer order
+        incoming, outgoing = self.index()
+        graph = self.graph(outgoing)
+        try:
+            order = list(nx.lexicographical_topological_sort(graph))
+        except nx.NetworkXUnfeasible:
+            raise RuntimeError('Recurrent networks not supported')
+
         # Create layers
-        for population in self.simulator.populations:
-            # For each population, look for incoming projections
-            incoming = [projection for projection in self.simulator.projections \
-                        if projection.post == population]
+        populations = self.simulator.populations
+        self.simulator.layers = {}
+        for i in order:
+            population = populations[i]
 
             # Get layer information from incoming projections
-            if len(incoming) > 1:
+            if len(incoming[population]) > 1:
                 raise RuntimeError('Layers with multiple inputs not supported')
 
-            layer_class = Builder.__get_layer_class(incoming)
-            layer_info = Builder.__get_layer_info(incoming)
+            layer_class = Builder.__get_layer_class(incoming[population])
+            layer_info = Builder.__get_layer_info(incoming[population], self.options)
+            resnnance_metrics().count("connections", sum(len(projection) for projection in incoming[population]))
     
             # Create and add layer
-            if len(incoming) == 0:
+            if len(incoming[population]) == 0:
                 layer = rsnn.Input(population.label, population.size)
             else:
                 layer = layer_class(population.label, layer_info)
 
             self.simulator.model.add_layer(layer)
-        
-        # TODO check if sequential order is kept between projections and layers
+            self.simulator.layers[population] = layer
+
+        # Layer graph (cached on the model, nodes in layer order)
+        layers = [self.simulator.layers[populations[i]] for i in order]
+        self.simulator.model.graph = nx.DiGraph()
+        self.simulator.model.graph.add_nodes_from((layer.label, {'layer': layer}) for layer in layers)
+        self.simulator.model.graph.add_edges_from(
+            (self.simulator.layers[populations[pre]].label, self.simulator.layers[populations[post]].label)
+            for pre, post in graph.edges
+        )
+
+    def index(self):
+        """
+        Returns the incoming and outgoing projections of every population
+        """
+        incoming = {population: [] for population in self.simulator.populations}
+        outgoing = {population: [] for population in self.simulator.populations}
+
+        # Projections between population views are not layers
+        populations = {id(population) for population in self.simulator.populations}
+        for projection in self.simulator.projections:
+            if id(projection.pre) in populations and id(projection.post) in populations:
+                incoming[projection.post].append(projection)
+                outgoing[projection.pre].append(projection)
+
+        return incoming, outgoing
+
+    def graph(self, outgoing):
+        """
+        Returns the population DAG (nodes are population indices, in
+        creation order)
+        """
+        index = {population: i for i, population in enumerate(self.simulator.populations)}
+
+        graph = nx.DiGraph()
+        graph.add_nodes_from(range(len(index)))
+        graph.add_edges_from(
+            (index[projection.pre], index[projection.post])
+            for projections in outgoing.values() for projection in projections
+        )
+        return graph
 
     def __get_layer_class(incoming):
         """
@@ -55,7 +115,7 @@ class Builder():
         
         return layer_class
     
-    def __get_layer_info(incoming):
+    def __get_layer_info(incoming, options):
         """
         Returns resnnance layer info from list of incoming projections
         """
@@ -65,30 +125,69 @@ class Builder():
         else:
             # Gets relevant __info function 
             info = Builder.conversion[incoming[0]._connector.__class__]['info']
-            return info(incoming[0])
+            return info(incoming[0], **options)
 
-    def __info_dense(projection):
+    def __info_dense(projection, dtype=np.float64, sparse=None, **options):
         """
         Returns dense layer weights from a PyNN FromListConnector
         """
+        pre, post, weight = projection.get_arrays('presynaptic_index', 'postsynaptic_index', 'weight')
+
+        # Sparse CSR matrix for low density layers
+        if sparse is not None and len(weight) <= sparse * projection.shape[0] * projection.shape[1]:
+            return Builder.__info_sparse(projection.shape, pre, post, weight.astype(dtype))
+
         # Create weight matrix for incoming projection
-        weights = np.zeros(projection.shape)
+        weights = np.zeros(projection.shape, dtype=dtype)
 
-        # Fill matrix with weights
-        for conn in projection.connections:
-            # Map projection connection weights into matrix (M, N): M = # synapses/pre neurons, N = # post neurons
-            weights[conn.presynaptic_index, conn.postsynaptic_index] = conn.weight
+        # Map projection connection weights into matrix (M, N): M = # synapses/pre neurons, N = # post neurons
+        weights[pre, post] = weight
 
         return weights
 
-    def __info_conv2d(projection):
+    def __info_random(projection, dtype=np.float64, **options):
+        """
+        Returns sparse dense layer weights from a PyNN FixedProbabilityConnector
+        (random connectivity is stored as CSR, whatever its density)
+        """
+        pre, post, weight = projection.get_arrays('presynaptic_index', 'postsynaptic_index', 'weight')
+        return Builder.__info_sparse(projection.shape, pre, post, weight.astype(dtype))
+
+    def __info_sparse(shape, pre, post, weight):
+        """
+        Returns a CSR weight matrix (one row per presynaptic neuron)
+        from connection arrays
+        """
+        # Keep last connection between each pair of neurons (as in a dense matrix)
+        key = pre.astype(np.int64) * shape[1] + post
+        key, last = np.unique(key[::-1], return_index=True)
+        weight = weight[::-1][last]
+
+        # Remove zero weights
+        nonzero = weight != 0
+        key, weight = key[nonzero], weight[nonzero]
+
+        # Sorted keys are already in row-major (pre, post) order
+        rows = key // shape[1]
+        indptr = np.zeros(shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=shape[0]), out=indptr[1:])
+
+        return {
+            'shape': shape,
+            'indptr': indptr,
+            'indices': key % shape[1],
+            'weights': weight
+        }
+
+    def __info_conv2d(projection, dtype=np.float64, **options):
         """
         Returns conv2D layer info from a PyNN ConvConnector
         """
-        info = projection.info
+        info = dict(projection.info)
+        info['weights'] = np.asarray(info['weights'], dtype=dtype)
         return info
 
-    def __info_pooling(projection):
+    def __info_pooling(projection, **options):
         """
         Returns pooling layer info from a PyNN PoolConnector
         """
@@ -97,7 +196,10 @@ class Builder():
 
     # PyNN connector to Resnnance layer conversion table
     conversion = {
-        FromListConnector: {'class': rsnn.Dense,   'info': __info_dense},
-        ConvConnector:     {'class': rsnn.Conv2D,  'info': __info_conv2d},
-        PoolConnector:     {'class': rsnn.Pooling, 'info': __info_pooling},
+        FromListConnector:  {'class': rsnn.Dense,   'info': __info_dense},
+        FromFileConnector:  {'class': rsnn.Dense,   'info': __info_dense},
+        FromArrayConnector: {'class': rsnn.Dense,   'info': __info_dense},
+        FixedProbabilityConnector: {'class': rsnn.Dense, 'info': __info_random},
+        ConvConnector:      {'class': rsnn.Conv2D,  'info': __info_conv2d},
+        PoolConnector:      {'class': rsnn.Pooling, 'info': __info_pooling},
     }
\ No newline at end of file
@@ -1,9 +1,21 @@
-from pyNN.connectors import Connector
+from pyNN import errors
+from pyNN.connectors import Connector, FromListConnector
+from pyNN.standardmodels import StandardSynapseType
+
+import os
+import numpy as np
+from copy import deepcopy
+
+# Synapses generated per flatten chunk
+CHUNK = 2**20
 
 class MovingConnector(Connector):
     """
-    Abstract base class for Connectors based on 
+    Abstract base class for Connectors based on
     moving kernels, pooling or CNN related layers
+
+    Neurons are indexed map-major, as in the hardware layers: neuron
+    (y, x) of map z of a (ny, nx) map is z * ny * nx + y * nx + x
     """
     def connect(self, projection):
         """
@@ -13,11 +25,49 @@ class MovingConnector(Connector):
         """
         projection.info = self.info
 
-    def flatten(self):
-        # TODO method that returns a dense connector (FromListConnector)
-        # with the same functionality
+    def coo(self, chunk=CHUNK):
+        """
+        Generates the explicit synapses as (pre, post, weight) COO arrays,
+        one chunk of output positions (about chunk synapses) at a time
+        """
         raise NotImplementedError
 
+    def flatten(self, chunk=CHUNK):
+        """
+        Returns a dense connector (FromListConnector) with the same
+        functionality
+        """
+        chunks = list(self.coo(chunk))
+        if chunks:
+            pre, post, weight = (np.concatenate(column) for column in zip(*chunks))
+        else:
+            pre, post, weight = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        return FromListConnector(np.column_stack([pre, post, weight]), column_names=['weight'])
+
+    def _windows(self, kernel, strides, padding, chunk):
+        """
+        Generates the output positions (oy, ox) and the clipped input
+        coordinates (iy, ix, valid) of their kernel footprints, in chunks
+        """
+        my, mx = self.info['input_shape'][:2]
+        ky, kx = kernel
+        sy, sx = strides
+        py, px = padding
+        ny, nx = self.get_output_shape()[:2]
+
+        step = max(1, chunk)
+        for start in range(0, ny * nx, step):
+            position = np.arange(start, min(start + step, ny * nx))
+            oy, ox = position // nx, position % nx
+
+            # Footprint (positions, ky, kx)
+            iy = (oy * sy - py)[:, None, None] + np.arange(ky)[None, :, None]
+            ix = (ox * sx - px)[:, None, None] + np.arange(kx)[None, None, :]
+            iy, ix = np.broadcast_arrays(iy, ix)
+            valid = (iy >= 0) & (iy < my) & (ix >= 0) & (ix < mx)
+
+            yield position, iy, ix, valid
+
 class ConvConnector(MovingConnector):
     """
     Make connections for a convolutional layer
@@ -36,6 +86,42 @@ class ConvConnector(MovingConnector):
         super().__init__(safe=safe, callback=callback)
         self.info = info
 
+    def get_output_shape(self):
+        my, mx, mz    = self.info['input_shape']
+        ky, kx, kz, f = self.info['kernel_shape']
+        sy, sx        = self.info['strides']
+
+        if self.info['padding'] == 'valid':    # No padding
+            return (my - ky + 1) // sy, (mx - kx + 1) // sx, f
+        elif self.info['padding'] == 'same':   # Padding generates same sized output
+            return my // sy, mx // sx, f
+
+    def coo(self, chunk=CHUNK):
+        my, mx, mz    = self.info['input_shape']
+        ky, kx, kz, f = self.info['kernel_shape']
+        ny, nx, _     = self.get_output_shape()
+        weights = np.asarray(self.info['weights']).reshape(ky, kx, kz, f)
+
+        if self.info['padding'] == 'same':
+            padding = (ky - 1) // 2, (kx - 1) // 2
+        else:
+            padding = 0, 0
+
+        # Output positions per chunk (every position has ky * kx * kz * f synapses)
+        positions = chunk // (ky * kx * kz * f)
+        for position, iy, ix, valid in self._windows((ky, kx), self.info['strides'], padding, positions):
+            # Valid taps of the footprint (taps, kz) inputs and (taps, f) outputs
+            p, dy, dx = np.nonzero(valid)
+            pre  = np.arange(kz)[None, :] * my * mx + (iy[p, dy, dx] * mx + ix[p, dy, dx])[:, None]
+            post = np.arange(f)[None, :] * ny * nx + position[p][:, None]
+
+            # Synapses (taps, kz, f)
+            yield (
+                np.repeat(pre.ravel(), f),
+                np.broadcast_to(post[:, None, :], (len(p), kz, f)).ravel(),
+                weights[dy, dx].reshape(-1)
+            )
+
 class PoolConnector(MovingConnector):
     """
     Make connections for a convolutional layer
@@ -52,4 +138,133 @@ class PoolConnector(MovingConnector):
 
     def __init__(self, info, safe=True, callback=None):
         super().__init__(safe=safe, callback=callback)
-        self.info = info
\ No newline at end of file
+        self.info = info
+
+    def get_output_shape(self):
+        my, mx, mz = self.info['input_shape']
+        py, px     = self.info['pool_size']
+
+        return my // py, mx // px, mz
+
+    def coo(self, chunk=CHUNK):
+        my, mx, mz = self.info['input_shape']
+        py, px     = self.info['pool_size']
+        ny, nx, _  = self.get_output_shape()
+        weight = 1 / (py * px)
+
+        # Non-overlapping windows, one synapse per input of each window and map
+        positions = chunk // (py * px * mz)
+        for position, iy, ix, valid in self._windows((py, px), (py, px), (0, 0), positions):
+            p, dy, dx = np.nonzero(valid)
+            pre  = np.arange(mz)[None, :] * my * mx + (iy[p, dy, dx] * mx + ix[p, dy, dx])[:, None]
+            post = np.arange(mz)[None, :] * ny * nx + position[p][:, None]
+            yield pre.ravel(), post.ravel(), np.full(pre.size, weight)
+
+def indices(values, chunk=CHUNK):
+    """
+    Returns connection indices as an integer array - integer arrays as they
+    are (no copy), other dtypes cast to int64 chunk by chunk
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.integer):
+        return values
+
+    cast = np.empty(len(values), dtype=np.int64)
+    for start in range(0, len(values), chunk):
+        cast[start:start + chunk] = values[start:start + chunk]
+    return cast
+
+class FromArrayConnector(Connector):
+    """
+    Make connections from whole arrays, without per-connection Python work
+
+    Arguments:
+        `source`:
+            connection table (N, 2 + p) as an array, np.memmap or .npy file
+            (memory-mapped), .npz file holding either such a table or 'pre',
+            'post' and parameter arrays, dict of arrays or (pre, post, p1,
+            ..., pn) tuple of arrays
+        `column_names`:
+            the names of the parameter columns p1, ..., pn. If not provided,
+            tables of 4 columns hold 'weight', 'delay' (as in
+            FromListConnector)
+        `mmap`:
+            if True, .npy files are memory-mapped instead of loaded
+        `safe`:
+            if True, check that indices are within the populations. If False,
+            this check is skipped.
+        `callback`:
+            if True, display a progress bar on the terminal.
+
+    Integer index columns and parameter columns the synapse type does not
+    transform are stored as given (e.g. memory-mapped views of the table),
+    other index columns are cast to int64 one chunk at a time
+    """
+    parameter_names = ('source',)
+
+    def __init__(self, source, column_names=None, mmap=True, safe=True, callback=None):
+        super().__init__(safe=safe, callback=callback)
+
+        # Load files
+        if isinstance(source, (str, os.PathLike)):
+            source = np.load(source, mmap_mode='r' if mmap else None)
+            if isinstance(source, np.lib.npyio.NpzFile):
+                with source:
+                    source = dict(source) if 'pre' in source.files else source[source.files[0]]
+
+        # Split into index and parameter columns
+        if isinstance(source, dict):
+            columns = dict(source)
+            pre, post = columns.pop('pre'), columns.pop('post')
+        elif isinstance(source, np.ndarray) and source.ndim == 2:
+            if column_names is None:
+                if source.shape[1] == 2:
+                    column_names = ()
+                elif source.shape[1] == 4:
+                    column_names = ('weight', 'delay')
+                else:
+                    raise TypeError("Argument 'column_names' is required.")
+            if source.shape[1] != len(column_names) + 2:
+                raise ValueError(f"connection table has {source.shape[1] - 2} parameter columns, "
+                                 f"but {len(column_names)} column names provided.")
+            pre, post = source[:, 0], source[:, 1]
+            columns = {name: source[:, col] for col, name in enumerate(column_names, 2)}
+        else:
+            pre, post, *values = source
+            if column_names is None:
+                column_names = ('weight', 'delay')[:len(values)]
+            columns = dict(zip(column_names, values))
+
+        self.pre, self.post = indices(pre), indices(post)
+        self.columns = {name: np.asarray(value) for name, value in columns.items()}
+
+        if any(len(value) != len(self.pre) for value in [self.post] + list(self.columns.values())):
+            raise ValueError("Connection arrays of different lengths")
+
+    def connect(self, projection):
+        """
+        Stores all connections at once (projection._bulk_connect)
+        """
+        synapse = projection.synapse_type
+        for name in self.columns:
+            if name not in synapse.get_parameter_names():
+                raise ValueError("%s is not a valid parameter for %s" % (name, synapse.__class__.__name__))
+
+        n = len(self.pre)
+        if n == 0:
+            return
+        if self.safe:
+            if self.pre.min() < 0 or self.pre.max() >= projection.pre.size:
+                raise errors.ConnectionError("source index out of range")
+            if self.post.min() < 0 or self.post.max() >= projection.post.size:
+                raise errors.ConnectionError("target index out of range")
+
+        # Synapse parameters (homogeneous defaults stay scalar, untransformed columns are not copied)
+        parameters = deepcopy(synapse.parameter_space)
+        parameters.shape = (n,)
+        parameters.update(**self.columns)
+        if isinstance(synapse, StandardSynapseType):
+            parameters = synapse.translate(parameters, copy=False)
+        parameters.evaluate(simplify=True)
+
+        projection._bulk_connect(self.pre, self.post, **dict(parameters.items()))
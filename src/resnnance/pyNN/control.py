@@ -11,6 +11,7 @@ def setup(timestep=DEFAULT_TIMESTEP, min_delay=DEFAULT_MIN_DELAY, **extra_params
 
     # Extract parameters from input arguments
     max_delay = extra_params.pop('max_delay', DEFAULT_MAX_DELAY)
+    mode = extra_params.pop('mode', 'auto')
 
     # Run pyNN common setup() - Mostly parameter checks
     control.setup(timestep, min_delay, **extra_params)
@@ -26,6 +27,7 @@ def setup(timestep=DEFAULT_TIMESTEP, min_delay=DEFAULT_MIN_DELAY, **extra_params
     simulator.state.min_delay = min_delay
     simulator.state.max_delay = max_delay
     simulator.state.dt = timestep
+    simulator.state.mode = mode
 
 def compile():
     """
@@ -1,5 +1,6 @@
 import numpy as np
 
+from pyNN import errors
 from pyNN.common import populations
 from pyNN.standardmodels import StandardCellType
 from pyNN.parameters import ArrayParameter, Sequence, ParameterSpace, simplify, LazyArray
@@ -7,6 +8,59 @@ from pyNN.parameters import ArrayParameter, Sequence, ParameterSpace, simplify,
 from resnnance.pyNN import simulator
 from resnnance.pyNN.recording import Recorder
 
+class IDRange(object):
+    """
+    Cell IDs of a population, consecutive (start, size) or selected by an
+    array of indices from start (views)
+
+    ID objects are only created for the cells accessed: integer indices
+    return a single ID, slices/masks/index arrays another IDRange and
+    arrays hold the integer IDs.
+    """
+
+    def __init__(self, parent, start, size, index=None):
+        self.parent = parent
+        self.start = start
+        self.size = size if index is None else len(index)
+        self.index = index
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return (self.__id(value) for value in self.__values())
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            if not -self.size <= index < self.size:
+                raise IndexError(index)
+            index = int(index) % self.size
+            return self.__id(self.start + (index if self.index is None else int(self.index[index])))
+
+        if self.index is None:
+            return IDRange(self.parent, self.start, self.size, np.arange(self.size)[index])
+        return IDRange(self.parent, self.start, self.size, self.index[index])
+
+    def __array__(self, dtype=None, copy=None):
+        values = self.start + (np.arange(self.size) if self.index is None else self.index)
+        return values if dtype is None else values.astype(dtype)
+
+    def __contains__(self, id):
+        if self.index is None:
+            return self.start <= id < self.start + self.size
+        return bool(np.any(self.index == id - self.start))
+
+    def __values(self):
+        if self.index is None:
+            return range(self.start, self.start + self.size)
+        return (self.start + self.index).tolist()
+
+    def __id(self, value):
+        id = simulator.ID(value)
+        id.parent = self.parent
+        return id
+
+
 class Assembly(populations.Assembly):
     _simulator = simulator
 
@@ -18,30 +72,41 @@ class Population(populations.Population):
     _assembly_class = Assembly
 
     def _create_cells(self):
-        id_range = np.arange(simulator.state.id_counter,
-                             simulator.state.id_counter + self.size)
-        self.all_cells = np.array([simulator.ID(id) for id in id_range],
-                                  dtype=simulator.ID)
+        # Lazy ID range, ID objects are created on access
+        start = simulator.state.id_counter
+        self.all_cells = IDRange(self, start, self.size)
 
-        def is_local(id):
-            return (id % simulator.state.num_processes) == simulator.state.mpi_rank
-        self._mask_local = is_local(self.all_cells)
+        # Vectorized locality mask
+        if simulator.state.num_processes == 1:
+            self._mask_local = np.ones(self.size, dtype=bool)
+        else:
+            id_range = np.arange(start, start + self.size)
+            self._mask_local = (id_range % simulator.state.num_processes) == simulator.state.mpi_rank
 
+        # Parameters stay lazy until accessed
         if isinstance(self.celltype, StandardCellType):
             parameter_space = self.celltype.native_parameters
         else:
             parameter_space = self.celltype.parameter_space
         parameter_space.shape = (self.size,)
-        parameter_space.evaluate(mask=self._mask_local, simplify=False)
-        self._parameters = parameter_space.as_dict()
+        self._parameter_space = parameter_space
+        self._evaluated = None
 
-        for id in self.all_cells:
-            id.parent = self
         simulator.state.id_counter += self.size
 
         # Resnnance population
         simulator.state.populations.append(self)
 
+    @property
+    def _parameters(self):
+        """
+        Native parameter arrays (evaluated on first access)
+        """
+        if self._evaluated is None:
+            self._parameter_space.evaluate(mask=self._mask_local, simplify=False)
+            self._evaluated = self._parameter_space.as_dict()
+        return self._evaluated
+
     def _set_initial_value_array(self, variable, initial_values):
         pass
 
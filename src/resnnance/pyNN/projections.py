@@ -1,25 +1,36 @@
-from itertools import repeat
+import numpy as np
 
 from pyNN.common import projections
-from pyNN.core import ezip
 from pyNN.space import Space
 from pyNN.connectors import FromListConnector
 
 from resnnance.pyNN import simulator
 from resnnance.pyNN.models.synapses import StaticSynapse
 from resnnance.pyNN.connectors import MovingConnector
+
+# Connection storage growth (connections per block)
+BLOCK = 2**16
+
 class Connection(projections.Connection):
     """
     Store an individual plastic connection and information about it. Provide an
     interface that allows access to the connection's weight, delay and other
     attributes.
+
+    Lazy view over a single row of the projection connection arrays.
     """
 
-    def __init__(self, pre, post, **attributes):
-        self.presynaptic_index = pre
-        self.postsynaptic_index = post
-        for name, value in attributes.items():
-            setattr(self, name, value)
+    def __init__(self, projection, index):
+        self.projection = projection
+        self.index = index
+
+    def __getattr__(self, name):
+        if name in ('projection', 'index'):
+            raise AttributeError(name)
+        try:
+            return self.projection._columns[name][self.index]
+        except KeyError:
+            raise AttributeError(name)
 
     def as_tuple(self, *attribute_names):
         # should return indices, not IDs for source and target
@@ -38,8 +49,12 @@ class Projection(projections.Projection):
                                    connector, synapse_type, source, receptor_type,
                                    space, label)
 
-        #  Create connections
-        self.connections = []
+        #  Create connections (columnar storage, grows in blocks)
+        self._n = 0
+        self._columns = {
+            'presynaptic_index':  np.empty(0, dtype=np.int32),
+            'postsynaptic_index': np.empty(0, dtype=np.int32),
+        }
         self.info = {}
         connector.connect(self)
 
@@ -47,21 +62,95 @@ class Projection(projections.Projection):
         simulator.state.projections.append(self)
 
     def __len__(self):
-        return len(self.connections)
+        return self._n
+
+    def __getitem__(self, i):
+        if not -self._n <= i < self._n:
+            raise IndexError(i)
+        return Connection(self, i % self._n)
+
+    @property
+    def connections(self):
+        """
+        Lazy Connection views (pyNN compatibility)
+        """
+        return (Connection(self, i) for i in range(self._n))
+
+    def get_arrays(self, *names):
+        """
+        Returns the connection columns as arrays (e.g. 'presynaptic_index',
+        'postsynaptic_index', 'weight', 'delay')
+        """
+        # Parameter columns are created with the first connections
+        if self._n == 0:
+            return tuple([np.empty(0, dtype=self._columns[name].dtype if name in self._columns else np.float64)
+                          for name in names])
+        return tuple([self._columns[name][:self._n] for name in names])
 
     def set(self, **attributes):
         raise NotImplementedError
 
+    def _get_attributes_as_list(self, names):
+        return list(zip(*[column.tolist() for column in self.get_arrays(*names)]))
+
     def _convergent_connect(self, presynaptic_indices, postsynaptic_index,
-                            **connection_parameters):
+                            location_selector=None, **connection_parameters):
+        if location_selector is not None:
+            raise NotImplementedError("Resnnance does not support multicompartmental models")
+
+        presynaptic_indices = np.asarray(presynaptic_indices)
+        n = presynaptic_indices.size
+        self._reserve(n, connection_parameters)
+
+        # Append block of connections
+        start, stop = self._n, self._n + n
+        self._columns['presynaptic_index'][start:stop] = presynaptic_indices
+        self._columns['postsynaptic_index'][start:stop] = postsynaptic_index
+        for name, value in connection_parameters.items():
+            self._columns[name][start:stop] = value
+        self._n = stop
+
+    def _bulk_connect(self, presynaptic_indices, postsynaptic_indices, **connection_parameters):
+        """
+        Stores whole connection arrays - kept as they are (e.g. memory-mapped)
+        when the projection is empty, homogeneous parameters are broadcast
+        """
+        n = len(presynaptic_indices)
+        columns = {
+            'presynaptic_index':  presynaptic_indices,
+            'postsynaptic_index': postsynaptic_indices,
+        }
+        for name, value in connection_parameters.items():
+            value = np.asarray(value)
+            columns[name] = value if value.ndim else np.broadcast_to(value, (n,))
+
+        if self._n == 0:
+            self._columns = {name: np.asarray(value) for name, value in columns.items()}
+            self._n = n
+            return
+
+        self._reserve(n, connection_parameters)
+        start, stop = self._n, self._n + n
+        for name, value in columns.items():
+            self._columns[name][start:stop] = value
+        self._n = stop
+
+    def _reserve(self, n, connection_parameters):
+        """
+        Grows connection columns to hold n more connections
+        """
         for name, value in connection_parameters.items():
-            if isinstance(value, float):
-                connection_parameters[name] = repeat(value)
-        for pre_idx, other in ezip(presynaptic_indices, *connection_parameters.values()):
-            other_attributes = dict(zip(connection_parameters.keys(), other))
-            self.connections.append(
-                Connection(pre_idx, postsynaptic_index, **other_attributes)
-            )
+            if name not in self._columns:
+                dtype = np.result_type(np.asarray(value).dtype, np.float64)
+                self._columns[name] = np.empty(len(self._columns['presynaptic_index']), dtype=dtype)
+
+        capacity = len(self._columns['presynaptic_index'])
+        if self._n + n > capacity:
+            capacity = max(2 * capacity, -(-(self._n + n) // BLOCK) * BLOCK)
+            for name, column in self._columns.items():
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:self._n] = column[:self._n]
+                self._columns[name] = grown
 
     # def get_info(self):
     #     """
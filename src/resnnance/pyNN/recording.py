@@ -1,41 +1,213 @@
 import numpy as np
 
-from pyNN import recording
+from pyNN import recording, errors
 
 from resnnance.pyNN import simulator
 
+# Spike store growth (spikes per block)
+BLOCK = 2**16
+
+class SpikeStore(object):
+    """
+    Spikes of a population as growable (tick, neuron index) int32 arrays
+
+    Spikes are appended tick by tick, the per-neuron form (CSR: spike
+    ticks sorted by neuron, with row pointers) is built on demand and
+    cached until the next append
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.ticks = np.empty(0, dtype=np.int32)
+        self.index = np.empty(0, dtype=np.int32)
+        self.n = 0
+        self._csr = None
+
+    def append(self, tick, index):
+        """
+        Stores the spikes of the neurons in index on a tick
+        """
+        k = len(index)
+        if k == 0:
+            return
+
+        capacity = len(self.ticks)
+        if self.n + k > capacity:
+            capacity = max(2 * capacity, -(-(self.n + k) // BLOCK) * BLOCK)
+            for name in ('ticks', 'index'):
+                grown = np.empty(capacity, dtype=np.int32)
+                grown[:self.n] = getattr(self, name)[:self.n]
+                setattr(self, name, grown)
+
+        self.ticks[self.n:self.n + k] = tick
+        self.index[self.n:self.n + k] = index
+        self.n += k
+        self._csr = None
+
+    def get(self):
+        """
+        Returns the (tick, index) arrays of all stored spikes, in tick order
+        """
+        return self.ticks[:self.n], self.index[:self.n]
+
+    def counts(self, size):
+        """
+        Returns the spike count of every neuron
+        """
+        return np.bincount(self.index[:self.n], minlength=size)
+
+    def csr(self, size):
+        """
+        Returns the row pointers (size + 1) and the spike ticks grouped
+        by neuron (in tick order within each neuron)
+        """
+        if self._csr is None or len(self._csr[0]) != size + 1:
+            ticks, index = self.get()
+            indptr = np.zeros(size + 1, dtype=np.int64)
+            np.cumsum(self.counts(size), out=indptr[1:])
+            self._csr = indptr, ticks[np.argsort(index, kind='stable')]
+        return self._csr
+
+class RecordedCells(object):
+    """
+    Recorded cells of a population as a mask over its indices
+
+    Stands in for the ID sets of the pyNN Recorder: iterating yields
+    plain integer IDs, so no ID objects are created for large populations
+    """
+
+    def __init__(self, population):
+        self.population = population
+        self.mask = np.zeros(population.size, dtype=bool)
+
+    def add(self, index):
+        """
+        Records the cells in index and returns the ones not yet recorded
+        """
+        new = np.zeros_like(self.mask)
+        new[index] = True
+        new &= ~self.mask
+        self.mask |= new
+        return np.flatnonzero(new)
+
+    def indices(self):
+        return np.flatnonzero(self.mask)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.mask))
+
+    def __iter__(self):
+        return iter((int(self.population.first_id) + self.indices()).tolist())
+
+    def __contains__(self, id):
+        index = int(id) - int(self.population.first_id)
+        return 0 <= index < len(self.mask) and bool(self.mask[index])
+
 class Recorder(recording.Recorder):
     _simulator = simulator
 
-    def _record(self, variable, new_ids, sampling_interval=None):
-        pass
+    def __init__(self, population, file=None):
+        super().__init__(population, file)
+
+        # Spikes of the recorded neurons (mask), stored while the network runs
+        self.store = SpikeStore()
+        self.mask = np.zeros(population.size, dtype=bool)
+
+    def record(self, variables, ids, sampling_interval=None, locations=None):
+        """
+        Adds the cells in ids to the recorded cells of the given variables
+        (kept as index masks instead of ID sets)
+        """
+        self._check_sampling_interval(sampling_interval)
+
+        if ids is self.population.all_cells:
+            index = np.arange(self.population.size)
+        elif len(ids):
+            index = self.population.id_to_index(np.asarray(ids, dtype=int)).ravel()
+        else:
+            index = np.empty(0, dtype=int)
+        index = index[self.population._mask_local[index]]
+
+        for variable in self._localize_variables(variables, locations):
+            if not self.population.can_record(variable.name, variable.location):
+                raise errors.RecordingError(variable, self.population.celltype)
+            if not isinstance(self.recorded.get(variable), RecordedCells):
+                self.recorded[variable] = RecordedCells(self.population)
+            self._record(variable, self.recorded[variable].add(index), sampling_interval)
+
+    def filter_recorded(self, variable, filter_ids):
+        recorded = self.recorded[variable]
+        if filter_ids is None or not isinstance(recorded, RecordedCells):
+            return super().filter_recorded(variable, filter_ids)
+
+        ids = np.asarray(filter_ids, dtype=int).ravel()
+        index = ids - int(self.population.first_id)
+        inside = (index >= 0) & (index < self.population.size)
+        return set(ids[inside][recorded.mask[index[inside]]].tolist())
+
+    def _record(self, variable, new_index, sampling_interval=None):
+        if getattr(variable, 'name', variable) == 'spikes':
+            self.mask[new_index] = True
+
+    def _monitor(self, tick, index):
+        """
+        Simulator callback - stores the spikes of the recorded neurons
+        """
+        self.store.append(tick, index[self.mask[index]])
 
     def _get_spiketimes(self, id, clear=False):
-        if hasattr(id, "__len__"):
-            spks = {}
-            for i in id:
-                spks[i] = np.array([i, i + 5], dtype=float) % self._simulator.state.t
-            return spks
+        # Spikes are emitted at the end of each tick
+        size = self.population.size
+        dt = self._simulator.state.dt
+
+        if np.iterable(id):
+            # All spikes of the ids, as (id, time) arrays
+            ticks, index = self.store.get()
+            selected = np.zeros(size, dtype=bool)
+            if len(id):
+                selected[self.population.id_to_index(np.array(id, dtype=int))] = True
+            keep = selected[index]
+            ids = int(self.population.first_id) + index[keep].astype(int)
+            return ids, (ticks[keep] + 1) * dt
         else:
-            return np.array([id, id + 5], dtype=float) % self._simulator.state.t
+            indptr, ticks = self.store.csr(size)
+            i = self.population.id_to_index(id)
+            return (ticks[indptr[i]:indptr[i + 1]] + 1) * dt
 
     def _get_all_signals(self, variable, ids, clear=False):
         # assuming not using cvode, otherwise need to get times as well
         # and use IrregularlySampledAnalogSignal
-        n_samples = int(round(self._simulator.state.t / self._simulator.state.dt)) + 1
-        return np.vstack([np.random.uniform(size=n_samples) for id in ids]).T, None
+        # Membrane state in raw x_t fixed-point units
+        state = self._simulator.state
+        signals = state.model.simulator.signals.get(state.get_layer(self.population).label, [])
+        if not signals:
+            return np.empty((0, len(ids))), None
+
+        index = self.population.id_to_index(np.array(ids, dtype=int)) if len(ids) else []
+        return np.vstack(signals)[:, index].astype(float), None
 
     def _local_count(self, variable, filter_ids=None):
-        N = {}
-        if variable == 'spikes':
-            for id in self.filter_recorded(variable, filter_ids):
-                N[int(id)] = 2
-        else:
+        if getattr(variable, 'name', variable) != 'spikes':
             raise Exception("Only implemented for spikes")
-        return N
+
+        recorded = self.recorded[variable]
+        if filter_ids is None and isinstance(recorded, RecordedCells):
+            index = recorded.indices()
+        else:
+            ids = np.array(sorted(self.filter_recorded(variable, filter_ids)), dtype=int)
+            index = self.population.id_to_index(ids) if len(ids) else np.empty(0, dtype=int)
+        if len(index) == 0:
+            return {}
+
+        ids = int(self.population.first_id) + index
+        counts = self.store.counts(self.population.size)[index]
+        return dict(zip(ids.tolist(), counts.tolist()))
 
     def _clear_simulator(self):
-        pass
+        self.store.clear()
 
     def _reset(self):
-        pass
+        self.store.clear()
+        self.mask[:] = False
@@ -1,9 +1,9 @@
-import logging
 from typing import Optional
 
 from pyNN.common import control
 from pyNN.common import populations
 
+from resnnance.core.logger import resnnance_logger, resnnance_metrics
 from resnnance.pyNN.builder import Builder
 
 name = 'resnnance'
@@ -24,18 +24,8 @@ class State(control.BaseState):
     def __init__(self):
         super().__init__()
 
-        # Simulator logger
-        self.logger = logging.getLogger("resnnance.pyNN")
-        self.logger.setLevel(logging.INFO)
-
-        # Create log handler (for console output)
-        handler = logging.StreamHandler()
-        handler.setLevel(logging.INFO)
-
-        # Format log output
-        formatter = logging.Formatter( '%(asctime)s - %(name)s - %(levelname)s: %(message)s')
-        handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
+        # Simulator logger (console handler registered once, on the resnnance logger)
+        self.logger = resnnance_logger("pyNN")
 
         # Log Resnnance environment creation
         self.logger.info("Created new Resnnance pyNN environment")
@@ -47,25 +37,86 @@ class State(control.BaseState):
         self.num_processes = 1          # MPI processes - meaningless on Resnnance, always 1
         self.mpi_rank = 0               # MPI rank - meaningless on Resnnance, always 0 (head node)
 
-        # Clear recorders and reset
-        self.clear()
-
         # Resnnance
         self.populations = []
         self.projections = []
         self.builder = Builder(self)
         self.model = None
+        self.layers = {}                # Population to layer (set by the builder)
+        self.inputs = None              # Input layer pixel values (None: template default)
+        self.mode = 'auto'              # Synapse evaluation: 'dense', 'sparse' (event-driven) or 'auto' (per layer)
+
+        # Clear recorders and reset
+        self.clear()
 
     def run(self, simtime):
-        self.t += simtime
-        self.running = True
-        self.logger.info(f"Simulation T = {(self.t):.1f} ms")
+        self.run_until(self.t + simtime)
 
     def run_until(self, tstop):
+        # Build Resnnance model on first run
+        if self.model is None:
+            self.builder.build()
+
+        # Spike output settings of this run (the model simulator ones are restored afterwards)
+        simulator = self.model.simulator
+        settings = simulator.history, simulator.monitors, simulator.mode
+
+        # Record membrane state of populations recording 'v' (also initial states on reset)
+        simulator.recorded = set(
+            self.get_layer(recorder.population).label for recorder in self.recorders
+            if any(getattr(variable, 'name', variable) == 'v' for variable in recorder.recorded)
+        )
+
+        # Store spikes of populations recording 'spikes' (recorder stores only, no per-tick lists)
+        simulator.history = False
+        simulator.monitors = {}
+        for recorder in self.recorders:
+            if any(getattr(variable, 'name', variable) == 'spikes' for variable in recorder.recorded):
+                label = self.get_layer(recorder.population).label
+                simulator.monitors.setdefault(label, []).append(recorder._monitor)
+
+        # Synapse evaluation mode
+        simulator.mode = self.mode
+
+        # One simulator tick per time step
+        ticks = int(round((tstop - self.t) / self.dt))
+        try:
+            with resnnance_metrics().span("run", ticks=ticks):
+                self.model.simulate(ticks, self.inputs)
+        finally:
+            simulator.history, simulator.monitors, simulator.mode = settings
+
         self.t = tstop
         self.running = True
         self.logger.info(f"Simulation T = {(self.t):.1f} ms")
 
+    def run_batch(self, inputs, ticks, workers=1, chunk=None):
+        """
+        Simulates every input sample (rows of input layer pixel values)
+        for a number of ticks from reset, sharded across workers processes,
+        and returns the output population spike counts (samples, neurons)
+
+        Results do not depend on the number of workers. The network state
+        and time of run() are left untouched.
+        """
+        # Build Resnnance model on first run
+        if self.model is None:
+            self.builder.build()
+
+        # Synapse evaluation mode of this run
+        mode, self.model.simulator.mode = self.model.simulator.mode, self.mode
+        try:
+            with resnnance_metrics().span("run_batch", samples=len(inputs), ticks=ticks, workers=workers):
+                return self.model.simulate_batch(inputs, ticks, workers, chunk)
+        finally:
+            self.model.simulator.mode = mode
+
+    def get_layer(self, population):
+        """
+        Returns the Resnnance layer built from a population
+        """
+        return self.layers[population]
+
     def clear(self):
         self.recorders = set([])
         self.id_counter = 0
@@ -79,6 +130,13 @@ class State(control.BaseState):
         self.t_start = 0
         self.segment_counter += 1
 
+        if self.model is not None:
+            self.model.simulator.reset()
+
+        # Recorded data of the previous segment (cached by pyNN reset())
+        for recorder in self.recorders:
+            recorder._clear_simulator()
+
 # Resnnance simulator singleton object (instantiated in setup())
 # Optional[] is a type hint: state can be a State object or None
 state: Optional[State] = None
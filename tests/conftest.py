@@ -0,0 +1,42 @@
+import logging
+
+import numpy as np
+import pytest
+
+import resnnance.core as rsnn
+
+# Test output only
+logging.disable(logging.INFO)
+
+def csr(weights):
+    """
+    Returns the sparse Dense layer info of a weight matrix (nonzero entries)
+    """
+    rows, cols = np.nonzero(weights)
+    indptr = np.zeros(weights.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=weights.shape[0]), out=indptr[1:])
+    return {'shape': weights.shape, 'indptr': indptr, 'indices': cols, 'weights': weights[rows, cols]}
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+@pytest.fixture
+def model(rng):
+    """
+    Input -> Conv2D -> Dense -> sparse Dense model, every layer spiking
+    """
+    model = rsnn.Model()
+    model.add_layer(rsnn.Input('input', 12 * 12))
+    model.add_layer(rsnn.Conv2D('conv', {
+        'input_shape': (12, 12, 1),
+        'kernel_shape': (3, 3, 1, 4),
+        'weights': rng.normal(300, 300, (3, 3, 1, 4)),
+        'padding': 'valid',
+        'strides': (1, 1)
+    }))
+    model.add_layer(rsnn.Dense('dense', rng.normal(0, 40, (10 * 10 * 4, 10))))
+
+    sparse = rng.normal(40, 80, (10, 6)) * (rng.random((10, 6)) < 0.5)
+    model.add_layer(rsnn.Dense('sparse', csr(sparse)))
+    return model
@@ -0,0 +1,170 @@
+import os
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+import resnnance.core as rsnn
+from resnnance.core.compiler import Compiler, MANIFEST, default_cache
+
+def files(path):
+    """
+    Returns the build files (subpaths) and their modification times
+    """
+    return {
+        os.path.relpath(os.path.join(root, name), path): os.stat(os.path.join(root, name)).st_mtime_ns
+        for root, _, names in os.walk(path) for name in names
+    }
+
+def age(path):
+    # Older than any file written from now on
+    for subfile in files(path):
+        os.utime(os.path.join(path, subfile), ns=(0, 0))
+
+@pytest.mark.parametrize("mem", [False, True])
+def test_incremental(model, tmp_path, mem):
+    model.compile(tmp_path, mem=mem)
+    before = files(tmp_path)
+    age(tmp_path)
+
+    # Drop the last layer, change one weight below the layer peak (same shift)
+    rebuilt = rsnn.Model()
+    for layer in model.layers[:-1]:
+        rebuilt.add_layer(layer)
+    dense = rebuilt.layers[2]
+    weights = dense.get_info().copy()
+    weights.flat[np.abs(weights).argmin()] += 0.5
+    dense.set_layer(weights)
+
+    rebuilt.compile(tmp_path, mem=mem)
+    after = files(tmp_path)
+    layers = os.path.join("src", "layers")
+
+    # Removed layer outputs and directory
+    removed = set(before) - set(after)
+    assert removed and all(subfile.startswith(os.path.join(layers, "layer_sparse", "")) for subfile in removed)
+    assert not os.path.exists(tmp_path / layers / "layer_sparse")
+    assert set(after) <= set(before)
+
+    # Only the changed weights, the network wiring and the manifest are written again
+    written = {subfile for subfile, mtime in after.items() if mtime}
+    weights = os.path.join(layers, "layer_dense", "layer_dense_w.mem" if mem else "layer_dense_config.vhd")
+    assert weights in written
+    assert os.path.join("src", "network.vhd") in written and MANIFEST in written
+    assert not any(subfile.startswith(os.path.join(layers, label, "")) for subfile in written
+                   for label in ["layer_input", "layer_conv"])
+    assert len([subfile for subfile in written if subfile.startswith(os.path.join(layers, "layer_dense", ""))]) == 1
+
+    with open(tmp_path / MANIFEST) as manifest:
+        manifest = json.load(manifest)
+    assert list(manifest['layers']) == [layer.label for layer in rebuilt.layers]
+    assert set(manifest['files']) == set(after) - {MANIFEST}
+
+def test_unchanged(model, tmp_path):
+    model.compile(tmp_path)
+    age(tmp_path)
+    model.compile(tmp_path)
+
+    assert [subfile for subfile, mtime in files(tmp_path).items() if mtime] == [MANIFEST]
+
+class Unprintable(object):
+    def __str__(self):
+        raise RuntimeError("render")
+
+class Failing(rsnn.Input):
+    templates = {'core': "hw/layers/input/poisson_core.vhd"}
+
+    def get_template_params(self):
+        # Fails halfway through rendering the memory init file path
+        params = super().get_template_params()
+        params['core'] = dict(params['core'], file=Unprintable())
+        return params
+
+def test_render_failure(tmp_path):
+    compiler = Compiler(tmp_path, cache=None)
+    with pytest.raises(RuntimeError):
+        compiler.render_layer(Failing('input', 16), "src")
+
+    # No temporary or partial files left
+    assert list(files(tmp_path)) == []
+
+def test_memory_files(model, tmp_path):
+    model.layers[2].set_parallel(3)
+    model.layers[2].quantize(6)
+    model.compile(tmp_path, mem=True)
+    layers = tmp_path / "src" / "layers"
+
+    for layer, prefix in zip(model.layers[1:], ["conv2D", "fc", "fc"]):
+        path = layers / layer.label / f"{layer.label}_w.mem"
+
+        # 4-digit 16-bit two's complement hex words, in memory order
+        with open(path) as mem:
+            lines = mem.read().splitlines()
+        assert all(len(line) == 4 for line in lines)
+        words = (np.array([int(line, 16) for line in lines]) + 2**15) % 2**16 - 2**15
+        np.testing.assert_array_equal(words, np.ravel(layer.get_memories()['w']))
+
+        # Loaded with hread by the NPU
+        config = (layers / layer.label / f"{layer.label}_config.vhd").read_text()
+        aux = (layers / layer.label / f"{layer.label}_npu_aux.vhd").read_text()
+        npu = (layers / layer.label / f"{layer.label}_npu.vhd").read_text()
+        assert f'constant {prefix}_w_file: string := "{path}";' in config
+        assert "hread(fline, fword);" in aux and "resize(signed(fword), w_t'length)" in aux
+        assert f"mem2vhd({prefix}_w_file" in npu
+
+def test_constant_weights(model, tmp_path):
+    model.compile(tmp_path)
+    layers = tmp_path / "src" / "layers"
+
+    assert not list(layers.rglob("*.mem"))
+    for layer in model.layers[1:]:
+        assert "hread" not in (layers / layer.label / f"{layer.label}_npu_aux.vhd").read_text()
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_parallel(model, tmp_path, mmap):
+    model.save(tmp_path / "model.npz")
+    model = rsnn.Model.load(tmp_path / "model.npz", mmap=mmap)
+    model.compile(tmp_path / "serial", mem=True, jobs=1)
+    model.compile(tmp_path / "parallel", mem=True, jobs=2)
+
+    # Same files, up to the build path of the memory init files
+    serial, parallel = files(tmp_path / "serial"), files(tmp_path / "parallel")
+    assert set(serial) == set(parallel)
+    for subfile in set(serial) - {MANIFEST}:
+        expected = (tmp_path / "serial" / subfile).read_text().replace(str(tmp_path / "serial"), "")
+        assert (tmp_path / "parallel" / subfile).read_text().replace(str(tmp_path / "parallel"), "") == expected
+
+    # Same manifest (file hashes are only compared for files without paths)
+    manifests = []
+    for build in ["serial", "parallel"]:
+        with open(tmp_path / build / MANIFEST) as manifest:
+            manifests.append(json.load(manifest))
+    assert manifests[0]['layers'] == manifests[1]['layers']
+    assert manifests[0]['files'].keys() == manifests[1]['files'].keys()
+    for subfile, digest in manifests[0]['files'].items():
+        if str(tmp_path / "serial") not in (tmp_path / "serial" / subfile).read_text():
+            assert manifests[1]['files'][subfile] == digest
+
+def test_pickle_mapped(model, tmp_path):
+    model.save(tmp_path / "model.npz")
+    layer = rsnn.Model.load(tmp_path / "model.npz", mmap=True).layers[2]
+
+    # Memory-mapped weights are sent as file references
+    data = pickle.dumps(layer)
+    assert len(data) < layer.weights.nbytes
+    loaded = pickle.loads(data)
+    assert isinstance(loaded.weights, np.memmap)
+    np.testing.assert_array_equal(loaded.weights, layer.weights)
+
+def test_default_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert default_cache() == os.path.join(tmp_path, "resnnance", "jinja")
+
+    # Unset, empty or relative paths fall back to ~/.cache
+    expected = os.path.join(os.path.expanduser("~"), ".cache", "resnnance", "jinja")
+    for home in ["", "cache"]:
+        monkeypatch.setenv("XDG_CACHE_HOME", home)
+        assert default_cache() == expected
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    assert default_cache() == expected
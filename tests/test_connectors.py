@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import resnnance.core as rsnn
+from resnnance.core.simulator import Simulator
+from resnnance.pyNN.connectors import ConvConnector, PoolConnector
+
+def dense(connector, chunk, m, n):
+    """
+    Returns the (m, n) weight matrix of the connector COO synapses and
+    checks that the chunks split the same synapses
+    """
+    chunks = list(connector.coo(chunk))
+    pre, post, weight = (np.concatenate(column) for column in zip(*chunks))
+
+    # Whole output positions per chunk, chunk synapses at most (one position at least)
+    per_position = max(len(chunk_pre) for chunk_pre, _, _ in connector.coo(1))
+    assert all(len(chunk_pre) <= max(chunk, per_position) for chunk_pre, _, _ in chunks)
+    whole = [np.concatenate(column) for column in zip(*connector.coo(2**30))]
+    for column, expected in zip([pre, post, weight], whole):
+        np.testing.assert_array_equal(column, expected)
+
+    # Same synapses as the flattened connector, no duplicates
+    table = connector.flatten(chunk).conn_list
+    np.testing.assert_array_equal(table, np.column_stack([pre, post, weight]))
+    assert len(np.unique(pre * n + post)) == len(pre)
+
+    w = np.zeros((m, n))
+    w[pre, post] = weight
+    return w
+
+# Chunks below, at and across output position boundaries
+CHUNKS = [1, 54, 55, 150, 2**20]
+
+@pytest.mark.parametrize("chunk", CHUNKS)
+def test_conv(rng, chunk):
+    info = {
+        'input_shape': (6, 6, 2),
+        'kernel_shape': (3, 3, 2, 3),
+        'weights': rng.normal(0, 100, (3, 3, 2, 3)),
+        'padding': 'valid',
+        'strides': (1, 1)
+    }
+    layer = rsnn.Conv2D('conv', info)
+    assert ConvConnector(info).get_output_shape() == layer.get_output_shape() == (4, 4, 3)
+    w = dense(ConvConnector(info), chunk, 6 * 6 * 2, 4 * 4 * 3)
+
+    # Map-major neurons: input (z, y, x) to output (f, oy, ox) through kernel tap (y - oy, x - ox, z, f)
+    z, y, x, f, oy, ox = np.meshgrid(*map(np.arange, [2, 6, 6, 3, 4, 4]), indexing='ij')
+    dy, dx = y - oy, x - ox
+    inside = (dy >= 0) & (dy < 3) & (dx >= 0) & (dx < 3)
+    expected = np.where(inside, info['weights'][dy.clip(0, 2), dx.clip(0, 2), z, f], 0)
+    np.testing.assert_array_equal(w, expected.reshape(72, 48))
+
+    # Same synaptic input as the simulator layer (with its dequantized weights)
+    params = Simulator._Simulator__prepare_conv2d(layer)
+    info['weights'] = params['w'].reshape(3, 3, 2, 3)
+    w = dense(ConvConnector(info), chunk, 72, 48)
+    for s in rng.random((5, 72)) < [[0.01], [0.1], [0.5], [0.9], [1.0]]:
+        acc = Simulator._Simulator__synapses_conv2d(params, s)
+        np.testing.assert_array_equal(s @ w, acc)
+        np.testing.assert_array_equal(Simulator._Simulator__events_conv2d(params, np.flatnonzero(s)), acc)
+
+@pytest.mark.parametrize("chunk", CHUNKS)
+def test_pool(rng, chunk):
+    # Inputs beyond the last full window (row 6, column 4) are not connected
+    info = {'input_shape': (7, 5, 3), 'pool_size': (2, 2)}
+    layer = rsnn.Pooling('pool', info)
+    assert PoolConnector(info).get_output_shape() == layer.get_output_shape() == (3, 2, 3)
+    w = dense(PoolConnector(info), chunk, 7 * 5 * 3, 3 * 2 * 3)
+
+    z, y, x, f, oy, ox = np.meshgrid(*map(np.arange, [3, 7, 5, 3, 3, 2]), indexing='ij')
+    expected = (z == f) & (y // 2 == oy) & (x // 2 == ox)
+    np.testing.assert_array_equal(w, expected.reshape(105, 18) / 4)
+
+    # Window spike counts times the simulator layer weight
+    params = Simulator._Simulator__prepare_pooling(layer)
+    for s in rng.random((3, 105)) < [[0.05], [0.5], [1.0]]:
+        acc = Simulator._Simulator__synapses_pooling(params, s)
+        np.testing.assert_array_equal(np.rint(s @ w * 4).astype(np.int64) * params['w'], acc)
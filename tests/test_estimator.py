@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+import resnnance.core as rsnn
+from resnnance.core.estimator import Estimator, CLOCK
+
+from conftest import csr
+
+def estimate(*layers, **options):
+    model = rsnn.Model()
+    for layer in layers:
+        model.add_layer(layer)
+    return Estimator().estimate(model, log=False, **options)
+
+def test_input():
+    result = estimate(rsnn.Input('input', 784))['layers']['layer_input']
+
+    # 8-bit pixel memory in half a block, spike memory in distributed RAM
+    assert result['memories'] == {'mem': 784 * 8, 'smem': 1024}
+    assert (result['blocks'], result['lutram']) == (1, 1024)
+    assert result['cycles'] == 785
+
+def test_dense_replicated(rng):
+    layer = rsnn.Dense('dense', rng.normal(0, 1, (784, 100)))
+    layer.set_parallel(4)
+    result = estimate(layer)['layers']['layer_dense']
+
+    # 784 w_group banks of 25 weights per instance, all in distributed RAM
+    assert result['memories'] == {'x_mem': 4 * 25 * 16, 'so_mem': 100, 'w_group': 784 * 100 * 16, 'smem': 128}
+    assert result['blocks'] == 0
+    assert result['lutram'] == result['bits']
+    assert result['cycles'] == 1 + 784 + 784 + 4
+
+def test_dense_banks(rng):
+    result = estimate(rsnn.Dense('dense', rng.normal(0, 1, (784, 1000))))['layers']['layer_dense']
+
+    # 784 w_group banks and x_mem in half a block each
+    assert result['blocks'] == -(-785 // 2)
+    assert result['lutram'] == 1000 + 1024
+    assert result['blocks'] * 36 * 1024 >= result['bits'] - result['lutram']
+
+def test_sparse(rng):
+    weights = np.zeros((4, 3))
+    weights[[0, 0, 1, 3, 3], [0, 2, 1, 0, 1]] = rng.normal(0, 1, 5)
+    result = estimate(rsnn.Dense('sparse', csr(weights)))['layers']['layer_sparse']
+
+    assert result['memories'] == {'x_mem': 3 * 16, 'w_mem': 5 * 16, 'ptr': 5 * 3, 'idx': 5 * 2, 'smem': 4}
+    assert (result['blocks'], result['lutram']) == (0, result['bits'])
+    assert result['cycles'] == 1 + 2 * 4 + 5 + 3 + 2
+
+def test_sparse_empty():
+    result = estimate(rsnn.Dense('sparse', csr(np.zeros((4, 3)))))['layers']['layer_sparse']
+
+    # One synapse memory word at least
+    assert result['memories']['w_mem'] == 16
+    assert result['memories']['ptr'] == 0
+
+def test_conv2d(rng):
+    layer = rsnn.Conv2D('conv', {
+        'input_shape': (12, 12, 1),
+        'kernel_shape': (3, 3, 1, 4),
+        'weights': rng.normal(0, 1, (3, 3, 1, 4)),
+        'padding': 'valid',
+        'strides': (1, 1)
+    })
+    layer.set_parallel(2)
+    result = estimate(layer)['layers']['layer_conv']
+
+    # 2 kernels per instance, 9 w_group banks of 2 weights
+    assert result['memories'] == {'x_mem': 2 * 200 * 16, 'so_mem': 400, 'w_group': 2 * 9 * 2 * 16, 'smem': 512}
+    assert (result['blocks'], result['lutram']) == (1, 400 + 576 + 512)
+    assert result['cycles'] == 1 + 2 * 144 + 9 + 4
+
+def test_pooling():
+    result = estimate(rsnn.Pooling('pool', {'input_shape': (10, 10, 4), 'pool_size': (2, 2)}))['layers']['layer_pool']
+
+    assert result['memories'] == {'x_mem': 100 * 16, 'so_mem': 100, 'smem': 128}
+    assert (result['blocks'], result['lutram']) == (1, 228)
+    assert result['cycles'] == 1 + 400 + 4 + 4
+
+def test_network(model):
+    result = estimate(*model.layers)
+    layers, network = result['layers'], result['network']
+
+    for key in ['bits', 'blocks', 'lutram']:
+        assert network[key] == sum(estimate[key] for estimate in layers.values())
+    assert network['cycles'] == max(estimate['cycles'] for estimate in layers.values())
+    assert network['rate'] == pytest.approx(CLOCK / network['cycles'])
+
+def test_lutram(model):
+    # Without distributed RAM every memory takes half a block at least
+    result = estimate(*model.layers, lutram=0)['network']
+    assert result['lutram'] == 0
+    assert result['blocks'] > estimate(*model.layers)['network']['blocks']
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+import resnnance.core as rsnn
+
+from conftest import csr
+
+def conv2d(rng, f=5):
+    return rsnn.Conv2D('conv', {
+        'input_shape': (6, 6, 2),
+        'kernel_shape': (3, 3, 2, f),
+        'weights': rng.normal(0, 1, (3, 3, 2, f)),
+        'padding': 'valid',
+        'strides': (1, 1)
+    })
+
+@pytest.mark.parametrize("parallel", [1, 2, 3, 7])
+def test_dense_lanes(rng, parallel):
+    layer = rsnn.Dense('dense', rng.normal(0, 1, (5, 7)))
+    layer.set_parallel(parallel)
+    ns = -(-7 // parallel)
+    assert layer.get_slice() == ns
+
+    # w_group(synapse)(neuron) of every NPU lane, the last one zero padded
+    q = layer.get_quantization()['weights']
+    w = layer.get_memories()['w']
+    assert w.shape == (parallel, 5, ns)
+    for lane in range(parallel):
+        weights = q[:, lane * ns:(lane + 1) * ns]
+        np.testing.assert_array_equal(w[lane, :, :weights.shape[1]], weights)
+        assert not w[lane, :, weights.shape[1]:].any()
+
+    shift = layer.get_template_params()['config']['shift']
+    assert len(shift) == parallel * ns
+    np.testing.assert_array_equal(shift[:7], layer.get_quantization()['shift'])
+
+@pytest.mark.parametrize("parallel", [1, 2, 5])
+def test_conv2d_lanes(rng, parallel):
+    layer = conv2d(rng)
+    layer.set_parallel(parallel)
+    fs = -(-5 // parallel)
+    assert layer.get_slice() == 4 * 4 * fs
+    assert layer.get_neurons() == 4 * 4 * 5
+
+    # w_group(synapse)(kernel) of every NPU lane, (ky, kx, kz) flattened z first
+    q = layer.get_quantization()['weights'].reshape(3 * 3 * 2, 5)
+    w = layer.get_memories()['w']
+    assert w.shape == (parallel, 18, fs)
+    for lane in range(parallel):
+        kernels = q[:, lane * fs:(lane + 1) * fs]
+        np.testing.assert_array_equal(w[lane, :, :kernels.shape[1]], kernels)
+        assert not w[lane, :, kernels.shape[1]:].any()
+
+def test_rejected(rng):
+    dense = rsnn.Dense('dense', rng.normal(0, 1, (5, 7)))
+    conv = conv2d(rng)
+    cases = [
+        (dense, 0), (dense, 8), (dense, 2.0), (dense, -1),
+        (conv, 0), (conv, 6), (conv, 1.5),
+        (rsnn.Dense('sparse', csr(np.eye(5, 7))), 2),
+        (rsnn.Dense('empty'), 2),
+        (rsnn.Conv2D('empty'), 2),
+        (rsnn.Input('input', 10), 2),
+        (rsnn.Pooling('pool', {'input_shape': (4, 4, 2), 'pool_size': (2, 2)}), 2)
+    ]
+    for layer, parallel in cases:
+        with pytest.raises(ValueError):
+            layer.set_parallel(parallel)
+        assert layer.parallel == 1
+
+    # One instance is always valid
+    for layer in [dense, conv, rsnn.Input('input', 10)]:
+        layer.set_parallel(1)
+
+def test_bits(rng):
+    layer = conv2d(rng)
+    kernels = layer.get_memories()['w']
+    version = layer.version
+
+    # Changing the width or granularity drops the cached quantization
+    layer.bits = 4
+    assert layer.version > version
+    assert layer.get_quantization()['bits'] == 4
+    assert np.abs(layer.get_memories()['w']).max() <= 8 < np.abs(kernels).max()
+
+    layer.granularity = 'channel'
+    assert len(set(layer.get_quantization()['shift'])) > 1
+
+    for bits in [1, 17]:
+        with pytest.raises(ValueError):
+            layer.bits = bits
+    with pytest.raises(ValueError):
+        layer.granularity = 'neuron'
+    assert (layer.bits, layer.granularity) == (4, 'channel')
@@ -0,0 +1,84 @@
+import json
+import logging
+import threading
+
+import pytest
+
+from resnnance.core.logger import Metrics, resnnance_logger, resnnance_metrics
+
+def handlers():
+    return [handler for handler in logging.getLogger("resnnance").handlers if getattr(handler, 'resnnance', False)]
+
+def test_handlers():
+    # One console handler on the resnnance logger, child loggers propagate to it
+    for name in [None, "pyNN", "compiler", "pyNN", None]:
+        logger = resnnance_logger(name)
+        assert logger.level == logging.INFO
+        assert len(handlers()) == 1
+    assert resnnance_logger("runner").name == "resnnance.runner"
+    assert not resnnance_logger("runner").handlers
+
+def test_spans():
+    metrics = Metrics()
+    with metrics.span("outer", layers=2):
+        with metrics.span("inner", layer=0):
+            pass
+        with pytest.raises(RuntimeError):
+            with metrics.span("inner", layer=1):
+                raise RuntimeError
+
+    # Spans are recorded as they end, nested ones within their parent
+    inner, failed, outer = metrics.spans
+    assert [span['name'] for span in metrics.spans] == ["inner", "inner", "outer"]
+    assert (inner['layer'], failed['layer'], outer['layers']) == (0, 1, 2)
+    assert outer['start'] <= inner['start'] <= failed['start']
+    assert failed['start'] + failed['time'] <= outer['start'] + outer['time']
+    assert all(span['type'] == 'span' and span['thread'] == threading.current_thread().name for span in metrics.spans)
+
+def test_export(tmp_path):
+    metrics = Metrics()
+    events = []
+    metrics.subscribe(events.append)
+    for layer in range(3):
+        with metrics.span("render", layer=layer):
+            metrics.count("files", 2)
+    with metrics.span("write"):
+        pass
+    metrics.count("bytes", 100)
+
+    data = metrics.export(tmp_path / "metrics.json")
+    assert data['totals']['render']['count'] == 3 and data['totals']['write']['count'] == 1
+    assert data['totals']['render']['time'] == pytest.approx(sum(span['time'] for span in data['spans'][:3]))
+    assert data['counters'] == {'files': 6, 'bytes': 100}
+    assert json.loads((tmp_path / "metrics.json").read_text()) == data
+    assert len(events) == 4 + 4 and events[-1] == {'type': 'counter', 'name': 'bytes', 'value': 100, 'total': 100}
+
+    # Exported data is a copy
+    data['spans'].clear()
+    assert len(metrics.export()['spans']) == 4
+
+    metrics.reset()
+    assert metrics.export() == {'spans': [], 'totals': {}, 'counters': {}}
+
+def test_merge():
+    worker, metrics = Metrics(), Metrics()
+    with worker.span("render"):
+        worker.count("files")
+    metrics.count("files", 2)
+
+    # Worker spans and counters are added to the parent metrics
+    metrics.merge(worker.drain())
+    assert worker.export() == {'spans': [], 'totals': {}, 'counters': {}}
+    data = metrics.export()
+    assert data['counters'] == {'files': 3} and data['totals']['render']['count'] == 1
+
+def test_singleton():
+    metrics = resnnance_metrics()
+    assert resnnance_metrics() is metrics
+
+    metrics.reset()
+    with metrics.span("build"):
+        metrics.count("connections", 10)
+    assert metrics.export()['counters'] == {'connections': 10}
+    metrics.reset()
+    assert metrics.export()['spans'] == []
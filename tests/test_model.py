@@ -0,0 +1,70 @@
+import json
+
+import numpy as np
+import pytest
+
+import resnnance.core as rsnn
+from resnnance.core.model import FORMAT, FORMAT_VERSION
+
+def assert_info_equal(info, expected):
+    if isinstance(expected, dict):
+        assert set(info) == set(expected)
+        for key in expected:
+            assert_info_equal(info[key], expected[key])
+    elif hasattr(expected, 'shape'):
+        np.testing.assert_array_equal(np.asarray(info), np.asarray(expected))
+    else:
+        assert tuple(np.ravel(info)) == tuple(np.ravel(expected))
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_save_load(model, rng, tmp_path, mmap):
+    model.layers[1].set_parallel(2)
+    model.layers[2].bits = 8
+    model.layers[2].granularity = 'channel'
+    model.save(tmp_path / "model.npz")
+
+    loaded = rsnn.Model.load(tmp_path / "model.npz", mmap=mmap)
+    assert [layer.label for layer in loaded.layers] == [layer.label for layer in model.layers]
+    assert list(loaded.get_graph().edges()) == list(model.get_graph().edges())
+
+    for layer, expected in zip(loaded.layers, model.layers):
+        assert type(layer) is type(expected)
+        assert (layer.bits, layer.granularity, layer.parallel) == (expected.bits, expected.granularity, expected.parallel)
+        assert_info_equal(layer.get_info(), expected.get_info())
+
+    # Memory-mapped weights are only read when quantized
+    weights = loaded.layers[2].get_info()
+    assert isinstance(weights, np.memmap) == mmap
+
+    # Same network
+    inputs = (rng.random(12 * 12) * 255).astype(np.int64)
+    expected = model.simulate(30, inputs)
+    result = loaded.simulate(30, inputs)
+    for label in expected:
+        for tick, active in enumerate(expected[label]):
+            np.testing.assert_array_equal(result[label][tick], active)
+
+def test_load_version(model, tmp_path):
+    model.save(tmp_path / "model.npz")
+    with np.load(tmp_path / "model.npz") as archive:
+        arrays = dict(archive)
+
+    header = json.loads(str(arrays['__resnnance__']))
+    assert (header['format'], header['version']) == (FORMAT, FORMAT_VERSION)
+
+    header['version'] = FORMAT_VERSION + 1
+    arrays['__resnnance__'] = np.array(json.dumps(header))
+    np.savez(tmp_path / "future.npz", **arrays)
+    with pytest.raises(ValueError):
+        rsnn.Model.load(tmp_path / "future.npz")
+
+def test_load_compressed_mmap(model, tmp_path):
+    # Compressed members can not be memory-mapped, they are loaded
+    model.save(tmp_path / "model.npz")
+    with np.load(tmp_path / "model.npz") as archive:
+        np.savez_compressed(tmp_path / "compressed.npz", **dict(archive))
+
+    loaded = rsnn.Model.load(tmp_path / "compressed.npz", mmap=True)
+    weights = loaded.layers[2].get_info()
+    assert not isinstance(weights, np.memmap)
+    np.testing.assert_array_equal(weights, model.layers[2].get_info())
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import resnnance.pyNN as sim
+from resnnance.pyNN import simulator
+
+@pytest.fixture
+def population():
+    sim.setup()
+    sim.Population(7, sim.IF_curr_exp())
+    yield sim.Population(20, sim.IF_curr_exp())
+    sim.end()
+
+def test_indexing(population):
+    cells = population.all_cells
+    first = int(population.first_id)
+    assert len(cells) == 20 and first == 7
+
+    # Single IDs, negative indices from the end
+    for index, value in [(0, 7), (5, 12), (-1, 26), (-20, 7)]:
+        id = cells[index]
+        assert isinstance(id, simulator.ID) and id == value and id.parent is population
+        assert population[index] == value
+    for index in [20, -21]:
+        with pytest.raises(IndexError):
+            cells[index]
+
+    # Slices, masks and index arrays select without creating IDs
+    values = np.arange(7, 27)
+    for index in [slice(None, None, 2), slice(-5, None), slice(3, 1), values % 3 == 0, np.array([4, 1, 1, -2])]:
+        selected = cells[index]
+        np.testing.assert_array_equal(np.asarray(selected), values[index])
+        assert [int(id) for id in selected] == values[index].tolist()
+        assert len(selected) == len(values[index])
+
+    # Nested selections, single IDs keep the population as parent
+    nested = cells[::2][1:4]
+    np.testing.assert_array_equal(np.asarray(nested), [9, 11, 13])
+    assert nested[-1] == 13 and nested[-1].parent is population
+    assert list(nested) == [9, 11, 13]
+
+def test_contains(population):
+    cells = population.all_cells
+    assert all(id in cells for id in [7, 15, 26])
+    assert not any(id in cells for id in [6, 27, -1])
+
+    odd = cells[1::2]
+    assert 8 in odd and 26 in odd
+    assert 7 not in odd and 27 not in odd and 6 not in odd
+
+def test_views(population):
+    mask = np.zeros(20, dtype=bool)
+    mask[[2, 3, 11, 19]] = True
+
+    for selector, index in [(slice(2, 12, 3), [2, 5, 8, 11]), (mask, [2, 3, 11, 19]), ([19, 4, 4, 6], [4, 6, 19])]:
+        view = population[selector]
+        assert view.size == len(index)
+        np.testing.assert_array_equal(np.arange(20)[view.mask], index)
+        np.testing.assert_array_equal(np.asarray(view.all_cells), 7 + np.array(index))
+        assert (view.first_id, view.last_id) == (7 + index[0], 7 + index[-1])
+        assert view[-1] == 7 + index[-1] and view[-1].parent is population
+        assert list(view.id_to_index(view.all_cells)) == list(range(len(index)))
+        np.testing.assert_array_equal(view.index_in_grandparent(np.arange(view.size)), index)
+
+    # Views of views
+    view = population[1::2][2:5]
+    np.testing.assert_array_equal(np.asarray(view.all_cells), [12, 14, 16])
+    np.testing.assert_array_equal(view.index_in_grandparent([0, 2]), [5, 9])
+
+    # Parameters of the selected cells only
+    view = population[mask]
+    view.set(tau_m=5.0)
+    np.testing.assert_array_equal(population.get('tau_m', simplify=False) == 5.0, mask)
+    assert view.get('tau_m') == 5.0
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from pyNN import errors
+
+import resnnance.pyNN as sim
+
+@pytest.fixture
+def populations():
+    sim.setup()
+    yield sim.Population(20, sim.IF_curr_exp()), sim.Population(5, sim.IF_curr_exp())
+    sim.end()
+
+def test_list_columns(populations, rng):
+    pre, post = np.meshgrid(np.arange(20), np.arange(5), indexing='ij')
+    table = np.column_stack([pre.ravel(), post.ravel(), rng.normal(0, 1, 100), np.ones(100)])
+    projection = sim.Projection(*populations, sim.FromListConnector(table, column_names=['weight', 'delay']))
+
+    assert len(projection) == 100
+    i, j, w = projection.get_arrays('presynaptic_index', 'postsynaptic_index', 'weight')
+    order = np.lexsort((i, j))
+    np.testing.assert_array_equal(np.column_stack([i, j, w])[order], table[np.lexsort((table[:, 0], table[:, 1]))][:, :3])
+    assert projection[3].weight == w[3]
+
+def test_array_columns(populations, tmp_path, rng):
+    table = np.column_stack([rng.integers(0, 20, 50), rng.integers(0, 5, 50), rng.normal(0, 1, 50), np.ones(50)])
+    np.save(tmp_path / "table.npy", table)
+    connector = sim.FromArrayConnector(tmp_path / "table.npy")
+    projection = sim.Projection(*populations, connector)
+
+    i, j, w, d = projection.get_arrays('presynaptic_index', 'postsynaptic_index', 'weight', 'delay')
+    np.testing.assert_array_equal(np.column_stack([i, j, w, d]), table)
+
+    # Parameter columns stay views of the memory-mapped table
+    assert np.shares_memory(w, connector.columns['weight'])
+
+    # Appended connections grow the columns
+    projection._bulk_connect(np.array([1, 2]), np.array([3, 4]), weight=np.array([5.0, 6.0]), delay=1.0)
+    assert len(projection) == 52
+    np.testing.assert_array_equal(projection.get_arrays('weight')[0][-2:], [5.0, 6.0])
+
+def test_array_range(populations):
+    with pytest.raises(errors.ConnectionError):
+        sim.Projection(*populations, sim.FromArrayConnector((np.array([0, 20]), np.array([0, 1]))))
+
+def test_empty(populations):
+    projection = sim.Projection(*populations, sim.FixedProbabilityConnector(0.0))
+    pre, weight = projection.get_arrays('presynaptic_index', 'weight')
+    assert len(projection) == 0 and len(pre) == 0 and len(weight) == 0
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from resnnance.core.quantizer import WIDTH, WFRAC, wrap, quantize, dequantize
+
+@pytest.mark.parametrize("bits", [4, 8, 16])
+def test_round_trip(rng, bits):
+    weights = rng.normal(0, 20, (64, 16))
+    quantization = quantize(weights, bits)
+    q, shift = quantization['weights'], quantization['shift']
+
+    assert q.dtype == np.int16
+    assert q.min() >= -2**(bits-1) and q.max() <= 2**(bits-1) - 1
+    assert quantization['report']['clipped'] == 0
+
+    # Within half a quantization step (q << shift in x_t units)
+    error = dequantize(quantization) - weights * 2.0**WFRAC
+    assert np.abs(error).max() <= 2.0**shift[0] / 2
+    assert quantization['report']['max_error'] == pytest.approx(np.abs(error).max() / 2.0**WFRAC)
+
+def test_round_trip_channels(rng):
+    # One channel (scale) per column, of very different magnitudes
+    weights = rng.normal(0, 1, (32, 4)) * np.array([0.1, 1, 10, 100])
+    channels = np.broadcast_to(np.arange(4), weights.shape)
+    quantization = quantize(weights, 8, channels, 4)
+    shift = quantization['shift']
+
+    assert len(shift) == 4 and np.all(np.diff(shift) >= 0)
+    error = dequantize(quantization, channels) - weights * 2.0**WFRAC
+    assert np.all(np.abs(error) <= 2.0**shift[channels] / 2)
+
+def test_exact_weights(rng):
+    # Weights on the w_t grid are kept exactly
+    weights = rng.integers(-2**15, 2**15, (10, 10)) / 2.0**WFRAC
+    quantization = quantize(weights)
+    np.testing.assert_array_equal(dequantize(quantization), weights * 2.0**WFRAC)
+
+def test_chunks_and_memmap(rng, tmp_path):
+    weights = rng.normal(0, 5, (100, 7))
+    np.save(tmp_path / "w.npy", weights)
+    mapped = np.load(tmp_path / "w.npy", mmap_mode='r')
+
+    expected = quantize(weights, 8)
+    for quantization in [quantize(weights, 8, chunk=3), quantize(mapped, 8, chunk=11)]:
+        np.testing.assert_array_equal(quantization['weights'], expected['weights'])
+        np.testing.assert_array_equal(quantization['shift'], expected['shift'])
+
+def test_saturation():
+    # Peaks beyond x_t saturate at the largest shift
+    quantization = quantize(np.array([1e6, -1e6, 1.0]), 8)
+    assert quantization['shift'][0] == WIDTH - 8
+    assert quantization['report']['clipped'] == 2
+    np.testing.assert_array_equal(quantization['weights'][:2], [127, -128])
+
+def test_bits():
+    for bits in [1, WIDTH + 1]:
+        with pytest.raises(ValueError):
+            quantize(np.ones(4), bits)
+
+def test_wrap():
+    x = np.array([0, 1, -1, 2**15 - 1, 2**15, 2**15 + 1, -2**15, -2**15 - 1, 2**16, 3 * 2**16 - 5])
+    result = wrap(x)
+
+    assert result.dtype == np.int16
+    np.testing.assert_array_equal(result, [0, 1, -1, 2**15 - 1, -2**15, -2**15 + 1, -2**15, 2**15 - 1, 0, -5])
+    np.testing.assert_array_equal(result, x.astype(np.int64).astype(np.int16))
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+import resnnance.pyNN as sim
+from resnnance.pyNN import recording, simulator
+from resnnance.pyNN.recording import SpikeStore
+
+def spikes(rng, ticks=40, size=30):
+    """
+    Returns random (tick, neuron index) spikes, in tick order
+    """
+    return [(tick, np.flatnonzero(rng.random(size) < 0.2)) for tick in range(ticks)]
+
+def test_store_growth(monkeypatch, rng):
+    monkeypatch.setattr(recording, "BLOCK", 8)
+    store = SpikeStore()
+    data = spikes(rng)
+
+    # Capacity grows in whole blocks, at least doubling
+    capacities = []
+    for tick, index in data:
+        store.append(tick, index)
+        store.append(tick, index[:0])
+        capacities.append(len(store.ticks))
+    assert all(capacity % 8 == 0 for capacity in capacities)
+    assert all(b == a or b >= 2 * a for a, b in zip(capacities, capacities[1:]) if a)
+    assert capacities[-1] >= store.n > capacities[-1] // 2 - 8
+
+    ticks, index = store.get()
+    np.testing.assert_array_equal(ticks, np.concatenate([np.full(len(i), t) for t, i in data]))
+    np.testing.assert_array_equal(index, np.concatenate([i for _, i in data]))
+    assert ticks.dtype == index.dtype == np.int32
+
+    store.clear()
+    assert store.n == 0 and len(store.get()[0]) == 0
+
+def test_store_csr(rng):
+    store = SpikeStore()
+    data = spikes(rng)
+    for tick, index in data[:20]:
+        store.append(tick, index)
+    first = store.csr(30)
+    assert store.csr(30) is first
+
+    # Appending drops the cached form
+    for tick, index in data[20:]:
+        store.append(tick, index)
+    indptr, ticks = store.csr(30)
+    np.testing.assert_array_equal(np.diff(indptr), store.counts(30))
+    for neuron in range(30):
+        expected = [tick for tick, index in data if neuron in index]
+        np.testing.assert_array_equal(ticks[indptr[neuron]:indptr[neuron + 1]], expected)
+
+    # Wider populations (silent last neurons)
+    indptr, _ = store.csr(32)
+    assert len(indptr) == 33 and indptr[-1] == indptr[-3] == store.n
+
+@pytest.fixture
+def network(rng):
+    """
+    50 input neurons connected to 20 neurons, run for 20 ms
+    """
+    sim.setup()
+    inputs = sim.Population(50, sim.SpikeSourceArray())
+    outputs = sim.Population(20, sim.IF_curr_exp())
+    pre, post = np.meshgrid(np.arange(50), np.arange(20), indexing='ij')
+    weights = rng.normal(20, 40, 1000)
+    sim.Projection(inputs, outputs, sim.FromArrayConnector((pre.ravel(), post.ravel(), weights), column_names=['weight']))
+    simulator.state.inputs = rng.integers(0, 256, 50)
+    yield inputs, outputs
+    sim.end()
+
+def test_spike_counts(network):
+    inputs, outputs = network
+    outputs.record('spikes')
+    inputs[::2].record('spikes')
+    inputs[1:4].record('spikes')
+    sim.run(20)
+
+    # Counts of the recorded neurons only, matching the spike trains
+    for population, recorded in [(outputs, range(20)), (inputs, sorted({*range(0, 50, 2), 1, 3}))]:
+        ids = [int(population.first_id) + index for index in recorded]
+        counts = population.get_spike_counts()
+        assert list(counts) == ids
+        trains = population.get_data().segments[0].spiketrains
+        assert [int(train.annotations['source_index']) for train in trains] == list(recorded)
+        assert [len(train) for train in trains] == list(counts.values())
+    assert sum(outputs.get_spike_counts().values()) > 0
+
+    # Spikes of a subset (not recorded ones are left out)
+    counts = inputs.recorder.count('spikes', filter_ids=inputs[3:6].all_cells)
+    assert list(counts) == [int(inputs.first_id) + index for index in [3, 4]]
+
+def test_record_large():
+    sim.setup()
+    population = sim.Population(10**6, sim.IF_curr_exp())
+
+    # Whole population and views recorded as index masks
+    population.record('spikes')
+    population[::3].record('v')
+    recorder = population.recorder
+    spikes, v = sorted(recorder.recorded, key=lambda variable: variable.name)
+    assert len(recorder.recorded[spikes]) == 10**6
+    assert recorder.mask.all()
+    assert len(recorder.recorded[v]) == -(-10**6 // 3)
+    assert int(population.first_id) + 3 in recorder.recorded[v]
+    assert int(population.first_id) + 4 not in recorder.recorded[v]
+
+    # Recording again adds no cells
+    population[:10].record('spikes')
+    assert len(recorder.recorded[spikes]) == 10**6
+    sim.end()
@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pytest
+
+import resnnance.core as rsnn
+from resnnance.core.estimator import CLOCK
+
+# batch_tb.vhd log of 6 samples, 4 output neurons
+LOG = os.path.join(os.path.dirname(__file__), "data", "batch_tb.log")
+
+def test_parse():
+    results = rsnn.BatchResults(LOG)
+
+    np.testing.assert_array_equal(results.samples, np.arange(6))
+    np.testing.assert_array_equal(results.cycles, [1834, 1790, 1902, 1766, 1841, 1805])
+    assert results.counts.shape == (6, 4) and results.counts.dtype == np.int64
+    np.testing.assert_array_equal(results.counts[0], [3, 0, 12, 1])
+    np.testing.assert_array_equal(results.predictions(), [2, 1, 0, 3, 0, 0])
+
+def test_report():
+    results = rsnn.BatchResults(LOG)
+
+    report = results.report([2, 1, 1, 3, 0, 2])
+    assert report['samples'] == 6
+    assert report['accuracy'] == pytest.approx(4 / 6)
+    assert report['cycles'] == pytest.approx(1823)
+    assert report['rate'] == pytest.approx(CLOCK / 1823)
+
+    # Without labels, other clocks
+    report = results.report(clock=1e6)
+    assert report['accuracy'] is None and report['rate'] == pytest.approx(1e6 / 1823)
+
+    with pytest.raises(ValueError):
+        results.report([0, 1, 2])
+
+def test_single_sample(tmp_path):
+    (tmp_path / "batch_tb.log").write_text("0 1500 0 4 4 1\n")
+    results = rsnn.BatchResults(tmp_path / "batch_tb.log")
+
+    assert results.counts.shape == (1, 4)
+    np.testing.assert_array_equal(results.predictions(), [1])
+    assert results.report([1])['accuracy'] == 1.0
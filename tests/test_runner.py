@@ -0,0 +1,150 @@
+import os
+import sys
+import json
+
+import pytest
+
+from resnnance.core.compiler import MANIFEST
+from resnnance.core.runner import Runner, PROVIDES, USES
+
+# Stand-in for the ghdl executable: logs its arguments, fails on the calls
+# with an argument ending with the text of the FAIL file
+GHDL = f"""#!{sys.executable}
+import os, sys
+here = os.path.dirname(os.path.abspath(__file__))
+args = sys.argv[1:]
+with open(os.path.join(here, "calls"), "a") as calls:
+    calls.write(" ".join(args) + "\\n")
+fail = os.path.join(here, "FAIL")
+if os.path.exists(fail) and any(arg.endswith(open(fail).read()) for arg in args):
+    print("error: " + " ".join(args))
+    sys.exit(1)
+"""
+
+@pytest.fixture
+def ghdl(tmp_path):
+    path = tmp_path / "bin" / "ghdl"
+    path.parent.mkdir()
+    path.write_text(GHDL)
+    path.chmod(0o755)
+    return path
+
+def calls(ghdl, option):
+    """
+    Returns the arguments of the stand-in ghdl calls with option, and clears the log
+    """
+    log = ghdl.parent / "calls"
+    lines = log.read_text().splitlines() if log.exists() else []
+    log.unlink(missing_ok=True)
+    return [line.split()[1:] for line in lines if line.split()[0] == option]
+
+def analyzed(path, ghdl):
+    return [os.path.relpath(args[-1], path) for args in calls(ghdl, "-a")]
+
+def test_units():
+    text = """
+        library ieee;
+        use ieee.std_logic_1164.all;
+        use work.Layer_Config.all;
+
+        Entity core is
+        end entity;
+
+        architecture rtl of core is
+        begin
+            npu: entity WORK.npu port map (clk => clk);
+        end architecture;
+
+        package body layer_config is
+        end package body;
+    """
+    assert PROVIDES.findall(text) == ["core"]
+    assert PROVIDES.findall("  package Layer_Config is\nend package;") == ["Layer_Config"]
+    assert [unit.lower() for unit in USES.findall(text)] == ["layer_config", "npu"]
+
+def test_order(model, tmp_path):
+    model.compile(tmp_path / "build")
+    with open(tmp_path / "build" / MANIFEST) as manifest:
+        files = {subfile: 0 for subfile in json.load(manifest)['files'] if subfile.endswith(".vhd")}
+
+    order, dependencies = Runner()._Runner__sort(tmp_path / "build", files)
+    assert sorted(order) == sorted(files)
+    assert dependencies["src/network.vhd"] >= {"src/memory.vhd", "src/layers/layer_dense/layer_dense_core.vhd"}
+    for i, subfile in enumerate(order):
+        assert dependencies[subfile] <= set(order[:i])
+
+def test_circular(tmp_path):
+    (tmp_path / "a.vhd").write_text("use work.b.all;\nentity a is end;")
+    (tmp_path / "b.vhd").write_text("use work.a.all;\npackage b is end;")
+    with pytest.raises(ValueError):
+        Runner()._Runner__sort(tmp_path, {"a.vhd": 0, "b.vhd": 0})
+
+def test_stale(model, ghdl, tmp_path):
+    path = tmp_path / "build"
+    model.compile(path)
+    runner = Runner(str(ghdl))
+
+    # First run analyzes every source, then none
+    everything = runner.run(path, tests=[])['analyzed']
+    assert analyzed(path, ghdl) == everything
+    assert sorted(everything) == sorted(str(subfile.relative_to(path)) for subfile in path.rglob("*.vhd"))
+    assert runner.run(path, tests=[])['analyzed'] == []
+    assert analyzed(path, ghdl) == []
+
+    # A changed layer config is analyzed again with its dependents, in order
+    dense = model.layers[2]
+    weights = dense.get_info().copy()
+    weights.flat[0] += 100
+    dense.set_layer(weights)
+    model.compile(path)
+    result = runner.run(path, tests=[])['analyzed']
+    assert analyzed(path, ghdl) == result
+    layer = "src/layers/layer_dense/layer_dense"
+    assert result == [f"{layer}_config.vhd", f"{layer}_ctrl.vhd", f"{layer}_npu_aux.vhd", f"{layer}_npu.vhd",
+                      f"{layer}_core.vhd", "src/network.vhd", "test/network_tb.vhd"]
+
+    # Removed sources rebuild the whole library
+    state = json.loads((path / "build" / "resnnance_hw.json").read_text())
+    state['files']["src/removed.vhd"] = "0"
+    (path / "build" / "resnnance_hw.json").write_text(json.dumps(state))
+    assert runner.run(path, tests=[])['analyzed'] == everything
+    assert calls(ghdl, "--remove")
+
+def test_analysis_failure(model, ghdl, tmp_path):
+    path = tmp_path / "build"
+    model.compile(path)
+    (ghdl.parent / "FAIL").write_text("layer_dense_npu.vhd")
+    runner = Runner(str(ghdl))
+
+    with pytest.raises(RuntimeError):
+        runner.run(path, tests=[])
+    done = analyzed(path, ghdl)[:-1]
+
+    # Sources analyzed before the failure are kept
+    (ghdl.parent / "FAIL").unlink()
+    result = runner.run(path, tests=[])['analyzed']
+    assert not set(result) & set(done)
+    assert "src/layers/layer_dense/layer_dense_npu.vhd" in result
+
+def test_tests(model, ghdl, tmp_path):
+    path = tmp_path / "build"
+    model.compile(path)
+    runner = Runner(str(ghdl))
+
+    result = runner.run(path, jobs=2, stop="1ms")['tests']
+    assert list(result) == ["network_tb"] and result["network_tb"]['status'] == 'passed'
+    assert calls(ghdl, "-r")[0][1:] == ["network_tb", f"--wave={path / 'build' / 'trace' / 'network_tb'}.ghw",
+                                        "--stop-time=1ms"]
+
+    # Failed runs and elaborations
+    (ghdl.parent / "FAIL").write_text("-r")
+    assert runner.run(path, tests=["network_tb"])['tests']["network_tb"]['status'] == 'failed'
+    assert calls(ghdl, "-r")
+    (ghdl.parent / "FAIL").write_text("-m")
+    result = runner.run(path, tests=["network_tb"])['tests']["network_tb"]
+    assert result['status'] == 'error' and "error" in result['output']
+    assert not calls(ghdl, "-r")
+
+def test_missing(tmp_path):
+    with pytest.raises(RuntimeError):
+        Runner(str(tmp_path / "ghdl")).run(tmp_path)
@@ -0,0 +1,173 @@
+import numpy as np
+import pytest
+
+import resnnance.core as rsnn
+from resnnance.core import simulator
+from resnnance.core.simulator import Simulator
+
+from conftest import csr
+
+def conversion(layer):
+    conversion = Simulator.conversion[type(layer)]
+    return conversion['prepare'](layer), conversion['synapses']
+
+def spikes(model, mode, ticks, inputs=None):
+    model.simulator = Simulator(mode)
+    return model.simulate(ticks, inputs)
+
+def test_dense_synapses(model, rng):
+    layer = model.layers[2]
+    params, synapses = conversion(layer)
+
+    s = rng.random(layer.weights.shape[0]) < 0.3
+    np.testing.assert_array_equal(synapses(params, s), params['w'][s].sum(axis=0).astype(np.int64))
+
+@pytest.mark.parametrize("activity", [0.0, 0.3, 1.0])
+def test_sparse_dense_synapses(model, rng, activity):
+    # Same synapses as the expanded weight matrix
+    layer = model.layers[3]
+    params, synapses = conversion(layer)
+    dense, _ = conversion(rsnn.Dense('expanded', layer.get_dense()))
+
+    s = rng.random(layer.shape[0]) < activity
+    np.testing.assert_array_equal(synapses(params, s), synapses(dense, s))
+
+def test_conv2d_synapses(model, rng):
+    layer = model.layers[1]
+    params, synapses = conversion(layer)
+
+    # Spike maps (z, y, x), kernels (ky, kx, kz, f)
+    s = rng.random((1, 12, 12)) < 0.3
+    w = params['w'].reshape(3, 3, 1, 4).astype(np.int64)
+    expected = np.zeros((4, 10, 10), dtype=np.int64)
+    for y in range(10):
+        for x in range(10):
+            window = s[:, y:y+3, x:x+3].transpose(1, 2, 0)
+            expected[:, y, x] = w[window].sum(axis=0)
+
+    np.testing.assert_array_equal(synapses(params, s.ravel()), expected.ravel())
+
+def test_pooling_synapses(rng):
+    # Odd pooling windows drop the last inputs
+    layer = rsnn.Pooling('pool', {'input_shape': (7, 7, 2), 'pool_size': (2, 2)})
+    params, synapses = conversion(layer)
+
+    s = rng.random((2, 7, 7)) < 0.5
+    counts = s[:, :6, :6].reshape(2, 3, 2, 3, 2).sum(axis=(2, 4))
+    np.testing.assert_array_equal(synapses(params, s.ravel()), counts.ravel() * params['w'])
+
+def test_run(model, rng):
+    inputs = (rng.random(12 * 12) * 255).astype(np.int64)
+    result = model.simulate(30, inputs)
+
+    assert set(result) == {layer.label for layer in model.layers}
+    for label, spikes in result.items():
+        assert len(spikes) == 30
+        assert any(len(active) for active in spikes), label
+
+    # Runs continue from the current state, fresh simulators start from reset
+    assert len(model.simulate(5, inputs)['layer_dense']) == 5
+    model.simulator = Simulator()
+    again = model.simulate(30, inputs)
+    for label in result:
+        for tick, active in enumerate(result[label]):
+            np.testing.assert_array_equal(again[label][tick], active)
+
+@pytest.mark.parametrize("mode", ["sparse", "auto"])
+def test_modes_match_dense(model, rng, mode):
+    inputs = (rng.random(12 * 12) * 255).astype(np.int64)
+    expected = spikes(model, 'dense', 50, inputs)
+    result = spikes(model, mode, 50, inputs)
+
+    for label in expected:
+        assert any(len(active) for active in expected[label]), label
+        assert len(result[label]) == len(expected[label])
+        for tick, active in enumerate(expected[label]):
+            np.testing.assert_array_equal(result[label][tick], active, err_msg=f"{label} tick {tick}")
+
+@pytest.mark.parametrize("label", ["conv", "pool", "dense", "sparse"])
+@pytest.mark.parametrize("activity", [0.0, 0.02, 0.3, 1.0])
+def test_events_match_synapses(model, rng, label, activity):
+    # Layers and their input sizes (odd pooling windows drop the last inputs)
+    layers = {layer.label: (layer, conversion(pre)[0]['n']) for pre, layer in zip(model.layers, model.layers[1:])}
+    layers['layer_pool'] = rsnn.Pooling('pool', {'input_shape': (10, 10, 4), 'pool_size': (3, 3)}), 10 * 10 * 4
+
+    layer, m = layers[f"layer_{label}"]
+    params, synapses = conversion(layer)
+    events = Simulator.conversion[type(layer)]['events']
+
+    s = rng.random(m) < activity
+    np.testing.assert_array_equal(synapses(params, s), events(params, np.flatnonzero(s)))
+
+def test_unknown_mode(model):
+    with pytest.raises(ValueError):
+        spikes(model, 'lazy', 1)
+
+@pytest.mark.parametrize("m, k, padding, strides", [
+    ((8, 8), (3, 3), 'same', (1, 1)),
+    ((8, 8), (3, 3), 'valid', (2, 2)),
+    ((8, 9), (3, 3), 'valid', (1, 1)),
+    ((8, 8), (3, 2), 'valid', (1, 1)),
+    ((8, 9), (3, 4), 'valid', (1, 1))
+])
+def test_conv2d_hardware_geometry(rng, m, k, padding, strides):
+    with pytest.raises(ValueError):
+        rsnn.Conv2D('conv', {
+            'input_shape': (*m, 1),
+            'kernel_shape': (*k, 1, 2),
+            'weights': rng.normal(0, 1, (*k, 1, 2)),
+            'padding': padding,
+            'strides': strides
+        })
+
+def test_batch_matches_simulate(model, rng):
+    inputs = (rng.random((5, 12 * 12)) * 255).astype(np.int64)
+    counts = model.simulate_batch(inputs, 20)
+    np.testing.assert_array_equal(model.simulate_batch(inputs, 20, workers=2, chunk=2), counts)
+
+    # Every sample runs from reset
+    model.simulator = Simulator()
+    expected = np.zeros(6, dtype=int)
+    for active in model.simulate(20, inputs[3])['layer_sparse']:
+        expected[active] += 1
+    np.testing.assert_array_equal(counts[3], expected)
+    assert counts.sum() > 0
+
+def test_batch_in_process_keeps_state(model, rng):
+    model.simulate(5)
+    state = [unit['x'].copy() for unit in model.simulator.units]
+    model.simulate_batch((rng.random((2, 12 * 12)) * 255).astype(np.int64), 10)
+
+    assert simulator.worker is None
+    for x, unit in zip(state, model.simulator.units):
+        np.testing.assert_array_equal(unit['x'], x)
+
+def test_reload_changed_weights(model, rng):
+    inputs = (rng.random((3, 12 * 12)) * 255).astype(np.int64)
+    model.simulate(5)
+    params = [unit['params'] for unit in model.simulator.units]
+    state = model.simulator.units[2]['x'].copy()
+
+    # Requantized and replaced layers are prepared again, the others are kept
+    model.layers[2].quantize(4)
+    model.layers[3].set_layer(csr(np.eye(10, 6) * 200))
+    model.simulate(0)
+    for i, (unit, layer) in enumerate(zip(model.simulator.units, model.layers)):
+        if i < 2:
+            assert unit['params'] is params[i]
+        else:
+            expected = Simulator.conversion[type(layer)]['prepare'](layer)
+            np.testing.assert_array_equal(unit['params']['w'], expected['w'])
+    np.testing.assert_array_equal(model.simulator.units[2]['x'], state)
+
+    counts = model.simulate_batch(inputs, 20)
+    model.simulator = Simulator()
+    np.testing.assert_array_equal(counts, model.simulate_batch(inputs, 20))
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_empty(model, workers):
+    counts = model.simulate_batch(np.zeros((0, 12 * 12), dtype=np.int64), 10, workers=workers)
+    assert counts.shape == (0, 6)
+
+    counts = model.simulate_batch([], 10, workers=workers)
+    assert counts.shape == (0, 6)